@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import process_repo
+
+# ==============================================================================
+#  EVALUATION BENCHMARK
+# ==============================================================================
+#
+#  Runs the evaluation pipeline against small synthetic repositories with the
+#  stub judge, so it needs neither network access nor an API key, and reports
+#  where the time goes: wall time, CPU time, peak RSS and bytes read for every
+#  stage of every fixture. Results can be stored as a baseline and later runs
+#  compared against it to catch regressions in the harness itself.
+#
+#  Fixtures:
+#    python-app     a small Python project with requirements.txt and tests
+#    node-app       a small Node project with an empty package-lock.json
+#    docker-app     a project that only has a Dockerfile
+#    large-models   a project with multi-gigabyte (sparse) model weights
+#
+#  Usage:
+#    python benchmark.py                          run and compare to the baseline
+#    python benchmark.py --update-baseline        run and store the baseline
+#    python benchmark.py --repeat 5 --output results.json
+#
+#  Absolute numbers depend on the machine and on which of pytest, npm, docker,
+#  bandit and gitleaks are installed; compare baselines from the same host.
+#
+# ==============================================================================
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+LARGE_MODEL_MB = 2100
+STAGE_METRICS = ("duration_seconds", "cpu_seconds", "peak_rss_kb", "bytes_read")
+# Differences below these are noise, whatever the relative change.
+ABSOLUTE_SLACK = {
+    "duration_seconds": 0.05,
+    "cpu_seconds": 0.05,
+    "peak_rss_kb": 4096,
+    "bytes_read": 4096,
+}
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@example.com",
+    "GIT_AUTHOR_DATE": "2025-10-01T00:00:00",
+    "GIT_COMMITTER_NAME": "benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@example.com",
+    "GIT_COMMITTER_DATE": "2025-10-01T00:00:00",
+}
+
+FIXTURES = {
+    "python-app": {
+        "README.md": "# Python fixture\n\nDemo: https://www.youtube.com/watch?v=benchmark\n",
+        "requirements.txt": "# no third-party dependencies\n",
+        "app.py": (
+            "import os\n\n"
+            "# from langchain.chains import LLMChain  (optional integration)\n"
+            "def summarize(text, limit=40):\n"
+            "    \"\"\"Pretend openai summary.\"\"\"\n"
+            "    return text[:limit]\n"
+        ),
+        "tests/test_app.py": (
+            "from app import summarize\n\n"
+            "def test_summarize():\n"
+            "    assert summarize('abc', 2) == 'ab'\n"
+        ),
+    },
+    "node-app": {
+        "package.json": json.dumps({
+            "name": "node-app",
+            "version": "1.0.0",
+            "scripts": {"test": "node test.js"},
+        }, indent=2),
+        "package-lock.json": json.dumps({
+            "name": "node-app",
+            "version": "1.0.0",
+            "lockfileVersion": 3,
+            "requires": True,
+            "packages": {"": {"name": "node-app", "version": "1.0.0"}},
+        }, indent=2),
+        "index.js": "// uses the openai API in production\nmodule.exports = (s) => s.toUpperCase();\n",
+        "test.js": "const up = require('./index');\nif (up('a') !== 'A') process.exit(1);\n",
+    },
+    "docker-app": {
+        "Dockerfile": "FROM python:3.11-slim\nCOPY . /app\nCMD [\"python\", \"/app/main.py\"]\n",
+        "main.py": "from transformers import pipeline\n\nprint('hello')\n",
+    },
+    "large-models": {
+        "README.md": "# Large model fixture\n\nWeights live in models/.\n",
+        "infer.py": "import torch\n\nmodel = torch.load('models/model.pt')\n",
+        ".gitignore": "models/\n",
+    },
+}
+
+def _git(repo_path, *args):
+    subprocess.run(
+        ["git", "-C", repo_path, *args],
+        check=True,
+        capture_output=True,
+        env={**os.environ, **GIT_ENV},
+    )
+
+def create_fixture_repos(root):
+    """Writes the fixture repositories under root as committed git repos; returns their paths."""
+    paths = []
+    for name, files in FIXTURES.items():
+        repo_path = os.path.join(root, name)
+        if os.path.lexists(repo_path):
+            shutil.rmtree(repo_path)
+        for relative_path, content in files.items():
+            path = os.path.join(repo_path, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        _git(repo_path, "init", "-q")
+        _git(repo_path, "add", "-A")
+        _git(repo_path, "commit", "-q", "-m", f"{name} fixture")
+        paths.append(repo_path)
+
+    # Sparse, so the weights cost no disk space; they are git-ignored so that
+    # committing the fixture does not read them.
+    models_dir = os.path.join(root, "large-models", "models")
+    os.makedirs(models_dir, exist_ok=True)
+    for filename, size_mb in (("model.pt", LARGE_MODEL_MB), ("adapter.safetensors", 64)):
+        with open(os.path.join(models_dir, filename), "wb") as f:
+            f.truncate(size_mb * 1024 * 1024)
+    return paths
+
+def run_fixture(repo_path, output_dir):
+    """Evaluates one fixture without the cache; returns its wall time and stage timings."""
+    for subdir in ("logs", "reports"):
+        os.makedirs(os.path.join(output_dir, subdir), exist_ok=True)
+    started = time.perf_counter()
+    report = process_repo.evaluate_repo(repo_path, output_dir)
+    return {
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "stages": report["stage_timings"],
+    }
+
+def _median(values):
+    return round(statistics.median(values), 3)
+
+def summarize_runs(runs):
+    """Medians of every metric across repeated runs of one fixture."""
+    summary = {"wall_seconds": _median([run["wall_seconds"] for run in runs]), "stages": {}}
+    for stage in runs[0]["stages"]:
+        summary["stages"][stage] = {
+            metric: _median([run["stages"][stage].get(metric, 0) for run in runs])
+            for metric in STAGE_METRICS
+        }
+    return summary
+
+def run_benchmark(work_dir, repeat=DEFAULT_REPEAT):
+    """Creates the fixtures, evaluates each `repeat` times and returns the results dict."""
+    process_repo.configure_judge("stub", requests_per_minute=0)
+    fixtures_dir = os.path.join(work_dir, "fixtures")
+    repos = {}
+    for repo_path in create_fixture_repos(fixtures_dir):
+        name = os.path.basename(repo_path)
+        runs = []
+        for i in range(repeat):
+            print(f"Benchmarking {name} ({i + 1}/{repeat})...")
+            runs.append(run_fixture(repo_path, os.path.join(work_dir, "output", f"run-{i}")))
+        repos[name] = summarize_runs(runs)
+    return {
+        "created_at": datetime.now().isoformat(),
+        "evaluator_version": process_repo.EVALUATOR_VERSION,
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "repeat": repeat,
+        "evaluator_peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "repos": repos,
+    }
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Returns a list of regressions: metrics that grew by more than tolerance (and the slack)."""
+    regressions = []
+    for repo, current in results["repos"].items():
+        base = baseline.get("repos", {}).get(repo)
+        if base is None:
+            continue
+        checks = [("total", "duration_seconds", current["wall_seconds"], base["wall_seconds"])]
+        for stage, metrics in current["stages"].items():
+            for metric in STAGE_METRICS:
+                base_value = base["stages"].get(stage, {}).get(metric)
+                if base_value is not None:
+                    checks.append((stage, metric, metrics[metric], base_value))
+        for stage, metric, value, base_value in checks:
+            if value > base_value * (1 + tolerance) + ABSOLUTE_SLACK[metric]:
+                regressions.append({
+                    "repo": repo,
+                    "stage": stage,
+                    "metric": metric,
+                    "baseline": base_value,
+                    "current": value,
+                })
+    return regressions
+
+def print_results(results):
+    for repo, summary in results["repos"].items():
+        print(f"\n{repo}: {summary['wall_seconds']:.2f}s wall")
+        print(f"  {'stage':<26}{'wall s':>9}{'cpu s':>9}{'rss KB':>10}{'bytes read':>13}")
+        for stage, m in summary["stages"].items():
+            print(
+                f"  {stage:<26}{m['duration_seconds']:>9.3f}{m['cpu_seconds']:>9.3f}"
+                f"{int(m['peak_rss_kb']):>10}{int(m['bytes_read']):>13}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation pipeline on synthetic repos.")
+    parser.add_argument("--work-dir", help="Where fixtures and outputs go (default: a temporary directory).")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per fixture; medians are reported.")
+    parser.add_argument("--output", help="Write the results JSON here.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative increase of any metric before it counts as a regression.")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="evaluation-benchmark-")
+    results = run_benchmark(work_dir, repeat=args.repeat)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    if not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nBaseline written to {args.baseline}.")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to store one.")
+        return
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+        return
+    print(f"\n{len(regressions)} regressions against {args.baseline}:")
+    for r in regressions:
+        print(f"  {r['repo']} / {r['stage']} / {r['metric']}: {r['baseline']} -> {r['current']}")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
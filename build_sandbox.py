@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+from contextlib import asynccontextmanager
+
+from stage_graph import acquire_thread_lock
+
+# ==============================================================================
+#  ISOLATED BUILD SANDBOXES
+# ==============================================================================
+#
+#  build_and_test used to `pip install` every submission into the evaluator's
+#  own interpreter and `npm ci` each repo from scratch. The sandbox instead
+#  keeps, under one root directory:
+#
+#    wheelhouse/           every wheel/sdist ever needed, shared by all repos
+#    npm-cache/            npm's download cache, shared by all repos
+#    envs/<key>/           one virtualenv per distinct requirements.txt
+#    node_modules/<key>/   one node_modules per distinct package-lock.json
+#    repos/<name>/venv     the per-repo copy of its env, hardlinked from envs/
+#
+#  Environments are installed with --no-index from the wheelhouse, so the only
+#  network step is the (optional) prefetch. Repos with identical lockfiles get
+#  hardlinked copies of the same environment, which take seconds to create and
+#  cannot interfere with each other or with the evaluator.
+#
+#  Prefetch ahead of an offline run with:
+#    python build_sandbox.py <sandbox_dir> <repo_path> [<repo_path> ...]
+#
+# ==============================================================================
+
+TEST_REQUIREMENTS = ("pytest",)
+COMPLETE_MARKER = ".complete"
+
+def file_digest(*paths, extra=""):
+    """Hashes the contents of the given files (missing files hash as empty) plus `extra`."""
+    digest = hashlib.sha256(extra.encode())
+    for path in paths:
+        digest.update(b"\0")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:24]
+
+def python_env_key(requirements_path):
+    """Environments are shared between repos with byte-identical requirements."""
+    interpreter = f"{platform.python_implementation()}-{sys.version_info[0]}.{sys.version_info[1]}"
+    extra = f"{interpreter}|{platform.machine()}|{','.join(TEST_REQUIREMENTS)}"
+    return file_digest(requirements_path, extra=extra)
+
+def hardlink_tree(source, destination):
+    """Replaces destination with a copy of source whose files are hardlinks."""
+    if os.path.lexists(destination):
+        shutil.rmtree(destination)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        shutil.copytree(source, destination, symlinks=True, copy_function=os.link)
+    except (OSError, shutil.Error):
+        # Hardlinks cannot cross filesystems; fall back to a real copy.
+        if os.path.lexists(destination):
+            shutil.rmtree(destination)
+        shutil.copytree(source, destination, symlinks=True)
+
+class BuildSandbox:
+    """Shared package caches plus per-lockfile environments for build_and_test."""
+
+    def __init__(self, root, run_command, install_resource=None, offline=False):
+        self.root = os.path.abspath(root)
+        self.wheelhouse = os.path.join(self.root, "wheelhouse")
+        self.npm_cache = os.path.join(self.root, "npm-cache")
+        self.env_store = os.path.join(self.root, "envs")
+        self.node_store = os.path.join(self.root, "node_modules")
+        self.repo_envs = os.path.join(self.root, "repos")
+        self.run_command = run_command
+        self.install_resource = install_resource
+        self.offline = offline
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        for path in (self.wheelhouse, self.npm_cache, self.env_store, self.node_store, self.repo_envs):
+            os.makedirs(path, exist_ok=True)
+
+    def config(self):
+        """The settings that affect build results, for the build stage's cache key."""
+        return {"isolated": True, "offline": self.offline, "test_requirements": list(TEST_REQUIREMENTS)}
+
+    @asynccontextmanager
+    async def _building(self, key):
+        """Serialises builds of the same environment across repos and threads."""
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        # Polling rather than blocking in a thread: a cancelled waiter must not
+        # take the lock later, or every later build of this key would hang.
+        await acquire_thread_lock(lock)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    async def prefetch_requirements(self, requirements_path, cwd, log_file):
+        """Downloads a requirements file and its dependencies into the shared wheelhouse."""
+        wheelhouse = shlex.quote(self.wheelhouse)
+        return await self.run_command(
+            f"{shlex.quote(sys.executable)} -m pip download --disable-pip-version-check "
+            f"--dest {wheelhouse} --find-links {wheelhouse} "
+            f"-r {shlex.quote(requirements_path)} {' '.join(TEST_REQUIREMENTS)}",
+            cwd,
+            log_file,
+            resource=self.install_resource,
+        )
+
+    async def _build_python_env(self, requirements_path, env_dir, repo_path, log_file):
+        if os.path.lexists(env_dir):
+            shutil.rmtree(env_dir)
+        if not self.offline:
+            prefetch = await self.prefetch_requirements(requirements_path, repo_path, log_file)
+            if prefetch["exit_code"] != 0:
+                return False
+        create = await self.run_command(
+            f"{shlex.quote(sys.executable)} -m venv {shlex.quote(env_dir)}", repo_path, log_file
+        )
+        if create["exit_code"] != 0:
+            return False
+        install = await self.run_command(
+            f"{shlex.quote(os.path.join(env_dir, 'bin', 'python'))} -m pip install "
+            f"--disable-pip-version-check --no-index --find-links {shlex.quote(self.wheelhouse)} "
+            f"-r {shlex.quote(requirements_path)} {' '.join(TEST_REQUIREMENTS)}",
+            repo_path,
+            log_file,
+            resource=self.install_resource,
+        )
+        if install["exit_code"] != 0:
+            return False
+        open(os.path.join(env_dir, COMPLETE_MARKER), "w").close()
+        return True
+
+    async def prepare_python_env(self, repo_path, log_file):
+        """Returns the repo's own venv with its requirements installed, or None on failure."""
+        requirements_path = os.path.abspath(os.path.join(repo_path, "requirements.txt"))
+        key = python_env_key(requirements_path)
+        shared_env = os.path.join(self.env_store, key)
+        async with self._building(f"python:{key}"):
+            if os.path.exists(os.path.join(shared_env, COMPLETE_MARKER)):
+                log_file.write(f"--- Reusing Python environment {key} ---\n\n")
+            elif not await self._build_python_env(requirements_path, shared_env, repo_path, log_file):
+                return None
+        # `python -m` from the copy resolves site-packages relative to itself,
+        # so the hardlinked copy works even though scripts point at the original.
+        repo_env = os.path.join(self.repo_envs, os.path.basename(repo_path), "venv")
+        await asyncio.to_thread(hardlink_tree, shared_env, repo_env)
+        return repo_env
+
+    def npm_flags(self):
+        flags = f"--no-fund --cache {shlex.quote(self.npm_cache)} --prefer-offline"
+        if self.offline:
+            flags += " --offline"
+        return flags
+
+    async def install_node_modules(self, repo_path, log_file):
+        """Installs node_modules, reusing a stored copy for an already-seen lockfile.
+
+        Returns a run_command-style result dict.
+        """
+        lockfile = os.path.join(repo_path, "package-lock.json")
+        npm_ci = f"npm ci {self.npm_flags()}"
+        if not os.path.exists(lockfile):
+            # npm ci fails without a lockfile; keep that signal as before.
+            return await self.run_command(npm_ci, repo_path, log_file, resource=self.install_resource)
+
+        node_binary = shutil.which("node") or ""
+        key = file_digest(lockfile, os.path.join(repo_path, "package.json"), extra=node_binary)
+        stored = os.path.join(self.node_store, key)
+        repo_modules = os.path.join(repo_path, "node_modules")
+        async with self._building(f"node:{key}"):
+            if not os.path.exists(os.path.join(stored, COMPLETE_MARKER)):
+                result = await self.run_command(npm_ci, repo_path, log_file, resource=self.install_resource)
+                if result["exit_code"] == 0 and os.path.isdir(repo_modules):
+                    await asyncio.to_thread(hardlink_tree, repo_modules, os.path.join(stored, "node_modules"))
+                    open(os.path.join(stored, COMPLETE_MARKER), "w").close()
+                return result
+
+        await asyncio.to_thread(hardlink_tree, os.path.join(stored, "node_modules"), repo_modules)
+        log_file.write(f"--- Reused node_modules {key} (hardlinked) ---\n\n")
+        return {
+            "exit_code": 0,
+            "stdout": f"Reused node_modules {key} from the sandbox store.",
+            "stderr": "",
+            "runtime_seconds": 0.0,
+        }
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python build_sandbox.py <sandbox_dir> <repo_path> [<repo_path> ...]")
+        sys.exit(1)
+
+    wheelhouse = os.path.join(os.path.abspath(sys.argv[1]), "wheelhouse")
+    os.makedirs(wheelhouse, exist_ok=True)
+    for repo_path in sys.argv[2:]:
+        requirements_path = os.path.join(repo_path, "requirements.txt")
+        if not os.path.exists(requirements_path):
+            continue
+        print(f"Prefetching wheels for {repo_path}...")
+        result = subprocess.run(
+            [sys.executable, "-m", "pip", "download", "--disable-pip-version-check",
+             "--dest", wheelhouse, "--find-links", wheelhouse,
+             "-r", requirements_path, *TEST_REQUIREMENTS],
+        )
+        if result.returncode != 0:
+            print(f"  Prefetch failed for {repo_path}; its environment will not build offline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import codecs
+import json
+import os
+import sys
+from collections import deque
+
+# ==============================================================================
+#  STREAMING COMMAND CAPTURE
+# ==============================================================================
+#
+#  Helpers that let process_repo.run_command consume a command's output as a
+#  stream instead of buffering all of it: a bounded head/tail capture for the
+#  evidence dict, an incremental JSON parser for tools such as bandit and
+#  gitleaks, and a tiny wrapper process that reports the command's resource
+#  usage once it exits.
+#
+# ==============================================================================
+
+CHUNK_BYTES = 64 * 1024
+DEFAULT_HEAD_BYTES = 64 * 1024
+DEFAULT_TAIL_BYTES = 64 * 1024
+
+# Runs the shell command as its child and, once it exits, writes to the report
+# fd the CPU time of the whole waited-for process tree and the peak RSS of the
+# single largest process in it. RUSAGE_CHILDREN sums CPU time over
+# descendants but ru_maxrss is a maximum, not a sum, so concurrent children
+# (e.g. parallel test workers) are not added up. Going through a wrapper is
+# the portable way to get per-command numbers: RUSAGE_CHILDREN of the
+# evaluator itself mixes every command that ran concurrently.
+RUSAGE_SHIM = """
+import os, resource, subprocess, sys
+returncode = subprocess.call(sys.argv[1], shell=True)
+usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+os.write(int(sys.argv[2]), f"{usage.ru_maxrss} {usage.ru_utime + usage.ru_stime}".encode())
+sys.exit(returncode if returncode >= 0 else 128 - returncode)
+"""
+
+def shim_argv(command, report_fd):
+    """argv that runs `command` through the rusage wrapper, reporting to report_fd."""
+    return [sys.executable, "-c", RUSAGE_SHIM, command, str(report_fd)]
+
+def parse_shim_report(raw):
+    """Returns (peak_rss_kb, cpu_seconds) from the wrapper's report, or (None, None).
+
+    peak_rss_kb is the largest single process's peak, not the tree's total.
+    """
+    try:
+        max_rss, cpu_seconds = raw.decode().split()
+        max_rss = int(max_rss)
+    except ValueError:
+        return None, None
+    # ru_maxrss is kilobytes on Linux but bytes on macOS.
+    if sys.platform == "darwin":
+        max_rss //= 1024
+    return max_rss, round(float(cpu_seconds), 3)
+
+def read_shim_report(fd):
+    """Drains the wrapper's report pipe (a few bytes) and closes it."""
+    chunks = []
+    try:
+        while True:
+            chunk = os.read(fd, 256)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b"".join(chunks)
+
+def copy_spool_to_log(spool, log_file):
+    """Appends a spooled binary stream to a text log in chunks."""
+    spool.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in iter(lambda: spool.read(CHUNK_BYTES), b""):
+        log_file.write(decoder.decode(chunk))
+    log_file.write(decoder.decode(b"", final=True))
+
+async def pump_stream(stream, capture, spool, parser=None):
+    """Reads a subprocess pipe to EOF, feeding the capture, the spool and the parser."""
+    while True:
+        chunk = await stream.read(CHUNK_BYTES)
+        if not chunk:
+            return
+        capture.feed(chunk)
+        spool.write(chunk)
+        if parser is not None:
+            parser.feed(chunk)
+
+class BoundedCapture:
+    """Keeps the first and last bytes of a stream and counts everything in between."""
+
+    def __init__(self, head_bytes=DEFAULT_HEAD_BYTES, tail_bytes=DEFAULT_TAIL_BYTES):
+        self.head_limit = head_bytes
+        self.tail_limit = tail_bytes
+        self.head = bytearray()
+        self.tail = deque()
+        self.tail_size = 0
+        self.total_bytes = 0
+
+    def feed(self, chunk):
+        self.total_bytes += len(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if not chunk:
+            return
+        self.tail.append(chunk)
+        self.tail_size += len(chunk)
+        while self.tail_size - len(self.tail[0]) >= self.tail_limit:
+            self.tail_size -= len(self.tail.popleft())
+
+    @property
+    def truncated(self):
+        return self.total_bytes > len(self.head) + min(self.tail_size, self.tail_limit)
+
+    def text(self):
+        """The captured text, with a marker where the middle was dropped."""
+        tail = b"".join(self.tail)
+        if len(tail) > self.tail_limit:
+            tail = tail[-self.tail_limit:]
+        omitted = self.total_bytes - len(self.head) - len(tail)
+        head = self.head.decode("utf-8", errors="replace")
+        tail = tail.decode("utf-8", errors="replace")
+        if omitted <= 0:
+            return head + tail
+        return f"{head}\n... [{omitted} bytes omitted] ...\n{tail}"
+
+class JsonStreamParser:
+    """Parses a JSON document fed in chunks.
+
+    Elements of a top-level array, or members of a top-level object, are
+    decoded as soon as each is complete and their text is dropped. Only the
+    top level is split, so the undecoded text held at any time is bounded by
+    the largest single element or member, not by the document: a report with
+    one big member (bandit's "results" list) is still buffered whole before
+    it decodes. The decoded document itself is always kept. Leading non-JSON
+    noise (banners, log lines) before the first '[' or '{' is skipped.
+    """
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.buffer = ""
+        self.state = "start"
+        self.value = None
+        self.key = None
+        # Retrying a partial element on every chunk would be quadratic, so a
+        # failed decode is only retried once the buffer has doubled.
+        self.retry_at = 0
+
+    def feed(self, chunk):
+        if self.state == "done":
+            return
+        self.buffer += self.text_decoder.decode(chunk)
+        if len(self.buffer) >= self.retry_at:
+            self._drain(final=False)
+
+    def close(self):
+        """Returns the parsed document or raises ValueError if it is incomplete."""
+        self.buffer += self.text_decoder.decode(b"", final=True)
+        self._drain(final=True)
+        if self.state != "done":
+            raise ValueError("Incomplete or missing JSON document in command output.")
+        return self.value
+
+    def _skip(self, position):
+        while position < len(self.buffer) and self.buffer[position] in " \t\r\n":
+            position += 1
+        return position
+
+    def _decode(self, position, final):
+        """Decodes one value at position; returns (value, end) or None if more input is needed."""
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, position)
+        except ValueError:
+            if final:
+                raise
+            self.retry_at = 2 * len(self.buffer)
+            return None
+        # A number may still be growing ("2." or "1e" decodes as 2 or 1), so it
+        # is only complete once the delimiter after it has arrived.
+        if not final and isinstance(value, (int, float)):
+            after = self._skip(end)
+            if after == len(self.buffer) or self.buffer[after] not in ",]}":
+                return None
+        return value, end
+
+    def _drain(self, final):
+        self.retry_at = 0
+        position = 0
+        try:
+            while self.state != "done":
+                position = self._skip(position)
+                if position == len(self.buffer):
+                    return
+                char = self.buffer[position]
+
+                if self.state == "start":
+                    starts = [i for i in (self.buffer.find("[", position), self.buffer.find("{", position)) if i >= 0]
+                    if not starts:
+                        position = len(self.buffer)
+                        return
+                    position = min(starts)
+                    if self.buffer[position] == "[":
+                        self.value, self.state = [], "element"
+                    else:
+                        self.value, self.state = {}, "key"
+                    position += 1
+                elif char == "," and self.state in ("element", "key"):
+                    position += 1
+                elif (self.state, char) in (("element", "]"), ("key", "}")):
+                    position += 1
+                    self.state = "done"
+                elif self.state == "key":
+                    decoded = self._decode(position, final)
+                    if decoded is None:
+                        return
+                    key, end = decoded
+                    colon = self._skip(end)
+                    if colon == len(self.buffer):
+                        if final:
+                            raise ValueError("JSON object key without a value.")
+                        return
+                    if self.buffer[colon] != ":":
+                        raise ValueError("Expected ':' after JSON object key.")
+                    self.key = key
+                    self.state = "member"
+                    position = colon + 1
+                else:
+                    decoded = self._decode(position, final)
+                    if decoded is None:
+                        return
+                    item, position = decoded
+                    if self.state == "element":
+                        self.value.append(item)
+                    else:
+                        self.value[self.key] = item
+                        self.state = "key"
+        finally:
+            self.buffer = self.buffer[position:]
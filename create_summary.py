@@ -2,145 +2,211 @@ import json
 import os
 import sys
 import csv
+import heapq
 from datetime import datetime
 
-def create_summary_reports(output_dir):
-    """Creates summary reports from individual JSON reports."""
-    reports_dir = os.path.join(output_dir, "reports")
-    all_reports = []
-    for filename in os.listdir(reports_dir):
-        if filename.endswith(".json"):
-            with open(os.path.join(reports_dir, filename), "r") as f:
-                all_reports.append(json.load(f))
-
-    # Sort reports by weighted score with tie-breakers: Use of AI → Technical Execution → Innovation → Presentation
-    all_reports.sort(
-        key=lambda x: (
-            x.get("scores", {}).get("weighted_score_percent", 0),
-            x.get("scores", {}).get("use_of_ai", 0),
-            x.get("scores", {}).get("technical_execution", 0),
-            x.get("scores", {}).get("innovation", 0),
-            x.get("scores", {}).get("presentation", 0),
-        ),
-        reverse=True,
+# Reports are folded into running totals one at a time as they arrive, so a
+# parallel run keeps the summaries live and no step holds every report in
+# memory. The per-repo CSVs and full_report.jsonl are append-only; the ranked
+# outputs are rebuilt from a top-N heap, and the full ranking (the overall
+# table and full_report.json) is written once by finalize().
+LEADERBOARD_SIZE = 10
+WINNERS_COUNT = 3
+SUMMARY_FIELDS = [
+    "repo_name",
+    "path",
+    "weighted_score_percent",
+    "classification",
+    "top_line_summary",
+    "reproducible"
+]
+ANOMALY_FIELDS = ["repo_name", "tool", "description", "details"]
+
+def _as_text(value):
+    if isinstance(value, list):
+        return ", ".join(map(str, value))
+    return str(value)
+
+def _score(report):
+    score = report.get("scores", {}).get("weighted_score_percent", 0)
+    return score if isinstance(score, (int, float)) else 0
+
+def rank_key(report):
+    """Weighted score with tie-breakers: Use of AI → Technical Execution → Innovation → Presentation."""
+    scores = report.get("scores", {})
+    return (
+        _score(report),
+        scores.get("use_of_ai", 0),
+        scores.get("technical_execution", 0),
+        scores.get("innovation", 0),
+        scores.get("presentation", 0),
     )
 
-    # --- Create all_repos_summary.csv ---
-    with open(os.path.join(output_dir, "all_repos_summary.csv"), "w", newline="") as csvfile:
-        fieldnames = [
-            "repo_name",
-            "path",
-            "weighted_score_percent",
-            "classification",
-            "top_line_summary",
-            "reproducible"
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for report in all_reports:
-            classification = report.get("classification", "N/A")
-            if isinstance(classification, list):
-                classification = ", ".join(map(str, classification))
-            else:
-                classification = str(classification)
-
-            notes = report.get("notes_for_judges", "")
-            if isinstance(notes, list):
-                notes = ", ".join(map(str, notes))
-            else:
-                notes = str(notes)
-
-            score = report.get("scores", {}).get("weighted_score_percent", 0)
-            if not isinstance(score, (int, float)):
-                score = 0
-            
-            writer.writerow({
-                "repo_name": report.get("name", "Unknown"),
-                "path": report.get("id", "Unknown"),
-                "weighted_score_percent": score,
-                "classification": classification,
-                "top_line_summary": notes,
-                "reproducible": bool(report.get("reproducible", False)),
-            })
-
-    # --- Create full_report.json ---
-    with open(os.path.join(output_dir, "full_report.json"), "w") as f:
-        json.dump(all_reports, f, indent=4)
-
-    # --- Create top10_by_score.md ---
-    with open(os.path.join(output_dir, "top10_by_score.md"), "w") as f:
-        f.write("# Top 10 Repositories by Score\n\n")
-        for i, report in enumerate(all_reports[:10]):
-            f.write(
-                f"{i+1}. {report['name']} - {report['scores']['weighted_score_percent']:.2f}%\n"
-            )
-            
-    # --- Create winners_recommendation.md ---
-    with open(os.path.join(output_dir, "winners_recommendation.md"), "w") as f:
-        f.write("# Winners Recommendation\n\n")
-        for i, report in enumerate(all_reports[:3]):
-            f.write(f"## Rank {i+1}: {report['name']}\n")
-            f.write(f"**Score:** {report['scores']['weighted_score_percent']:.2f}%\n")
-            f.write(f"**Justification:** {report['notes_for_judges']}\n\n")
-
-
-    # --- Create anomalies.csv ---
-    with open(os.path.join(output_dir, "anomalies.csv"), "w", newline="") as csvfile:
-        fieldnames = ["repo_name", "tool", "description", "details"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for report in all_reports:
-            risks = report.get("risks", {})
-            for tool, findings in risks.items():
-                if isinstance(findings, list):
-                    for finding in findings:
-                        writer.writerow({
-                            "repo_name": report["name"],
-                            "tool": tool,
-                            "description": finding.get("Description", "N/A"),
-                            "details": json.dumps(finding)
-                        })
-
-    # --- Create overall_report.md ---
-    with open(os.path.join(output_dir, "overall_report.md"), "w") as f:
-        f.write("# Overall Hackathon Evaluation Report\n\n")
-        f.write("## Summary\n")
-        avg_score = sum(r["scores"]["weighted_score_percent"] for r in all_reports) / len(all_reports)
-        reproducible_builds = sum(1 for r in all_reports if r["reproducible"])
-        demo_links = sum(1 for r in all_reports if r["presentation_link_detected"])
-        
-        f.write(f"- **Total Repositories Evaluated:** {len(all_reports)}\n")
-        f.write(f"- **Average Score:** {avg_score:.2f}%\n")
-        f.write(f"- **Reproducible Builds:** {reproducible_builds} ({reproducible_builds/len(all_reports):.1%})\n")
-        f.write(f"- **Projects with Demo Links:** {demo_links} ({demo_links/len(all_reports):.1%})\n\n")
-
-        f.write("## Full Summary Table\n")
-        f.write("| Rank | Repository | Score | Classification | Reproducible | Demo |\n")
-        f.write("|------|------------|-------|----------------|--------------|------|\n")
-        for i, report in enumerate(all_reports):
-            f.write(f"| {i+1} | {report['name']} | {report['scores']['weighted_score_percent']:.2f}% | {report['classification']} | {'Yes' if report['reproducible'] else 'No'} | {'Yes' if report['presentation_link_detected'] else 'No'} |\n")
-
-    # --- Create final_validation_report.md ---
-    with open(os.path.join(output_dir, "final_validation_report.md"), "w") as f:
-        f.write("### FINAL VALIDATION SUMMARY\n\n")
-        f.write(f"* Evaluation completed: {datetime.now().strftime('%Y-%m-%d %H:%M UTC')}\n")
-        f.write(f"* Total evaluated: {len(all_reports)}\n")
-        
-        demo_links = sum(1 for r in all_reports if r["presentation_link_detected"])
-        f.write(f"* Valid demo/presentation links: {demo_links}\n")
-        
-        avg_score = sum(r["scores"]["weighted_score_percent"] for r in all_reports) / len(all_reports)
-        f.write(f"* Average weighted score: {avg_score:.2f}\n")
-        
-        reproducible_builds = sum(1 for r in all_reports if r["reproducible"])
-        f.write(f"* Reproducible builds: {reproducible_builds}\n")
-
-        deductions_applied = sum(1 for r in all_reports if r.get("penalties_applied"))
-        f.write(f"* Evidence deductions applied: {deductions_applied} repos\n")
-
-        security_alerts = sum(len(r.get("risks", {}).get("gitleaks", [])) for r in all_reports)
-        f.write(f"* Security alerts: {security_alerts}\n")
-        f.write(f"* Winners: {', '.join([r['name'] for r in all_reports[:3]])}\n")
+class SummaryAggregator:
+    """Builds the summary files incrementally from reports added one at a time."""
+
+    def __init__(self, output_dir, leaderboard_size=LEADERBOARD_SIZE, live=True):
+        self.output_dir = output_dir
+        self.leaderboard_size = leaderboard_size
+        # Live aggregators refresh the leaderboard files after every report.
+        self.live = live
+        self.count = 0
+        self.score_total = 0.0
+        self.reproducible_builds = 0
+        self.demo_links = 0
+        self.deductions_applied = 0
+        self.security_alerts = 0
+        # Min-heap of (rank key, -arrival, entry): the weakest leader is on top
+        # and, on equal keys, the later arrival is evicted first.
+        self.leaders = []
+        # One small row per repo for the final ranking; the full report stays on disk.
+        self.rows = []
+
+        self.summary_file = open(self._path("all_repos_summary.csv"), "w", newline="")
+        self.summary_writer = csv.DictWriter(self.summary_file, fieldnames=SUMMARY_FIELDS)
+        self.summary_writer.writeheader()
+        self.anomalies_file = open(self._path("anomalies.csv"), "w", newline="")
+        self.anomalies_writer = csv.DictWriter(self.anomalies_file, fieldnames=ANOMALY_FIELDS)
+        self.anomalies_writer.writeheader()
+        self.reports_file = open(self._path("full_report.jsonl"), "wb")
+
+    def _path(self, filename):
+        return os.path.join(self.output_dir, filename)
+
+    def add(self, report):
+        """Folds one report into the totals and appends it to the streaming outputs."""
+        key = rank_key(report)
+        entry = {
+            "name": report.get("name", "Unknown"),
+            "score": _score(report),
+            "classification": report.get("classification", "N/A"),
+            "reproducible": bool(report.get("reproducible", False)),
+            "demo": bool(report.get("presentation_link_detected", False)),
+            "notes": report.get("notes_for_judges", ""),
+            "offset": self.reports_file.tell(),
+        }
+        self.count += 1
+        self.score_total += entry["score"]
+        self.reproducible_builds += entry["reproducible"]
+        self.demo_links += entry["demo"]
+        self.deductions_applied += bool(report.get("penalties_applied"))
+        gitleaks = report.get("risks", {}).get("gitleaks", [])
+        self.security_alerts += len(gitleaks) if isinstance(gitleaks, list) else 0
+
+        item = (key, -self.count, entry)
+        if len(self.leaders) < self.leaderboard_size:
+            heapq.heappush(self.leaders, item)
+        elif item[:2] > self.leaders[0][:2]:
+            heapq.heapreplace(self.leaders, item)
+        self.rows.append((key, -self.count, {k: v for k, v in entry.items() if k != "notes"}))
+
+        self.reports_file.write(json.dumps(report).encode() + b"\n")
+        self.summary_writer.writerow({
+            "repo_name": entry["name"],
+            "path": report.get("id", "Unknown"),
+            "weighted_score_percent": entry["score"],
+            "classification": _as_text(entry["classification"]),
+            "top_line_summary": _as_text(entry["notes"]),
+            "reproducible": entry["reproducible"],
+        })
+        for tool, findings in report.get("risks", {}).items():
+            if isinstance(findings, list):
+                for finding in findings:
+                    self.anomalies_writer.writerow({
+                        "repo_name": entry["name"],
+                        "tool": tool,
+                        "description": finding.get("Description", "N/A"),
+                        "details": json.dumps(finding)
+                    })
+        for f in (self.summary_file, self.anomalies_file, self.reports_file):
+            f.flush()
+        if self.live:
+            self.write_live_summaries()
+
+    def add_report_file(self, path):
+        with open(path, "r") as f:
+            self.add(json.load(f))
+
+    def leaderboard(self):
+        return [entry for _, _, entry in sorted(self.leaders, reverse=True)]
+
+    def write_live_summaries(self):
+        """Rewrites the files that depend only on the totals and the leaderboard."""
+        leaders = self.leaderboard()
+        average = self.score_total / self.count if self.count else 0.0
+
+        # --- Create top10_by_score.md ---
+        with open(self._path("top10_by_score.md"), "w") as f:
+            f.write("# Top 10 Repositories by Score\n\n")
+            for i, entry in enumerate(leaders[:10]):
+                f.write(f"{i+1}. {entry['name']} - {entry['score']:.2f}%\n")
+
+        # --- Create winners_recommendation.md ---
+        with open(self._path("winners_recommendation.md"), "w") as f:
+            f.write("# Winners Recommendation\n\n")
+            for i, entry in enumerate(leaders[:WINNERS_COUNT]):
+                f.write(f"## Rank {i+1}: {entry['name']}\n")
+                f.write(f"**Score:** {entry['score']:.2f}%\n")
+                f.write(f"**Justification:** {entry['notes']}\n\n")
+
+        # --- Create final_validation_report.md ---
+        with open(self._path("final_validation_report.md"), "w") as f:
+            f.write("### FINAL VALIDATION SUMMARY\n\n")
+            f.write(f"* Evaluation completed: {datetime.now().strftime('%Y-%m-%d %H:%M UTC')}\n")
+            f.write(f"* Total evaluated: {self.count}\n")
+            f.write(f"* Valid demo/presentation links: {self.demo_links}\n")
+            f.write(f"* Average weighted score: {average:.2f}\n")
+            f.write(f"* Reproducible builds: {self.reproducible_builds}\n")
+            f.write(f"* Evidence deductions applied: {self.deductions_applied} repos\n")
+            f.write(f"* Security alerts: {self.security_alerts}\n")
+            f.write(f"* Winners: {', '.join([e['name'] for e in leaders[:WINNERS_COUNT]])}\n")
+
+    def finalize(self):
+        """Writes the fully ranked outputs and closes the streaming files."""
+        for f in (self.summary_file, self.anomalies_file, self.reports_file):
+            f.close()
+        ranked = [entry for _, _, entry in sorted(self.rows, key=lambda row: row[:2], reverse=True)]
+        count = max(self.count, 1)
+
+        # --- Create full_report.json, copying each report line from the JSONL in rank order ---
+        with open(self._path("full_report.jsonl"), "rb") as source, \
+                open(self._path("full_report.json"), "wb") as f:
+            f.write(b"[")
+            for i, entry in enumerate(ranked):
+                source.seek(entry["offset"])
+                f.write((b",\n" if i else b"\n") + source.readline().rstrip(b"\n"))
+            f.write(b"\n]\n")
+
+        # --- Create overall_report.md ---
+        with open(self._path("overall_report.md"), "w") as f:
+            f.write("# Overall Hackathon Evaluation Report\n\n")
+            f.write("## Summary\n")
+            f.write(f"- **Total Repositories Evaluated:** {self.count}\n")
+            f.write(f"- **Average Score:** {self.score_total / count:.2f}%\n")
+            f.write(f"- **Reproducible Builds:** {self.reproducible_builds} ({self.reproducible_builds/count:.1%})\n")
+            f.write(f"- **Projects with Demo Links:** {self.demo_links} ({self.demo_links/count:.1%})\n\n")
+
+            f.write("## Full Summary Table\n")
+            f.write("| Rank | Repository | Score | Classification | Reproducible | Demo |\n")
+            f.write("|------|------------|-------|----------------|--------------|------|\n")
+            for i, entry in enumerate(ranked):
+                f.write(f"| {i+1} | {entry['name']} | {entry['score']:.2f}% | {entry['classification']} | {'Yes' if entry['reproducible'] else 'No'} | {'Yes' if entry['demo'] else 'No'} |\n")
+
+        self.write_live_summaries()
+
+def report_paths(output_dir, skip_names=()):
+    """Paths of the report JSON files in output_dir/reports, minus the skipped repo names."""
+    reports_dir = os.path.join(output_dir, "reports")
+    for filename in sorted(os.listdir(reports_dir)):
+        if filename.endswith(".json") and filename[:-len(".json")] not in skip_names:
+            yield os.path.join(reports_dir, filename)
+
+def create_summary_reports(output_dir):
+    """Creates summary reports from individual JSON reports."""
+    aggregator = SummaryAggregator(output_dir, live=False)
+    for path in report_paths(output_dir):
+        aggregator.add_report_file(path)
+    aggregator.finalize()
 
 def main():
     if len(sys.argv) != 2:
@@ -0,0 +1,174 @@
+import functools
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from datetime import datetime
+
+from repo_scanner import DEFAULT_PRUNE_DIRS
+
+# ==============================================================================
+#  CONTENT-ADDRESSED EVALUATION CACHE
+# ==============================================================================
+#
+#  Stores the result of every evaluation stage on disk under a key derived from
+#  the repository's tree hash, the evaluator version, the stage's own
+#  configuration and the keys of the stages it consumes. Re-running with the
+#  same inputs skips the stage; changing scoring weights therefore needs no
+#  pip install, docker build, bandit scan or Gemini call at all.
+#
+#  Layout:
+#    <cache_dir>/stages/<key[:2]>/<key>.json   one stage result
+#    <cache_dir>/runs/<repo_name>.json         stage keys of the latest run
+#
+# ==============================================================================
+
+# Files larger than this are identified by size and mtime instead of being
+# hashed in full, so multi-gigabyte model weights do not dominate hashing.
+FULL_HASH_MAX_BYTES = 64 * 1024 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def _run_git(repo_path, *args):
+    return subprocess.run(
+        ["git", "-C", repo_path, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+def _is_pruned(relative_path):
+    return any(part in DEFAULT_PRUNE_DIRS for part in relative_path.split("/"))
+
+def _git_tree_hash(repo_path):
+    """Returns the committed tree id of repo_path, or None if it has local changes.
+
+    Gitignored files count as changes: the scanner and bandit read them
+    (.env files, model weights, generated configs) but the tree id does not
+    cover them.
+    """
+    try:
+        tree = _run_git(repo_path, "rev-parse", "HEAD:./").strip()
+        status = _run_git(repo_path, "status", "--porcelain", "--ignored", ".")
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    # Build artifacts (node_modules, caches) must not turn a clean repo dirty.
+    changed = [line[3:] for line in status.splitlines() if line.strip()]
+    if any(not _is_pruned(path.strip('"')) for path in changed):
+        return None
+    return tree
+
+def _content_hash(repo_path):
+    """Hashes every non-pruned file path and its contents."""
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(repo_path):
+        dirnames[:] = sorted(d for d in dirnames if d not in DEFAULT_PRUNE_DIRS)
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            digest.update(os.path.relpath(path, repo_path).encode() + b"\0")
+            stat = os.stat(path)
+            if stat.st_size > FULL_HASH_MAX_BYTES:
+                digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+                continue
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                    digest.update(chunk)
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def tool_version(command):
+    """First line of a tool's version output (e.g. "bandit --version"), or None if it cannot run.
+
+    Goes into the cache config of stages that run the tool, so upgrading it
+    invalidates their results. Cached for the life of the process.
+    """
+    try:
+        completed = subprocess.run(command.split(), capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    output = (completed.stdout or completed.stderr).strip()
+    return output.splitlines()[0] if output else None
+
+def repo_tree_hash(repo_path):
+    """Identifies the repository's contents: its git tree id when clean, else a content hash."""
+    tree = _git_tree_hash(repo_path)
+    if tree:
+        return f"git:{tree}"
+    return f"sha256:{_content_hash(repo_path)}"
+
+def _atomic_write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+class EvaluationCache:
+    """On-disk store of stage results keyed by content and configuration."""
+
+    def __init__(self, cache_dir, version):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    def stage_key(self, root_key, stage_name, config, dependency_keys):
+        """Derives a stage's key from the repo key, its config and its dependencies' keys."""
+        material = json.dumps(
+            [self.version, root_key, stage_name, config, dependency_keys],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _stage_path(self, key):
+        return os.path.join(self.cache_dir, "stages", key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Returns (True, result) on a hit and (False, None) on a miss."""
+        try:
+            with open(self._stage_path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, entry["result"]
+
+    def put(self, key, stage_name, result):
+        _atomic_write_json(self._stage_path(key), {
+            "stage": stage_name,
+            "created_at": datetime.now().isoformat(),
+            "result": result,
+        })
+
+    def _run_path(self, repo_name):
+        return os.path.join(self.cache_dir, "runs", f"{repo_name}.json")
+
+    def write_run(self, repo_name, run):
+        """Records which stage entries make up the latest run of a repository."""
+        _atomic_write_json(self._run_path(repo_name), run)
+
+    def read_run(self, repo_name):
+        with open(self._run_path(repo_name), "r") as f:
+            return json.load(f)
+
+    def list_runs(self):
+        runs_dir = os.path.join(self.cache_dir, "runs")
+        if not os.path.isdir(runs_dir):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(runs_dir) if name.endswith(".json"))
+
+    def load_run_results(self, repo_name):
+        """Loads every cached stage result of a repository's latest run."""
+        run = self.read_run(repo_name)
+        results = {}
+        for stage_name, key in run["stage_keys"].items():
+            hit, result = self.get(key)
+            if not hit:
+                raise KeyError(f"Cached result for stage '{stage_name}' of {repo_name} is missing.")
+            results[stage_name] = result
+        return run, results
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+from collections import Counter, OrderedDict
+
+# ==============================================================================
+#  TOKEN-BUDGETED EVIDENCE PACKING
+# ==============================================================================
+#
+#  Turns the evidence dict into the context block of the Gemini prompt. Each
+#  section is summarised first (bandit findings deduplicated by test id, grep
+#  hits collapsed per file, a few representative source files sampled) and the
+#  sections are then added in priority order until the token budget is spent.
+#  The old approach dumped everything and cut the string at 25,000 characters,
+#  which usually left the bandit JSON and nothing else.
+#
+# ==============================================================================
+
+PACKER_VERSION = 1
+PROMPT_TOKEN_BUDGET = 6000
+# Rough but stable for English text and code; used only for budgeting.
+CHARS_PER_TOKEN = 4
+# A section that would get fewer tokens than this is dropped, not truncated.
+MIN_SECTION_TOKENS = 80
+
+MAX_EXAMPLES_PER_FILE = 3
+MAX_KEYWORD_FILES = 25
+MAX_BANDIT_LOCATIONS = 3
+MAX_LISTED_MODEL_FILES = 10
+SAMPLE_FILE_COUNT = 4
+SAMPLE_CHARS_PER_FILE = 1500
+SAMPLE_EXTENSIONS = (".py", ".js", ".jsx", ".ts", ".tsx", ".java", ".go", ".rb")
+ENTRYPOINT_NAMES = ("main.py", "app.py", "server.py", "api.py", "index.js", "server.js", "app.js")
+README_NAMES = ("README.md", "README.rst", "README.txt", "README")
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _relative(path, repo_path):
+    try:
+        return os.path.relpath(path, repo_path)
+    except ValueError:
+        return path
+
+def summarize_keyword_hits(hits, repo_path):
+    """Collapses grep-style hits to one entry per file, busiest files first."""
+    by_file = OrderedDict()
+    for hit in hits:
+        by_file.setdefault(hit["path"], []).append(hit)
+    files = sorted(by_file.items(), key=lambda item: len(item[1]), reverse=True)
+    lines = [f"{len(hits)} matching lines in {len(files)} files."]
+    for path, file_hits in files[:MAX_KEYWORD_FILES]:
+        lines.append(f"- {_relative(path, repo_path)} ({len(file_hits)} lines)")
+        for hit in file_hits[:MAX_EXAMPLES_PER_FILE]:
+            lines.append(f"    L{hit['line']}: {hit['text'].strip()[:160]}")
+    if len(files) > MAX_KEYWORD_FILES:
+        lines.append(f"- ... {len(files) - MAX_KEYWORD_FILES} more files")
+    return "\n".join(lines)
+
+def summarize_bandit(bandit, repo_path):
+    """Deduplicates bandit findings by test id with counts and a few locations."""
+    if not isinstance(bandit, dict):
+        return str(bandit)
+    groups = OrderedDict()
+    for result in bandit.get("results", []):
+        groups.setdefault(result.get("test_id", "?"), []).append(result)
+    if not groups:
+        return "Bandit: no findings."
+    severity_rank = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
+    ordered = sorted(
+        groups.items(),
+        key=lambda item: (min(severity_rank.get(r.get("issue_severity"), 3) for r in item[1]), -len(item[1])),
+    )
+    lines = [f"Bandit: {sum(len(r) for r in groups.values())} findings, {len(groups)} distinct issues."]
+    for test_id, results in ordered:
+        first = results[0]
+        severities = Counter(r.get("issue_severity", "?") for r in results)
+        locations = ", ".join(
+            f"{_relative(r.get('filename', '?'), repo_path)}:{r.get('line_number', '?')}"
+            for r in results[:MAX_BANDIT_LOCATIONS]
+        )
+        lines.append(
+            f"- {test_id} {first.get('test_name', '')} x{len(results)} "
+            f"({', '.join(f'{k}={v}' for k, v in severities.items())}): "
+            f"{first.get('issue_text', '')} e.g. {locations}"
+        )
+    return "\n".join(lines)
+
+def summarize_gitleaks(gitleaks, repo_path):
+    """Counts gitleaks findings per rule; secret values are never included."""
+    if not isinstance(gitleaks, list):
+        return f"Gitleaks: {gitleaks}"
+    if not gitleaks:
+        return "Gitleaks: no findings."
+    rules = Counter(finding.get("RuleID", "unknown") for finding in gitleaks)
+    files = sorted({_relative(finding.get("File", "?"), repo_path) for finding in gitleaks})
+    lines = [f"Gitleaks: {len(gitleaks)} potential secrets."]
+    lines.extend(f"- {rule} x{count}" for rule, count in rules.most_common())
+    lines.append(f"Files: {', '.join(files[:10])}{' ...' if len(files) > 10 else ''}")
+    return "\n".join(lines)
+
+def summarize_security(risks, repo_path):
+    parts = []
+    if "bandit" in risks:
+        parts.append(summarize_bandit(risks["bandit"], repo_path))
+    if "gitleaks" in risks:
+        parts.append(summarize_gitleaks(risks["gitleaks"], repo_path))
+    license_info = risks.get("license", {})
+    if license_info.get("detected"):
+        names = ", ".join(_relative(path, repo_path) for path in license_info.get("files", []))
+        parts.append(f"License files: {names}")
+    else:
+        parts.append("License files: none found")
+    return "\n".join(parts)
+
+def summarize_model_runtime(validation, repo_path):
+    details = validation.get("model_files_details", [])
+    lines = [
+        f"Host recommendation: {validation.get('host_recommendation', 'CPU')}",
+        f"GPU detected: {validation.get('gpu_detected', False)} ({validation.get('gpu_info', 'no-gpu')})",
+        f"Model files: {len(details)} totalling {sum(d['size_mb'] for d in details)} MB",
+    ]
+    for detail in sorted(details, key=lambda d: d["size_mb"], reverse=True)[:MAX_LISTED_MODEL_FILES]:
+        lines.append(f"- {_relative(detail['path'], repo_path)} ({detail['size_mb']} MB)")
+    return "\n".join(lines)
+
+def pick_sample_files(repo_path, keyword_hits):
+    """The README, the files that use AI libraries most, and conventional entrypoints."""
+    candidates = []
+    for name in README_NAMES:
+        path = os.path.join(repo_path, name)
+        if os.path.isfile(path):
+            candidates.append(path)
+            break
+    hit_counts = Counter(
+        hit["path"] for hit in keyword_hits if hit["path"].endswith(SAMPLE_EXTENSIONS)
+    )
+    candidates.extend(path for path, _ in hit_counts.most_common())
+    for name in ENTRYPOINT_NAMES:
+        path = os.path.join(repo_path, name)
+        if os.path.isfile(path):
+            candidates.append(path)
+
+    picked = []
+    for path in candidates:
+        if path not in picked:
+            picked.append(path)
+        if len(picked) == SAMPLE_FILE_COUNT:
+            break
+    return picked
+
+def sample_source_files(repo_path, keyword_hits):
+    blocks = []
+    for path in pick_sample_files(repo_path, keyword_hits):
+        try:
+            with open(path, "r", errors="replace") as f:
+                head = f.read(SAMPLE_CHARS_PER_FILE)
+        except OSError:
+            continue
+        blocks.append(f"### {_relative(path, repo_path)}\n{head.rstrip()}")
+    return "\n\n".join(blocks)
+
+def build_sections(evidence, repo_path):
+    """Returns (priority, title, text) for every section; lower priority is packed first."""
+    keyword_hits = evidence.get("ai_keyword_hits", [])
+    sections = [
+        (0, "Build and Test Results", f"Reproducible: {evidence.get('reproducible', False)}"),
+        (1, "AI Library Usage (grep hits collapsed per file)",
+            summarize_keyword_hits(keyword_hits, repo_path) if keyword_hits else "No AI library references found."),
+        (2, "Model & Runtime Validation",
+            summarize_model_runtime(evidence.get("model_runtime_validation", {}), repo_path)),
+        (3, "Representative Source Files", sample_source_files(repo_path, keyword_hits)),
+        (4, "File Listing", evidence.get("file_listing", "")),
+        (5, "Security Scan Summary", summarize_security(evidence.get("risks", {}), repo_path)),
+        (6, "Presentation Link Excerpts", evidence.get("presentation_link_excerpt") or "None found."),
+        (7, "Git Log", evidence.get("git_log", "")),
+    ]
+    return [section for section in sections if section[2]]
+
+def pack_evidence(evidence, repo_path, token_budget=PROMPT_TOKEN_BUDGET):
+    """Packs the evidence into a context block that fits the token budget.
+
+    Returns {"text", "estimated_tokens", "token_budget", "sections"} where
+    sections records what was included, truncated or dropped.
+    """
+    header = f"Repository: {os.path.basename(os.path.normpath(repo_path))}\n"
+    remaining = token_budget - estimate_tokens(header)
+    blocks = [header]
+    report = []
+    for priority, title, text in sorted(build_sections(evidence, repo_path)):
+        block = f"\n## {title}\n{text}\n"
+        tokens = estimate_tokens(block)
+        if tokens <= remaining:
+            status = "included"
+        elif remaining >= MIN_SECTION_TOKENS:
+            marker = "\n[... truncated to fit the evidence budget]\n"
+            block = block[:(remaining - estimate_tokens(marker)) * CHARS_PER_TOKEN] + marker
+            status = "truncated"
+        else:
+            report.append({"section": title, "status": "dropped", "tokens": tokens})
+            continue
+        remaining -= estimate_tokens(block)
+        blocks.append(block)
+        report.append({"section": title, "status": status, "tokens": estimate_tokens(block)})
+
+    text = "".join(blocks)
+    return {
+        "text": text,
+        "estimated_tokens": estimate_tokens(text),
+        "token_budget": token_budget,
+        "sections": report,
+    }
+
+def packing_config(token_budget=PROMPT_TOKEN_BUDGET):
+    """Settings that change the packed prompt, for the AI stage's cache key.
+
+    Pass the token_budget given to pack_evidence, so a run with another
+    budget does not replay prompts packed for the old one.
+    """
+    return {"packer_version": PACKER_VERSION, "token_budget": token_budget}
+
+def log_packed_prompt(log_file, prompt, packed):
+    """Writes the exact prompt sent to the model, with the packing report."""
+    log_file.write("--- Packed evidence ---\n")
+    log_file.write(json.dumps({k: v for k, v in packed.items() if k != "text"}, indent=2))
+    log_file.write(f"\n--- Prompt (sha256 {hashlib.sha256(prompt.encode()).hexdigest()}) ---\n")
+    log_file.write(prompt)
+    log_file.write("\n--- End of prompt ---\n\n")
@@ -67,6 +67,20 @@ CREATE TABLE IF NOT EXISTS disease_references (
 )
 """)
 
+# Child tables are always looked up by disease
+for table in ("symptoms", "tests", "drugs", "keywords", "disease_references"):
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_disease ON {table}(disease_id)")
+
+# Precomputed document text, filled in by the vector store's build_index
+c.execute("""
+CREATE TABLE IF NOT EXISTS disease_documents (
+    disease_id TEXT PRIMARY KEY,
+    short TEXT,
+    detailed_text TEXT,
+    updated_at TIMESTAMP
+)
+""")
+
 # ------------------
 # Full KB Data
 # ------------------
@@ -175,3 +189,14 @@ for d in diseases:
 conn.commit()
 conn.close()
 print("✅ Permanent full KB created: app/db/kb_full.db")
+
+# ------------------
+# Bring the search index up to date: only new or changed diseases are
+# re-embedded and removed ones are dropped (a full build if none exists yet)
+# ------------------
+try:
+    from app.chatbot.vector_store import KBVectorStore
+except ImportError as e:
+    print("⚠️ Vector index not refreshed (vector store unavailable):", e)
+else:
+    KBVectorStore(db_path="app/db/kb_full.db").refresh()
@@ -0,0 +1,158 @@
+# app/chatbot/test_vector_store.py
+import hashlib
+import re
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.chatbot import vector_store
+from app.chatbot.vector_store import KBVectorStore
+
+KB_TABLES = """
+CREATE TABLE diseases (disease_id TEXT PRIMARY KEY, name TEXT, organ TEXT, description TEXT, red_flags TEXT,
+                       recommended_tests TEXT, suggested_measures TEXT, created_at TIMESTAMP, updated_at TIMESTAMP);
+CREATE TABLE symptoms (id INTEGER PRIMARY KEY AUTOINCREMENT, disease_id TEXT, symptom TEXT);
+CREATE TABLE tests (id INTEGER PRIMARY KEY AUTOINCREMENT, disease_id TEXT, test_name TEXT, details TEXT);
+CREATE TABLE drugs (id INTEGER PRIMARY KEY AUTOINCREMENT, disease_id TEXT, name TEXT, rxnorm_json TEXT, openfda_json TEXT);
+CREATE TABLE keywords (id INTEGER PRIMARY KEY AUTOINCREMENT, disease_id TEXT, keyword TEXT);
+CREATE TABLE disease_references (id INTEGER PRIMARY KEY AUTOINCREMENT, disease_id TEXT, source TEXT, url TEXT);
+"""
+
+
+class WordEncoder:
+    """
+    Stands in for the sentence-transformer: a normalized bag of hashed words,
+    so a query shares a direction with the documents that contain its words.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        vectors = np.zeros((len(texts), vector_store.DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z]+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % vector_store.DIM] += 1.0
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-6)
+
+
+def add_disease(db_path, disease_id, name, description, symptoms):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO diseases (disease_id, name, description) VALUES (?, ?, ?)", (disease_id, name, description))
+    conn.executemany("INSERT INTO symptoms (disease_id, symptom) VALUES (?, ?)", [(disease_id, s) for s in symptoms])
+    conn.commit()
+    conn.close()
+
+
+def run_sql(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def top_hit(store, query):
+    return store.search(query, top_k=1)[0]["disease_id"]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "SentenceTransformer", WordEncoder)
+    monkeypatch.setattr(vector_store, "VECTORS_PATH", str(tmp_path / "vectors.npy"))
+    monkeypatch.setattr(vector_store, "LEGACY_META_PATH", str(tmp_path / "meta.json"))
+    db_path = str(tmp_path / "kb.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(KB_TABLES)
+    conn.close()
+    add_disease(db_path, "D1", "Influenza", "Viral infection of the airways", ["fever", "cough", "aching muscles"])
+    add_disease(db_path, "D2", "Migraine", "Recurring throbbing headache", ["headache", "nausea", "light sensitivity"])
+    add_disease(db_path, "D3", "Gastritis", "Inflamed stomach lining", ["stomach pain", "bloating", "indigestion"])
+    store = KBVectorStore(db_path=db_path, index_path=str(tmp_path / "hnsw_index.bin"),
+                          meta_path=str(tmp_path / "meta.bin"), query_cache_size=0)
+    store.build_index()
+    return store
+
+
+def test_search_follows_inserts_updates_and_deletes(store):
+    assert top_hit(store, "fever and cough") == "D1"
+    assert top_hit(store, "throbbing headache") == "D2"
+    assert top_hit(store, "stomach bloating") == "D3"
+
+    add_disease(store.db_path, "D4", "Conjunctivitis", "Pink eye", ["red itchy eyes", "watery discharge"])
+    store.refresh()
+    assert top_hit(store, "itchy red eyes") == "D4"
+    assert top_hit(store, "fever and cough") == "D1"
+    assert {hit["disease_id"] for hit in store.search("eyes", top_k=10)} == {"D1", "D2", "D3", "D4"}
+
+    run_sql(store.db_path, "UPDATE symptoms SET symptom = 'tinnitus' WHERE symptom = 'headache'")
+    run_sql(store.db_path, "UPDATE diseases SET description = 'Ringing ears' WHERE disease_id = 'D2'")
+    store.refresh()
+    assert top_hit(store, "ringing ears tinnitus") == "D2"
+    assert "tinnitus" in store.search("ringing ears tinnitus", top_k=1)[0]["detailed"]
+    assert store._num_elements == 4
+
+    run_sql(store.db_path, "DELETE FROM diseases WHERE disease_id = 'D3'")
+    store.refresh()
+    hits = store.search("stomach bloating", top_k=10)
+    assert [hit["disease_id"] for hit in hits if hit["disease_id"] == "D3"] == []
+    assert len(hits) == 3
+    assert store._tombstones == 1
+
+
+def test_unchanged_kb_is_not_re_embedded(store):
+    calls = store.model.calls
+    store.refresh()
+    assert store.model.calls == calls
+
+
+def test_updates_survive_a_reload_from_disk(store):
+    add_disease(store.db_path, "D4", "Conjunctivitis", "Pink eye", ["red itchy eyes"])
+    run_sql(store.db_path, "DELETE FROM diseases WHERE disease_id = 'D1'")
+    store.refresh()
+
+    reloaded = KBVectorStore(db_path=store.db_path, index_path=store.index_path, meta_path=store.meta_path,
+                             query_cache_size=0)
+    assert top_hit(reloaded, "itchy red eyes") == "D4"
+    assert "D1" not in {hit["disease_id"] for hit in reloaded.search("fever cough", top_k=10)}
+
+
+def test_compaction_drops_tombstones_and_keeps_results(store):
+    for i in range(5, 10):
+        add_disease(store.db_path, f"D{i}", f"Condition {i}", f"placeholder{i} condition", [f"marker{i}"])
+    store.refresh()
+    for i in range(5, 9):
+        run_sql(store.db_path, "DELETE FROM diseases WHERE disease_id = ?", (f"D{i}",))
+    store.refresh()
+    assert store._tombstones == 4
+    before = {query: top_hit(store, query) for query in ("fever and cough", "throbbing headache", "marker9")}
+
+    store.compact()
+    assert store._tombstones == 0
+    assert store._num_elements == len(store.id_to_meta) == 4
+    assert {query: top_hit(store, query) for query in before} == before == {
+        "fever and cough": "D1", "throbbing headache": "D2", "marker9": "D9"}
+
+    run_sql(store.db_path, "DELETE FROM diseases WHERE disease_id = 'D9'")
+    add_disease(store.db_path, "D10", "Sinusitis", "Blocked sinuses", ["facial pressure"])
+    store.refresh()
+    assert top_hit(store, "facial pressure") == "D10"
+    assert "D9" not in {hit["disease_id"] for hit in store.search("marker9", top_k=10)}
+
+
+def test_files_are_written_without_blocking_searches(store, monkeypatch):
+    write_metadata = vector_store.write_metadata
+    locked_during_write = []
+
+    def checked_write(*args):
+        locked_during_write.append(vector_store._lock.locked())
+        write_metadata(*args)
+
+    monkeypatch.setattr(vector_store, "write_metadata", checked_write)
+    add_disease(store.db_path, "D4", "Conjunctivitis", "Pink eye", ["red itchy eyes"])
+    store.refresh()
+    run_sql(store.db_path, "DELETE FROM diseases WHERE disease_id = 'D4'")
+    store.refresh()
+    store.compact()
+    assert locked_during_write == [False, False, False]
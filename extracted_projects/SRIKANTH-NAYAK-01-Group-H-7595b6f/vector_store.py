@@ -1,8 +1,14 @@
 # app/chatbot/vector_store.py
 import os
 import json
+import hashlib
+import mmap
 import sqlite3
+import struct
 import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from datetime import datetime
 from typing import List, Tuple, Dict, Optional
 
 import numpy as np
@@ -15,7 +21,8 @@ from app.config import settings
 INDEX_DIR = os.path.join(os.path.dirname(__file__), "kb_index")
 os.makedirs(INDEX_DIR, exist_ok=True)
 INDEX_PATH = os.path.join(INDEX_DIR, "hnsw_index.bin")
-META_PATH = os.path.join(INDEX_DIR, "meta.json")
+META_PATH = os.path.join(INDEX_DIR, "meta.bin")
+LEGACY_META_PATH = os.path.join(INDEX_DIR, "meta.json")
 VECTORS_PATH = os.path.join(INDEX_DIR, "vectors.npy")
 
 # Configs
@@ -26,9 +33,109 @@ M = 32
 EF_CONSTRUCTION = 200
 EF_SEARCH = 50
 TOP_K_DEFAULT = 3
+# Grow the graph geometrically so a run of single inserts does not resize every time
+INDEX_GROWTH = 1.5
+# Compact once deleted elements exceed this share of live ones (and this count)
+COMPACT_TOMBSTONE_RATIO = 0.2
+COMPACT_MIN_TOMBSTONES = 16
+# Repeated questions skip the embedding model; the index itself is unaffected
+QUERY_CACHE_SIZE = 1024
 
 _lock = threading.Lock()
 
+# Child tables are always read by disease_id; the side table holds the
+# precomputed detailed text for each disease so search reads one row per hit.
+KB_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_symptoms_disease ON symptoms(disease_id);
+CREATE INDEX IF NOT EXISTS idx_tests_disease ON tests(disease_id);
+CREATE INDEX IF NOT EXISTS idx_drugs_disease ON drugs(disease_id);
+CREATE INDEX IF NOT EXISTS idx_keywords_disease ON keywords(disease_id);
+CREATE INDEX IF NOT EXISTS idx_disease_references_disease ON disease_references(disease_id);
+CREATE TABLE IF NOT EXISTS disease_documents (
+    disease_id TEXT PRIMARY KEY,
+    short TEXT,
+    detailed_text TEXT,
+    updated_at TIMESTAMP
+);
+"""
+
+
+def _ensure_kb_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(KB_SCHEMA)
+
+
+def _meta_of(doc: dict) -> dict:
+    return {"id": doc["id"], "name": doc["name"], "short": doc["short"], "hash": doc["hash"]}
+
+
+def _replace_file(path: str, write) -> None:
+    """
+    Write via a temp file and rename, so processes that have the old file
+    memory-mapped keep a valid mapping.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+# ---------------------
+# Memory-mapped metadata
+# ---------------------
+# Layout: header | labels (int64, sorted) | offsets (uint64, count + 1) | records
+# Each record is one metadata dict as compact JSON. Lookups binary-search the
+# label column and decode only the hits, so every worker process shares the
+# file through the page cache instead of holding its own dict of dicts.
+META_MAGIC = b"KBMETA01"
+META_HEADER = struct.Struct("<8sQQQ")  # magic, count, num_elements, tombstones
+
+
+def write_metadata(path: str, metas: Dict[int, dict], num_elements: int, tombstones: int) -> None:
+    labels = sorted(metas)
+    records = [json.dumps(metas[label], ensure_ascii=False, separators=(",", ":")).encode("utf-8") for label in labels]
+    offsets = np.zeros(len(records) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(r) for r in records], dtype="<u8")
+
+    def write(f):
+        f.write(META_HEADER.pack(META_MAGIC, len(labels), num_elements, tombstones))
+        f.write(np.asarray(labels, dtype="<i8").tobytes())
+        f.write(offsets.tobytes())
+        f.write(b"".join(records))
+
+    _replace_file(path, write)
+
+
+class MappedMetadata(Mapping):
+    """
+    Read-only label -> metadata mapping backed by a file written with write_metadata.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, self.num_elements, self.tombstones = META_HEADER.unpack_from(self._mm, 0)
+        if magic != META_MAGIC:
+            raise ValueError(f"{path} is not a KB metadata file")
+        pos = META_HEADER.size
+        self._labels = np.frombuffer(self._mm, dtype="<i8", count=count, offset=pos)
+        pos += 8 * count
+        self._offsets = np.frombuffer(self._mm, dtype="<u8", count=count + 1, offset=pos)
+        self._records_start = pos + 8 * (count + 1)
+
+    def __getitem__(self, label: int) -> dict:
+        i = int(np.searchsorted(self._labels, label))
+        if i == len(self._labels) or self._labels[i] != label:
+            raise KeyError(label)
+        start = self._records_start + int(self._offsets[i])
+        end = self._records_start + int(self._offsets[i + 1])
+        return json.loads(self._mm[start:end])
+
+    def __iter__(self):
+        return (int(label) for label in self._labels)
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
 
 class KBVectorStore:
     """
@@ -37,48 +144,97 @@ class KBVectorStore:
     - Persists index + metadata to disk.
     """
 
-    def __init__(self, db_path: Optional[str] = None, index_path: str = INDEX_PATH, meta_path: str = META_PATH):
+    def __init__(self, db_path: Optional[str] = None, index_path: str = INDEX_PATH, meta_path: str = META_PATH,
+                 query_cache_size: int = QUERY_CACHE_SIZE):
         self.db_path = db_path or getattr(settings, "KB_DB_PATH", settings.KB_DB_PATH)
         self.index_path = index_path
         self.meta_path = meta_path
         self.model = SentenceTransformer(f"sentence-transformers/{EMBEDDING_MODEL}")
         self.dim = DIM
         self.index: Optional[hnswlib.Index] = None
-        self.id_to_meta: Dict[int, dict] = {}
+        # a plain dict while building, a MappedMetadata once saved or loaded
+        self.id_to_meta: Mapping = {}
         self._loaded = False
+        # KB_SCHEMA is applied once per store, on the first write
+        self._schema_ready = False
+        # labels handed out so far (live + tombstoned); the next new label
         self._num_elements = 0
+        self._tombstones = 0
+        # bumped on every change, so a background compaction can tell it is stale
+        self._version = 0
+        self._compacting = False
+        self._compaction_guard = threading.Lock()
+        # held by whoever changes the index (build, update, compaction swap), so
+        # the index only changes under it; searches only wait on _lock, which is
+        # held just for graph edits and swaps, never for encoding or file writes
+        self._build_guard = threading.Lock()
+        # query text -> embedding, least recently used first
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self._query_cache_hits = 0
+        self._query_cache_misses = 0
 
     # ---------------------
     # DB reading / document assembly
     # ---------------------
-    def _fetch_all_diseases(self) -> List[dict]:
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _ensure_schema(self) -> None:
+        """
+        Create the child-table indexes and the disease_documents side table
+        (DDL, which commits) once, from the build and write paths only; read
+        connections never run it.
+        """
+        if self._schema_ready or not os.path.exists(self.db_path):
+            return
+        conn = self._connect()
+        try:
+            _ensure_kb_schema(conn)
+        finally:
+            conn.close()
+        self._schema_ready = True
+
+    def _fetch_all_diseases(self, disease_ids: Optional[List[str]] = None) -> List[dict]:
+        """
+        Assemble disease documents with one query per table (not per disease).
+        Pass disease_ids to load only those diseases.
+        """
         if not os.path.exists(self.db_path):
             return []
 
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT disease_id, name, description, red_flags, recommended_tests, suggested_measures, created_at FROM diseases")
+        where, params = "", ()
+        if disease_ids is not None:
+            if not disease_ids:
+                conn.close()
+                return []
+            where = f" WHERE disease_id IN ({','.join('?' * len(disease_ids))})"
+            params = tuple(disease_ids)
+
+        def grouped(sql: str) -> Dict[str, list]:
+            # child rows keyed by disease_id, in insertion order
+            groups: Dict[str, list] = defaultdict(list)
+            for row in cursor.execute(sql + where + " ORDER BY disease_id, id", params):
+                groups[row[0]].append(row[1:])
+            return groups
+
+        symptoms = grouped("SELECT disease_id, symptom FROM symptoms")
+        drugs = grouped("SELECT disease_id, name, rxnorm_json, openfda_json FROM drugs")
+        tests = grouped("SELECT disease_id, test_name, details FROM tests")
+        keywords = grouped("SELECT disease_id, keyword FROM keywords")
+        references = grouped("SELECT disease_id, source, url FROM disease_references")
+
+        cursor.execute("SELECT disease_id, name, description, red_flags, recommended_tests, suggested_measures, created_at FROM diseases" + where, params)
         rows = cursor.fetchall()
+        conn.close()
 
         docs = []
         for row in rows:
             disease_id, name, description, red_flags, tests_json, measures_json, created_at = row
-            # fetch related tables
-            cursor.execute("SELECT symptom FROM symptoms WHERE disease_id = ?", (disease_id,))
-            symptoms = [r[0] for r in cursor.fetchall()]
-
-            cursor.execute("SELECT name, rxnorm_json, openfda_json FROM drugs WHERE disease_id = ?", (disease_id,))
-            drugs = [{"name": r[0], "rxnorm": json.loads(r[1]) if r[1] else {}, "openfda": json.loads(r[2]) if r[2] else {}} for r in cursor.fetchall()]
-
-            cursor.execute("SELECT test_name, details FROM tests WHERE disease_id = ?", (disease_id,))
-            tests = [{"name": r[0], "details": r[1]} for r in cursor.fetchall()]
-
-            cursor.execute("SELECT keyword FROM keywords WHERE disease_id = ?", (disease_id,))
-            keywords = [r[0] for r in cursor.fetchall()]
-
-            cursor.execute("SELECT source, url FROM disease_references WHERE disease_id = ?", (disease_id,))
-            references = [{"source": r[0], "url": r[1]} for r in cursor.fetchall()]
 
             # recommended_tests / measures could be JSON in db; try to load
             try:
@@ -96,17 +252,38 @@ class KBVectorStore:
                 "name": name,
                 "description": description or "",
                 "red_flags": red_flags or "",
-                "symptoms": symptoms,
-                "tests": tests + recommended_tests_extra,
-                "measures": suggested_measures_extra + measures_json if isinstance(suggested_measures_extra, list) else suggested_measures_extra,
-                "drugs": drugs,
-                "keywords": keywords,
-                "references": references,
+                "symptoms": [r[0] for r in symptoms[disease_id]],
+                "tests": [{"name": r[0], "details": r[1]} for r in tests[disease_id]] + recommended_tests_extra,
+                "measures": suggested_measures_extra,
+                "drugs": [{"name": r[0], "rxnorm": json.loads(r[1]) if r[1] else {}, "openfda": json.loads(r[2]) if r[2] else {}} for r in drugs[disease_id]],
+                "keywords": [r[0] for r in keywords[disease_id]],
+                "references": [{"source": r[0], "url": r[1]} for r in references[disease_id]],
                 "created_at": created_at
             })
-        conn.close()
         return docs
 
+    def _delete_documents(self, disease_ids: List[str]) -> None:
+        if not disease_ids:
+            return
+        self._ensure_schema()
+        conn = self._connect()
+        conn.executemany("DELETE FROM disease_documents WHERE disease_id = ?", [(i,) for i in disease_ids])
+        conn.commit()
+        conn.close()
+
+    def _store_documents(self, documents: List[Tuple[str, str, str]]) -> None:
+        """
+        Persist (disease_id, short, detailed_text) so search never reassembles documents.
+        """
+        self._ensure_schema()
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO disease_documents (disease_id, short, detailed_text, updated_at) VALUES (?, ?, ?, ?)",
+            [(disease_id, short, detailed, datetime.now()) for disease_id, short, detailed in documents],
+        )
+        conn.commit()
+        conn.close()
+
     def _make_documents(self, disease_entry: dict) -> Tuple[str, str]:
         """
         Returns (short_summary, detailed_text)
@@ -158,81 +335,305 @@ class KBVectorStore:
     # ---------------------
     # Index build / persistence
     # ---------------------
+    def _prepare_documents(self, docs: List[dict]) -> List[dict]:
+        """
+        Short/detailed text plus a content hash for each disease; the hash
+        decides whether a disease needs to be re-embedded.
+        """
+        prepared = []
+        for d in docs:
+            short, detailed = self._make_documents(d)
+            content_hash = hashlib.sha256(f"{EMBEDDING_MODEL}\n{detailed}".encode("utf-8")).hexdigest()
+            prepared.append({
+                "id": d["disease_id"],
+                "name": d["name"],
+                "short": short,
+                "detailed": detailed,
+                "hash": content_hash,
+            })
+        return prepared
+
     def build_index(self, rebuild: bool = False) -> None:
         """
-        Build or rebuild the HNSW index from the SQLite KB.
+        Build the HNSW index from the SQLite KB, or bring an existing one up to date.
+        Unless rebuild is set, only new or changed diseases are embedded and
+        removed ones are marked deleted. Embeddings are computed before the
+        index lock is taken, so searches keep running during an update.
+        """
+        self._ensure_schema()
+        with self._build_guard:
+            if not rebuild and (self._loaded or self._load_index()):
+                self._update_index()
+            else:
+                self._rebuild_index()
+        if self._tombstones > max(COMPACT_MIN_TOMBSTONES, COMPACT_TOMBSTONE_RATIO * len(self.id_to_meta)):
+            self._start_compaction()
+
+    def refresh(self) -> None:
+        """
+        Apply KB edits to the index: re-embed new or changed diseases and drop
+        removed ones. Call after changing the KB database (kb_builder does).
+        """
+        self.build_index(rebuild=False)
+
+    def _rebuild_index(self) -> None:
+        docs = self._prepare_documents(self._fetch_all_diseases())
+        if not docs:
+            print("[KBVectorStore] No diseases found in KB DB at", self.db_path)
+            return
+        self._store_documents([(d["id"], d["short"], d["detailed"]) for d in docs])
+
+        # Encode embeddings
+        print("[KBVectorStore] Encoding embeddings for", len(docs), "documents...")
+        vectors = self.model.encode([d["detailed"] for d in docs], show_progress_bar=True, convert_to_numpy=True)
+
+        # Initialize HNSW index
+        p = hnswlib.Index(space=SPACE, dim=self.dim)
+        p.init_index(max_elements=len(vectors), ef_construction=EF_CONSTRUCTION, M=M)
+        p.add_items(vectors, np.arange(len(vectors)))
+        p.set_ef(EF_SEARCH)
+
+        # assign to instance
+        with _lock:
+            self.index = p
+            self.id_to_meta = {i: _meta_of(d) for i, d in enumerate(docs)}
+            self._num_elements = len(vectors)
+            self._tombstones = 0
+            self._version += 1
+            self._loaded = True
+        self._save(vectors)
+        print("[KBVectorStore] Index built and saved:", self.index_path)
+
+    def _update_index(self) -> None:
+        """
+        Caller holds _build_guard, so the labels read here stay valid until
+        the update is applied.
         """
+        docs = self._prepare_documents(self._fetch_all_diseases())
+        current_ids = {d["id"] for d in docs}
+        metas = dict(self.id_to_meta)
+        label_of = {m["id"]: label for label, m in metas.items()}
+
+        changed = [d for d in docs if metas.get(label_of.get(d["id"]), {}).get("hash") != d["hash"]]
+        removed_ids = [disease_id for disease_id in label_of if disease_id not in current_ids]
+        if not changed and not removed_ids:
+            print("[KBVectorStore] Index is up to date.")
+            return
+
+        new_vectors = None
+        if changed:
+            print("[KBVectorStore] Encoding embeddings for", len(changed), "new or changed documents...")
+            new_vectors = self.model.encode([d["detailed"] for d in changed], convert_to_numpy=True)
+        self._apply_update(metas, label_of, changed, new_vectors, removed_ids)
+
+        if changed:
+            self._store_documents([(d["id"], d["short"], d["detailed"]) for d in changed])
+        self._delete_documents(removed_ids)
+        print(f"[KBVectorStore] Index updated: {len(changed)} upserted, {len(removed_ids)} deleted.")
+
+    def _apply_update(self, metas: Dict[int, dict], label_of: Dict[str, int], changed: List[dict],
+                      new_vectors: Optional[np.ndarray], removed_ids: List[str]) -> None:
+        """
+        Write already-encoded changes into the graph and persist them; caller
+        holds _build_guard. The vector copy and the file writes happen outside
+        _lock: searches only wait while the graph is edited and the new
+        metadata is swapped in.
+        """
+        num_elements = self._num_elements
+        labels = []
+        for d in changed:
+            label = label_of.get(d["id"])
+            if label is None:
+                # new diseases get fresh labels; changed ones keep theirs and
+                # add_items replaces the stored vector in place
+                label = num_elements
+                num_elements += 1
+            labels.append(label)
+            metas[label] = _meta_of(d)
+        removed_labels = [label_of[disease_id] for disease_id in removed_ids]
+        for label in removed_labels:
+            del metas[label]
+
+        # writable in-memory copy; only the maintenance path pays for it
+        vectors = np.array(self._load_vectors())
+        if num_elements > len(vectors):
+            vectors = np.vstack([vectors, np.zeros((num_elements - len(vectors), self.dim), dtype=vectors.dtype)])
+        if labels:
+            vectors[labels] = new_vectors
+
         with _lock:
-            docs = self._fetch_all_diseases()
-            if not docs:
-                print("[KBVectorStore] No diseases found in KB DB at", self.db_path)
+            if num_elements > self.index.get_max_elements():
+                self.index.resize_index(max(num_elements, int(self.index.get_max_elements() * INDEX_GROWTH)))
+            if labels:
+                self.index.add_items(new_vectors, np.array(labels))
+            for label in removed_labels:
+                self.index.mark_deleted(label)
+            self.id_to_meta = metas
+            self._num_elements = num_elements
+            self._tombstones += len(removed_labels)
+            self._version += 1
+        self._save(vectors)
+
+    def _save(self, vectors: np.ndarray) -> None:
+        """
+        Persist index, vectors (row = label) and metadata; caller holds
+        _build_guard but not _lock, so searches keep running while it writes.
+        """
+        _replace_file(VECTORS_PATH, lambda f: np.save(f, np.asarray(vectors, dtype=np.float32)))
+        tmp_index_path = f"{self.index_path}.tmp{os.getpid()}"
+        self.index.save_index(tmp_index_path)
+        os.replace(tmp_index_path, self.index_path)
+        write_metadata(self.meta_path, self.id_to_meta, self._num_elements, self._tombstones)
+        mapped = MappedMetadata(self.meta_path)
+        with _lock:
+            self.id_to_meta = mapped
+
+    def _load_vectors(self) -> np.ndarray:
+        """
+        Vectors are only needed to update or compact the index, never to search,
+        so they stay memory-mapped rather than loaded.
+        """
+        return np.load(VECTORS_PATH, mmap_mode="r")
+
+    # ---------------------
+    # Compaction
+    # ---------------------
+    def _start_compaction(self) -> None:
+        with self._compaction_guard:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, name="kb-index-compaction", daemon=True).start()
+
+    def compact(self) -> None:
+        """
+        Rebuild the graph from the live vectors only, dropping tombstones.
+        The new graph is built without holding either lock; it is discarded
+        if the index changed meanwhile (the next update schedules another try).
+        """
+        try:
+            with self._build_guard:
+                version = self._version
+                live = sorted(self.id_to_meta.items())
+                vectors = self._load_vectors()[[label for label, _ in live]]
+            if not live:
                 return
 
-            # Create texts (detailed) to embed
-            metas = []
-            texts = []
-            for i, d in enumerate(docs):
-                short, detailed = self._make_documents(d)
-                metas.append({
-                    "id": d["disease_id"],
-                    "name": d["name"],
-                    "short": short
-                })
-                texts.append(detailed)
-
-            # Encode embeddings
-            print("[KBVectorStore] Encoding embeddings for", len(texts), "documents...")
-            vectors = self.model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
-
-            # Save vectors & metadata
-            np.save(VECTORS_PATH, vectors)
-            with open(self.meta_path, "w", encoding="utf-8") as f:
-                json.dump({"metas": metas}, f, ensure_ascii=False, indent=2)
-
-            # Initialize HNSW index
             p = hnswlib.Index(space=SPACE, dim=self.dim)
-            p.init_index(max_elements=len(vectors), ef_construction=EF_CONSTRUCTION, M=M)
-            p.add_items(vectors, np.arange(len(vectors)))
+            p.init_index(max_elements=len(live), ef_construction=EF_CONSTRUCTION, M=M)
+            p.add_items(vectors, np.arange(len(live)))
             p.set_ef(EF_SEARCH)
-            p.save_index(self.index_path)
 
-            # assign to instance
-            self.index = p
-            self.id_to_meta = {i: metas[i] for i in range(len(metas))}
-            self._num_elements = len(vectors)
-            self._loaded = True
-            print("[KBVectorStore] Index built and saved:", self.index_path)
+            with self._build_guard:
+                if self._version != version:
+                    print("[KBVectorStore] Index changed during compaction; skipped.")
+                    return
+                with _lock:
+                    self.index = p
+                    self.id_to_meta = {i: meta for i, (_, meta) in enumerate(live)}
+                    self._num_elements = len(live)
+                    self._tombstones = 0
+                    self._version += 1
+                self._save(vectors)
+            print("[KBVectorStore] Index compacted:", len(live), "live documents.")
+        finally:
+            with self._compaction_guard:
+                self._compacting = False
 
     def _load_index(self) -> bool:
         """
         Try to load index + meta from disk. Returns True on success.
         """
-        if not (os.path.exists(self.index_path) and os.path.exists(self.meta_path) and os.path.exists(VECTORS_PATH)):
+        has_meta = os.path.exists(self.meta_path) or os.path.exists(LEGACY_META_PATH)
+        if not (os.path.exists(self.index_path) and has_meta and os.path.exists(VECTORS_PATH)):
             return False
         try:
-            with open(self.meta_path, "r", encoding="utf-8") as f:
-                meta = json.load(f)
-                metas = meta.get("metas", [])
-            self.id_to_meta = {i: metas[i] for i in range(len(metas))}
-            vectors = np.load(VECTORS_PATH)
+            if os.path.exists(self.meta_path):
+                metas = MappedMetadata(self.meta_path)
+                self._num_elements, self._tombstones = metas.num_elements, metas.tombstones
+            else:
+                metas = self._load_legacy_meta()
             p = hnswlib.Index(space=SPACE, dim=self.dim)
             p.load_index(self.index_path)
             p.set_ef(EF_SEARCH)
             self.index = p
-            self._num_elements = vectors.shape[0]
+            self.id_to_meta = metas
             self._loaded = True
             return True
         except Exception as e:
             print("[KBVectorStore] Failed to load index:", e)
             return False
 
+    def _load_legacy_meta(self) -> Dict[int, dict]:
+        """
+        meta.json from older builds: labels are list positions and, without
+        hashes, every disease is re-embedded once by the next update.
+        """
+        with open(LEGACY_META_PATH, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        metas = meta.get("metas", [])
+        self._num_elements = meta.get("num_elements", len(metas))
+        self._tombstones = meta.get("tombstones", 0)
+        return {m.pop("label", i): m for i, m in enumerate(metas)}
+
     # ---------------------
     # Search
     # ---------------------
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Query embeddings, served from the LRU cache where possible; all misses
+        are encoded together in one forward pass.
+        """
+        keys = [" ".join(q.split()) for q in queries]
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        with self._query_cache_lock:
+            for key in dict.fromkeys(keys):
+                vec = self._query_cache.get(key)
+                if vec is None:
+                    missing.append(key)
+                    continue
+                self._query_cache.move_to_end(key)
+                found[key] = vec
+            self._query_cache_hits += len(found)
+            self._query_cache_misses += len(missing)
+
+        if missing:
+            vectors = self.model.encode(missing, convert_to_numpy=True)
+            with self._query_cache_lock:
+                for key, vec in zip(missing, vectors):
+                    found[key] = vec
+                    self._query_cache[key] = vec
+                    self._query_cache.move_to_end(key)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return np.stack([found[key] for key in keys])
+
+    def query_cache_stats(self) -> dict:
+        with self._query_cache_lock:
+            lookups = self._query_cache_hits + self._query_cache_misses
+            return {
+                "size": len(self._query_cache),
+                "max_size": self.query_cache_size,
+                "hits": self._query_cache_hits,
+                "misses": self._query_cache_misses,
+                "hit_rate": self._query_cache_hits / lookups if lookups else 0.0,
+            }
+
     def search(self, query: str, top_k: int = TOP_K_DEFAULT) -> List[dict]:
         """
         Returns list of dicts: { 'disease_id', 'name', 'short', 'score', 'detailed' }
         """
+        return self.search_many([query], top_k=top_k)[0]
+
+    def search_many(self, queries: List[str], top_k: int = TOP_K_DEFAULT) -> List[List[dict]]:
+        """
+        Batched search for bulk jobs: one encode for all queries, one knn_query
+        over the stacked matrix and one DB read for all hits. Returns one result
+        list (same format as search) per query.
+        """
+        if not queries:
+            return []
         # ensure index available
         if not self._loaded:
             ok = self._load_index()
@@ -242,62 +643,64 @@ class KBVectorStore:
                 self.build_index()
                 if not self._loaded:
                     # fallback: return empty
-                    return []
+                    return [[] for _ in queries]
 
-        q_vec = self.model.encode([query], convert_to_numpy=True)
-        labels, distances = self.index.knn_query(q_vec, k=top_k)
+        q_vecs = self._encode_queries(queries)
+        # updates and compaction swap the graph and labels under the same lock
+        with _lock:
+            k = min(top_k, len(self.id_to_meta))
+            if k == 0:
+                return [[] for _ in queries]
+            labels, distances = self.index.knn_query(q_vecs, k=k)
+            metas = [[self.id_to_meta.get(int(label), {}) for label in row] for row in labels]
+        # One query for the detailed text of every hit
+        detailed = self._get_detailed_by_disease_ids([m.get("id") for row in metas for m in row])
         results = []
-        for rank, (label, dist) in enumerate(zip(labels[0], distances[0])):
-            meta = self.id_to_meta.get(int(label), {})
-            # For detailed text, we can reassemble from DB using disease id
-            detailed = self._get_detailed_by_disease_id(meta.get("id"))
-            results.append({
+        for row_metas, row_distances in zip(metas, distances):
+            results.append([{
                 "disease_id": meta.get("id"),
                 "name": meta.get("name"),
                 "short": meta.get("short"),
                 "score": float(dist),
-                "detailed": detailed
-            })
+                "detailed": detailed.get(meta.get("id"), "")
+            } for meta, dist in zip(row_metas, row_distances)])
         return results
 
-    def _get_detailed_by_disease_id(self, disease_id: str) -> str:
+    def _get_detailed_by_disease_ids(self, disease_ids: List[str]) -> Dict[str, str]:
         """
-        Reconstruct the detailed text for a single disease from DB (same format used in build).
+        Detailed text for each disease id, from the precomputed side table.
+        Diseases missing from it (KB edited since the last build) are assembled
+        from the KB tables and stored for next time.
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT disease_id, name, description FROM diseases WHERE disease_id = ?", (disease_id,))
-        row = c.fetchone()
-        if not row:
+        ids = [i for i in dict.fromkeys(disease_ids) if i is not None]
+        if not ids:
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT disease_id, detailed_text FROM disease_documents WHERE disease_id IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # side table not created yet (index built by an older version)
+            rows = []
+        finally:
             conn.close()
-            return ""
-        disease_id, name, description = row
-        # fetch symptoms/tests/measures/references
-        c.execute("SELECT symptom FROM symptoms WHERE disease_id = ?", (disease_id,))
-        symptoms = [r[0] for r in c.fetchall()]
+        detailed = dict(rows)
+
+        missing = [i for i in ids if i not in detailed]
+        if missing:
+            documents = []
+            for d in self._fetch_all_diseases(missing):
+                short, text = self._make_documents(d)
+                documents.append((d["disease_id"], short, text))
+                detailed[d["disease_id"]] = text
+            if documents:
+                self._store_documents(documents)
+        return detailed
 
-        c.execute("SELECT test_name, details FROM tests WHERE disease_id = ?", (disease_id,))
-        tests = [{"name": r[0], "details": r[1]} for r in c.fetchall()]
-
-        c.execute("SELECT keyword FROM keywords WHERE disease_id = ?", (disease_id,))
-        keywords = [r[0] for r in c.fetchall()]
-
-        c.execute("SELECT source, url FROM disease_references WHERE disease_id = ?", (disease_id,))
-        references = [{"source": r[0], "url": r[1]} for r in c.fetchall()]
-
-        conn.close()
-
-        parts = [f"Disease: {name}", f"Description: {description or ''}"]
-        if symptoms:
-            parts.append("Symptoms:")
-            parts.extend([f"- {s}" for s in symptoms])
-        if tests:
-            parts.append("Recommended Tests:")
-            for t in tests:
-                parts.append(f"- {t.get('name','')}: {t.get('details','')}")
-        if keywords:
-            parts.append("Keywords: " + ", ".join(keywords))
-        if references:
-            parts.append("References:")
-            parts.extend([f"- {r.get('source','')} {r.get('url','')}" for r in references])
-        return "\n".join(parts)
+    def _get_detailed_by_disease_id(self, disease_id: str) -> str:
+        """
+        Detailed text for a single disease (same format used in build).
+        """
+        return self._get_detailed_by_disease_ids([disease_id]).get(disease_id, "")
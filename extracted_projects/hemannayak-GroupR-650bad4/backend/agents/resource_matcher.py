@@ -1,5 +1,6 @@
-import math
-from typing import List, Tuple
+import itertools
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from geopy.distance import geodesic
 
 from ..models import Resource, ResourceMatch, DisasterEvent, ResourceType
@@ -40,53 +41,203 @@ MOCK_RESOURCES = [
 ]
 
 
+EARTH_RADIUS_KM = 6371.0088
+# Haversine is within ~0.5% of the geodesic distance and the distance score
+# stops mattering beyond 50 km, so haversine-based scores are within ~0.2 of
+# the exact ones. Everything within this margin of the k-th best approximate
+# score is re-ranked with exact geodesic distances.
+APPROX_SCORE_MARGIN = 0.5
+NEED_TO_TYPE = {
+    "rescue": ResourceType.RESCUE_TEAM,
+    "medical": ResourceType.MEDICAL,
+    "food": ResourceType.SUPPLIES,
+    "water": ResourceType.SUPPLIES,
+    "shelter": ResourceType.SHELTER,
+    "help": ResourceType.RESCUE_TEAM
+}
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points (all in radians)."""
+    dlat = lats - lat
+    dlon = lons - lon
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ResourceTypeIndex:
+    """
+    Column arrays for the resources of one type: coordinates (radians),
+    capacity and availability. Slots of removed resources are reused.
+    """
+
+    def __init__(self):
+        self.resources: List[Optional[Resource]] = []
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.capacity = np.empty(0)
+        self.available = np.empty(0, dtype=bool)
+        self.free_slots: List[int] = []
+
+    def add(self, resource: Resource) -> int:
+        lat, lon = np.radians(resource.coordinates)
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.resources[slot] = resource
+            self.lats[slot], self.lons[slot] = lat, lon
+            self.capacity[slot] = resource.capacity
+            self.available[slot] = resource.available
+            return slot
+        self.resources.append(resource)
+        self.lats = np.append(self.lats, lat)
+        self.lons = np.append(self.lons, lon)
+        self.capacity = np.append(self.capacity, resource.capacity)
+        self.available = np.append(self.available, resource.available)
+        return len(self.resources) - 1
+
+    def remove(self, slot: int):
+        self.resources[slot] = None
+        self.available[slot] = False
+        self.free_slots.append(slot)
+
+    def candidates(self) -> np.ndarray:
+        """Slots of available resources, in insertion order."""
+        return np.flatnonzero(self.available)
+
+
 class ResourceMatcher:
+    """
+    Matches events to resources using a per-type spatial index.
+
+    Availability must change through set_availability (or add_resource /
+    remove_resource) so the index stays current; call rebuild_index after
+    mutating Resource objects directly.
+    """
+
     def __init__(self, resources: List[Resource] = None):
-        self.resources = resources or MOCK_RESOURCES
+        # The mock list is shared module state; set_availability and
+        # add/remove_resource must only change this matcher's copy of it
+        self.resources = resources or [resource.model_copy() for resource in MOCK_RESOURCES]
+        self.rebuild_index()
+
+    # ---------- index maintenance ----------
+
+    def rebuild_index(self):
+        self.index: Dict[ResourceType, ResourceTypeIndex] = {}
+        self.slots: Dict[str, Tuple[ResourceType, int]] = {}
+        # Insertion order, used to break score ties like the list order did
+        self.sequence: Dict[str, int] = {}
+        self._next_sequence = itertools.count()
+        for resource in self.resources:
+            self._index_resource(resource)
+
+    def _index_resource(self, resource: Resource):
+        type_index = self.index.setdefault(resource.type, ResourceTypeIndex())
+        self.slots[resource.id] = (resource.type, type_index.add(resource))
+        self.sequence[resource.id] = next(self._next_sequence)
+
+    def add_resource(self, resource: Resource):
+        if resource.id in self.slots:
+            self.remove_resource(resource.id)
+        self.resources.append(resource)
+        self._index_resource(resource)
+
+    def remove_resource(self, resource_id: str) -> bool:
+        location = self.slots.pop(resource_id, None)
+        if location is None:
+            return False
+        res_type, slot = location
+        self.index[res_type].remove(slot)
+        self.sequence.pop(resource_id, None)
+        self.resources[:] = [r for r in self.resources if r.id != resource_id]
+        return True
+
+    def set_availability(self, resource_id: str, available: bool) -> bool:
+        """Mark a resource (un)available; returns False for unknown ids."""
+        location = self.slots.get(resource_id)
+        if location is None:
+            return False
+        res_type, slot = location
+        type_index = self.index[res_type]
+        type_index.resources[slot].available = available
+        type_index.available[slot] = available
+        return True
+
+    # ---------- matching ----------
 
     def match_resources(self, event: DisasterEvent, k: int = 3) -> List[ResourceMatch]:
         """
         Find k best resource matches for event.
 
         Algorithm:
-        1. Filter by resource type needed
-        2. Calculate distance (haversine formula)
-        3. Check availability
+        1. Filter by resource type needed (index lookup)
+        2. Vectorised haversine distance and score for available resources
+        3. Exact geodesic distance for the best few candidates only
         4. Score = f(distance, capacity, availability)
-        5. Return top k matches with reasoning
+        5. Return top k matches, with reasoning built only for those
         """
+        needed_types = set(self.map_needs_to_types(event.needs))
+        if k <= 0 or not needed_types:
+            return []
+
+        # Gather approximate distances and capacities over the needed types;
+        # Resource objects are only looked up for the shortlisted candidates
+        distances, capacities, chunks = [], [], []
+        for res_type in needed_types:
+            type_index = self.index.get(res_type)
+            if type_index is None:
+                continue
+            slots = type_index.candidates()
+            if not len(slots):
+                continue
+            if event.coordinates:
+                lat, lon = np.radians(event.coordinates)
+                distances.append(haversine_km(lat, lon, type_index.lats[slots], type_index.lons[slots]))
+            else:
+                distances.append(np.full(len(slots), 100.0))
+            capacities.append(type_index.capacity[slots])
+            chunks.append((type_index, slots))
+        if not chunks:
+            return []
+        distances = np.concatenate(distances)
+        capacities = np.concatenate(capacities)
+        offsets = np.cumsum([0] + [len(slots) for _, slots in chunks])
+
+        # Pre-filter on the approximate score, then re-rank with exact distances
+        approx_scores = self.calculate_scores(distances, capacities)
+        if k < len(approx_scores):
+            kth_best = -np.partition(-approx_scores, k - 1)[k - 1]
+            margin = APPROX_SCORE_MARGIN if event.coordinates else 0
+            top = np.flatnonzero(approx_scores >= kth_best - margin)
+        else:
+            top = np.arange(len(approx_scores))
+
+        ranked = []
+        for i in top:
+            chunk = np.searchsorted(offsets, i, side="right") - 1
+            type_index, slots = chunks[chunk]
+            resource = type_index.resources[slots[i - offsets[chunk]]]
+            distance = self.calculate_distance(event.coordinates, resource.coordinates) if event.coordinates else 100
+            score = self.calculate_score(distance, resource.capacity, resource.available)
+            ranked.append((score, resource, distance))
+        # Sort by score descending; ties keep resource order
+        ranked.sort(key=lambda x: (-x[0], self.sequence[x[1].id]))
+
         matches = []
-        for resource in self.resources:
-            if resource.available:
-                # Assume needs map to resource types
-                needed_types = self.map_needs_to_types(event.needs)
-                if resource.type in needed_types:
-                    distance = self.calculate_distance(event.coordinates, resource.coordinates) if event.coordinates else 100
-                    eta = self.calculate_eta(distance)
-                    score = self.calculate_score(distance, resource.capacity, resource.available)
-                    reasoning = self.generate_reasoning(event, resource, distance, eta)
-                    matches.append(ResourceMatch(
-                        event_id=event.id,
-                        resource_id=resource.id,
-                        distance_km=distance,
-                        eta_minutes=eta,
-                        priority_score=score,
-                        reasoning=reasoning
-                    ))
-        # Sort by score descending
-        matches.sort(key=lambda x: x.priority_score, reverse=True)
-        return matches[:k]
+        for score, resource, distance in ranked[:k]:
+            eta = self.calculate_eta(distance)
+            matches.append(ResourceMatch(
+                event_id=event.id,
+                resource_id=resource.id,
+                distance_km=distance,
+                eta_minutes=eta,
+                priority_score=score,
+                reasoning=self.generate_reasoning(event, resource, distance, eta)
+            ))
+        return matches
 
     def map_needs_to_types(self, needs: List[str]) -> List[ResourceType]:
-        mapping = {
-            "rescue": ResourceType.RESCUE_TEAM,
-            "medical": ResourceType.MEDICAL,
-            "food": ResourceType.SUPPLIES,
-            "water": ResourceType.SUPPLIES,
-            "shelter": ResourceType.SHELTER,
-            "help": ResourceType.RESCUE_TEAM
-        }
-        return [mapping.get(need.lower(), ResourceType.SUPPLIES) for need in needs]
+        return [NEED_TO_TYPE.get(need.lower(), ResourceType.SUPPLIES) for need in needs]
 
     def calculate_distance(self, coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
         """Haversine formula for lat/lon distance in km."""
@@ -107,6 +258,12 @@ class ResourceMatcher:
         availability_score = 100 if available else 0
         return (distance_score + capacity_score + availability_score) / 3
 
+    def calculate_scores(self, distances: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+        """calculate_score over arrays of available resources."""
+        distance_scores = np.maximum(0, 100 - distances * 2)
+        capacity_scores = np.minimum(100, capacities * 2)
+        return (distance_scores + capacity_scores + 100) / 3
+
     def generate_reasoning(self, event: DisasterEvent, resource: Resource, distance: float, eta: int) -> str:
         """Generate natural language explanation."""
         return f"Assigned {resource.type.value} {resource.id} ({distance:.1f}km away, ETA {eta}min) because event requires {event.needs} and resource is available."
@@ -3,7 +3,6 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 import asyncio
-import json
 import os
 from datetime import datetime, timedelta
 from loguru import logger
@@ -12,6 +11,8 @@ from backend.models import DisasterEvent, QueryResponse, AgentDecision, Resource
 from backend.rag.vector_store import DisasterVectorStore
 from backend.rag.query_engine import DisasterQueryEngine
 from backend.agents.resource_matcher import ResourceMatcher, MOCK_RESOURCES
+from backend.utils.event_store import EventStore
+from backend.streaming.broadcast import EventBroadcaster, parse_region, serialize_events
 from backend.processing.extractor import DisasterInfoExtractor
 
 app = FastAPI(title="CrisisLens AI API")
@@ -20,7 +21,10 @@ app = FastAPI(title="CrisisLens AI API")
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 # Global stores
-events_store: List[DisasterEvent] = []
+events_store = EventStore()
+# New events are pushed to /ws/events subscribers as they are stored
+broadcaster = EventBroadcaster()
+events_store.add_listener(broadcaster.publish)
 resources_store = MOCK_RESOURCES
 agent_decisions: List[AgentDecision] = []
 
@@ -36,10 +40,9 @@ async def startup_event():
     logger.info("Initializing CrisisLens API...")
     logger.info(f"HF_TOKEN present: {bool(os.getenv('HF_TOKEN'))}")
     # Load existing events from vector store
-    global events_store
     try:
         results = vector_store.query("disaster", k=100)
-        events_store = results
+        events_store.add_many(results)
         logger.info(f"Loaded {len(events_store)} events from vector store")
     except Exception as e:
         logger.warning(f"Could not load events: {e}")
@@ -66,15 +69,14 @@ async def get_events(
     hours: int = Query(24)
 ) -> List[DisasterEvent]:
     """Get paginated events."""
-    filtered = events_store
-    if severity:
-        filtered = [e for e in filtered if e.severity == severity]
-    if disaster_type:
-        filtered = [e for e in filtered if e.disaster_type == disaster_type]
-    # Filter by hours
     cutoff = datetime.now() - timedelta(hours=hours)
-    filtered = [e for e in filtered if e.timestamp > cutoff]
-    return filtered[-limit:]  # Last limit
+    return events_store.recent(limit, severity=severity, disaster_type=disaster_type, since=cutoff)
+
+@app.post("/events")
+async def ingest_event(event: DisasterEvent) -> DisasterEvent:
+    """Store an event and push it to WebSocket subscribers."""
+    events_store.add(event)
+    return event
 
 @app.get("/events/map-data")
 async def get_map_data() -> List[Dict]:
@@ -108,7 +110,7 @@ async def get_resources() -> List[Resource]:
 @app.post("/resources/match")
 async def match_resources(event_id: str) -> List[ResourceMatch]:
     """Match resources for event."""
-    event = next((e for e in events_store if e.id == event_id), None)
+    event = events_store.get(event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     matches = matcher.match_resources(event)
@@ -122,15 +124,12 @@ async def generate_report() -> str:
 @app.get("/stats")
 async def get_stats() -> Dict:
     """Get real-time stats."""
-    severity_dist = {}
-    disaster_types = {}
-    
-    for event in events_store:
-        severity_dist[event.severity.value] = severity_dist.get(event.severity.value, 0) + 1
-        disaster_types[event.disaster_type.value] = disaster_types.get(event.disaster_type.value, 0) + 1
-    
+    store_stats = events_store.get_stats()
+    severity_dist = store_stats['severity_distribution']
+    disaster_types = store_stats['disaster_types']
+
     return {
-        "total_events": len(events_store),
+        "total_events": store_stats['total_events'],
         "events_per_minute": 0,
         "severity_distribution": severity_dist,
         "disaster_types": disaster_types,
@@ -140,23 +139,50 @@ async def get_stats() -> Dict:
     }
 
 # WebSocket for real-time events
+def _query_list(websocket: WebSocket, name: str) -> List[str]:
+    """Values of a repeatable, comma-separated query parameter."""
+    return [v.strip() for value in websocket.query_params.getlist(name) for v in value.split(",") if v.strip()]
+
 @app.websocket("/ws/events")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Push events to the client as they are ingested.
+
+    Optional query parameters filter the stream server-side:
+    severity=HIGH,CRITICAL  type=FLOOD  region=min_lat,min_lon,max_lat,max_lon
+    """
     await websocket.accept()
     try:
+        region = parse_region(websocket.query_params.get("region"))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    subscription = broadcaster.subscribe(
+        severities=_query_list(websocket, "severity"),
+        types=_query_list(websocket, "type"),
+        region=region,
+    )
+
+    async def send_events():
+        # Start with the latest matching events, then push new ones as they arrive
+        recent = [e for e in events_store.recent(100) if subscription.matches(e)][-5:]
+        if recent:
+            await websocket.send_text(serialize_events(recent))
         while True:
-            # Send new events (simplified)
-            if events_store:
-                data = json.dumps([
-                    {
-                        "id": e.id,
-                        "text": e.text,
-                        "severity": e.severity.value,
-                        "type": e.disaster_type.value
-                    }
-                    for e in events_store[-5:]  # Last 5
-                ])
-                await websocket.send_text(data)
-            await asyncio.sleep(10)  # Poll every 10s
+            await websocket.send_text(await subscription.queue.get())
+
+    async def wait_for_disconnect():
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
+    finally:
+        for task in tasks:
+            task.cancel()
+        broadcaster.unsubscribe(subscription)
@@ -44,9 +44,10 @@ class DisasterVectorStore:
             })
             ids.append(event.id)
         
-        # Compute embeddings manually
+        # Compute embeddings manually, in one call for the whole batch; Chroma takes
+        # the numpy array as is. The progress bar only pays off for bulk loads.
         logger.info(f"Computing embeddings for {len(documents)} documents...")
-        embeddings = self.encoder.encode(documents, show_progress_bar=True).tolist()
+        embeddings = self.encoder.encode(documents, batch_size=64, show_progress_bar=len(documents) > 1000)
         
         # Batch add
         batch_size = 100
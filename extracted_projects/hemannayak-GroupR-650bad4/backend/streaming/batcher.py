@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+
+from backend.models import DisasterEvent
+
+
+class EventBatcher:
+    """
+    Buffers processed events and hands them to `flush_fn` in batches.
+
+    A batch is flushed when it reaches `max_batch_size` events or when its
+    oldest event has waited `max_delay_ms`, whichever comes first. `flush_fn`
+    is synchronous (e.g. DisasterVectorStore.add_tweets, which embeds and
+    writes the whole batch in one call) and runs on a worker thread so the
+    event loop keeps accepting tweets. At most `max_pending` events are
+    buffered; beyond that `put` waits, pushing back on the stream.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[DisasterEvent]], None],
+        max_batch_size: int = 64,
+        max_delay_ms: int = 250,
+        max_pending: int = 1024,
+    ):
+        self.flush_fn = flush_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.stats = defaultdict(int)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self):
+        """Start the flush loop on the running event loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, event: DisasterEvent):
+        """Queue an event, waiting while the buffer is full."""
+        if self._closing:
+            raise RuntimeError("EventBatcher is closed")
+        self.start()
+        await self.queue.put(event)
+
+    async def _collect(self) -> List[DisasterEvent]:
+        """Wait for one event, then gather more until the batch is full or the delay expires."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: List[DisasterEvent]):
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.flush_fn, batch)
+            self.stats['events_flushed'] += len(batch)
+        except Exception as e:
+            self.stats['events_failed'] += len(batch)
+            logger.error(f"Failed to flush {len(batch)} events: {e}")
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+        self.stats['batches'] += 1
+        self.stats['max_batch_size'] = max(self.stats['max_batch_size'], len(batch))
+        self.stats['flush_ms_total'] += int((time.perf_counter() - started) * 1000)
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            await self._flush(batch)
+
+    async def flush(self):
+        """Wait until every event queued so far has been flushed."""
+        if self._task is not None and not self._task.done():
+            await self.queue.join()
+
+    async def close(self):
+        """Flush what is buffered and stop the flush loop."""
+        self._closing = True
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        logger.info(f"Event batcher closed: {dict(self.stats)}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'pending': self.queue.qsize(),
+            'batches': self.stats['batches'],
+            'events_flushed': self.stats['events_flushed'],
+            'events_failed': self.stats['events_failed'],
+            'max_batch_size': self.stats['max_batch_size'],
+            'avg_batch_size': round((self.stats['events_flushed'] + self.stats['events_failed']) / self.stats['batches'], 1) if self.stats['batches'] else 0,
+        }
@@ -0,0 +1,147 @@
+import asyncio
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Tuple
+from loguru import logger
+
+from backend.models import DisasterEvent
+
+
+# Messages buffered per client; a slow client loses its oldest messages first
+DEFAULT_QUEUE_SIZE = 100
+
+Region = Tuple[float, float, float, float]  # min_lat, min_lon, max_lat, max_lon
+
+
+def event_payload(event: DisasterEvent) -> Dict:
+    """The fields sent to WebSocket clients for one event."""
+    return {
+        "id": event.id,
+        "text": event.text,
+        "severity": event.severity.value,
+        "type": event.disaster_type.value
+    }
+
+
+def serialize_events(events: Iterable[DisasterEvent]) -> str:
+    return json.dumps([event_payload(e) for e in events])
+
+
+def parse_region(value: Optional[str]) -> Optional[Region]:
+    """Parse "min_lat,min_lon,max_lat,max_lon"; raises ValueError if malformed."""
+    if not value:
+        return None
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError(f"region needs 4 comma-separated numbers, got {value!r}")
+    return tuple(parts)
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One connected client: its filters and its bounded outgoing queue."""
+    severities: Set[str] = field(default_factory=set)
+    types: Set[str] = field(default_factory=set)
+    region: Optional[Region] = None
+    queue_size: int = DEFAULT_QUEUE_SIZE
+    dropped: int = 0
+
+    def __post_init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+    def matches(self, event: DisasterEvent) -> bool:
+        if self.severities and event.severity.value not in self.severities:
+            return False
+        if self.types and event.disaster_type.value not in self.types:
+            return False
+        if self.region:
+            if not event.coordinates:
+                return False
+            min_lat, min_lon, max_lat, max_lon = self.region
+            lat, lon = event.coordinates
+            if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                return False
+        return True
+
+    def offer(self, message: str) -> bool:
+        """Queue a message without waiting; drops the oldest one if the queue is full."""
+        dropped = False
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            dropped = True
+        self.queue.put_nowait(message)
+        return dropped
+
+
+class EventBroadcaster:
+    """
+    Pushes newly ingested events to WebSocket subscribers.
+
+    Each event is serialised once and the same message is queued for every
+    subscription whose severity / type / region filters match. Queues are
+    bounded and drop their oldest message, so a slow client never holds up
+    the others or grows memory. publish() may be called from any thread;
+    delivery always happens on the event loop the subscribers live on.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscriptions: Set[Subscription] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = defaultdict(int)
+
+    def subscribe(
+        self,
+        severities: Iterable[str] = (),
+        types: Iterable[str] = (),
+        region: Optional[Region] = None,
+    ) -> Subscription:
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(
+            severities={s.upper() for s in severities},
+            types={t.upper() for t in types},
+            region=region,
+            queue_size=self.queue_size,
+        )
+        self.subscriptions.add(subscription)
+        logger.info(f"WebSocket subscribed ({len(self.subscriptions)} active)")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+        logger.info(f"WebSocket unsubscribed ({len(self.subscriptions)} active)")
+
+    def publish(self, event: DisasterEvent):
+        """Fan an event out to matching subscribers."""
+        loop = self.loop
+        if loop is None or loop.is_closed() or not self.subscriptions:
+            return
+        if self._on_loop(loop):
+            self._deliver(event)
+        else:
+            loop.call_soon_threadsafe(self._deliver, event)
+
+    @staticmethod
+    def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
+    def _deliver(self, event: DisasterEvent):
+        message = None
+        for subscription in list(self.subscriptions):
+            if not subscription.matches(event):
+                continue
+            if message is None:
+                message = serialize_events([event])
+                self.stats['serialized'] += 1
+            if subscription.offer(message):
+                self.stats['dropped'] += 1
+            self.stats['delivered'] += 1
+        self.stats['published'] += 1
+
+    def get_stats(self) -> Dict:
+        return {'subscribers': len(self.subscriptions), **self.stats}
@@ -2,23 +2,25 @@ import asyncio
 from datetime import datetime
 from collections import defaultdict
 from typing import Dict, List, Optional
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
 from loguru import logger
 
 from backend.models import DisasterEvent, ExtractedInfo, DisasterType, Severity
 from backend.streaming.twitter_stream import TwitterMonitor
+from backend.streaming.batcher import EventBatcher
+from backend.utils.geocoder import LocationGeocoder, get_geocoder
 
 
 class StreamProcessor:
-    def __init__(self, extractor, classifier, vector_store):
+    def __init__(self, extractor, classifier, vector_store, batch_size: int = 64, batch_delay_ms: int = 250, max_pending: int = 1024, geocoder: Optional[LocationGeocoder] = None):
         self.extractor = extractor
         self.classifier = classifier  # Placeholder for ML classifier
         self.vector_store = vector_store
-        self.geocoder = Nominatim(user_agent="crisis_lens")
+        # Events reach the vector store in batches: one encode and one write per batch
+        self.batcher = EventBatcher(vector_store.add_tweets, batch_size, batch_delay_ms, max_pending) if vector_store else None
+        # Shared, cached and rate-limited; see backend/utils/geocoder.py
+        self.geocoder = geocoder or get_geocoder()
         self.stats = defaultdict(int)
         self.events_per_minute = []
-        self.cache = {}
 
     async def process_tweet(self, tweet_data: dict) -> DisasterEvent:
         text = tweet_data['text']
@@ -35,7 +37,7 @@ class StreamProcessor:
         location = extracted.location
         coordinates = None
         if location:
-            coordinates = self.geocode_location(location)
+            coordinates = await self.geocode_location(location)
 
         # 4. Create DisasterEvent
         event = DisasterEvent(
@@ -52,9 +54,9 @@ class StreamProcessor:
             is_verified=False
         )
 
-        # 5. Add to vector store
-        if self.vector_store:
-            self.vector_store.add_tweets([event])
+        # 5. Queue for the vector store (flushed in batches; waits if the buffer is full)
+        if self.batcher:
+            await self.batcher.put(event)
 
         # Update stats
         self.stats['total_events'] += 1
@@ -64,22 +66,20 @@ class StreamProcessor:
         logger.info(f"Processed event: {event.id} - {event.disaster_type} {event.severity}")
         return event
 
-    def geocode_location(self, location: str) -> Optional[tuple]:
-        if location in self.cache:
-            return self.cache[location]
-        try:
-            loc = self.geocoder.geocode(location, timeout=5)
-            if loc:
-                coords = (loc.latitude, loc.longitude)
-                self.cache[location] = coords
-                return coords
-        except GeocoderTimedOut:
-            logger.warning(f"Geocoding timed out for {location}")
-        return None
+    async def geocode_location(self, location: str) -> Optional[tuple]:
+        return await self.geocoder.geocode_async(location)
 
     async def start_monitoring(self, keywords: List[str], bearer_token: Optional[str] = None):
         monitor = TwitterMonitor(bearer_token=bearer_token, callback=self.process_tweet)
-        await monitor.start_stream(keywords)
+        try:
+            await monitor.start_stream(keywords)
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Flush buffered events to the vector store."""
+        if self.batcher:
+            await self.batcher.close()
 
     def get_stats(self) -> Dict:
         current_time = datetime.now()
@@ -95,5 +95,6 @@ class StreamProcessor:
             'events_per_minute': events_last_minute,
             'severity_distribution': severity_dist,
             'disaster_types': disaster_dist,
-            'top_disaster': max(disaster_dist, key=disaster_dist.get) if disaster_dist else None
+            'top_disaster': max(disaster_dist, key=disaster_dist.get) if disaster_dist else None,
+            'vector_store_batching': self.batcher.get_stats() if self.batcher else None
         }
@@ -0,0 +1,186 @@
+import os
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+from loguru import logger
+
+from backend.models import DisasterEvent, DisasterType, Severity
+
+
+DEFAULT_MAX_EVENTS = int(os.getenv("EVENT_STORE_MAX_EVENTS", "50000"))
+# 0 keeps events until the ring buffer is full (historical data loaded at
+# startup would otherwise expire immediately)
+DEFAULT_RETENTION_HOURS = float(os.getenv("EVENT_RETENTION_HOURS", "0"))
+
+
+def _insert_ordered(events: Deque[DisasterEvent], event: DisasterEvent):
+    """Insert keeping timestamp order; events normally arrive in order, so this is an append."""
+    if not events or events[-1].timestamp <= event.timestamp:
+        events.append(event)
+        return
+    position = len(events)
+    while position > 0 and events[position - 1].timestamp > event.timestamp:
+        position -= 1
+    events.insert(position, event)
+
+
+class EventStore:
+    """
+    In-memory store of recent disaster events.
+
+    Events are kept in a time-ordered ring buffer of at most `max_events`,
+    and events older than `retention_hours` (if set) are expired on every
+    write and read. An id index and per-severity / per-type secondary
+    indexes (each time ordered) serve lookups, and the severity and type
+    counters are updated on insert and expiry, so reads cost O(result)
+    instead of a scan over every stored event.
+    """
+
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS, retention_hours: float = DEFAULT_RETENTION_HOURS):
+        self.max_events = max_events
+        self.retention = timedelta(hours=retention_hours) if retention_hours > 0 else None
+        self.events: Deque[DisasterEvent] = deque()
+        self.by_id: Dict[str, DisasterEvent] = {}
+        self.by_severity: Dict[Severity, Deque[DisasterEvent]] = {s: deque() for s in Severity}
+        self.by_type: Dict[DisasterType, Deque[DisasterEvent]] = {t: deque() for t in DisasterType}
+        self.severity_counts: Counter = Counter()
+        self.type_counts: Counter = Counter()
+        self.expired = 0
+        self.lock = threading.RLock()
+        # Called with each newly added event (e.g. the WebSocket broadcaster)
+        self.listeners: List[Callable[[DisasterEvent], None]] = []
+
+    # ---------- writes ----------
+
+    def add(self, event: DisasterEvent) -> bool:
+        """Store an event (replacing one with the same id); False if it is already past retention."""
+        with self.lock:
+            if self.retention and event.timestamp < datetime.now() - self.retention:
+                return False
+            if event.id in self.by_id:
+                self.remove(event.id)
+            _insert_ordered(self.events, event)
+            _insert_ordered(self.by_severity[event.severity], event)
+            _insert_ordered(self.by_type[event.disaster_type], event)
+            self.by_id[event.id] = event
+            self.severity_counts[event.severity.value] += 1
+            self.type_counts[event.disaster_type.value] += 1
+            while len(self.events) > self.max_events:
+                self._evict_oldest()
+            self.expire()
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Event listener failed for {event.id}: {e}")
+        return True
+
+    def add_listener(self, listener: Callable[[DisasterEvent], None]):
+        self.listeners.append(listener)
+
+    def add_many(self, events: Iterable[DisasterEvent]) -> int:
+        """Store several events in timestamp order; returns how many were accepted."""
+        with self.lock:
+            return sum(self.add(event) for event in sorted(events, key=lambda e: e.timestamp))
+
+    def remove(self, event_id: str) -> Optional[DisasterEvent]:
+        with self.lock:
+            event = self.by_id.pop(event_id, None)
+            if event is None:
+                return None
+            self.events.remove(event)
+            self.by_severity[event.severity].remove(event)
+            self.by_type[event.disaster_type].remove(event)
+            self._uncount(event)
+            return event
+
+    def _uncount(self, event: DisasterEvent):
+        self.severity_counts[event.severity.value] -= 1
+        if not self.severity_counts[event.severity.value]:
+            del self.severity_counts[event.severity.value]
+        self.type_counts[event.disaster_type.value] -= 1
+        if not self.type_counts[event.disaster_type.value]:
+            del self.type_counts[event.disaster_type.value]
+
+    def _evict_oldest(self):
+        # The oldest event overall is also the oldest in its secondary indexes
+        event = self.events.popleft()
+        self.by_severity[event.severity].popleft()
+        self.by_type[event.disaster_type].popleft()
+        del self.by_id[event.id]
+        self._uncount(event)
+
+    def expire(self) -> int:
+        """Drop events older than the retention window; returns how many were dropped."""
+        if not self.retention:
+            return 0
+        with self.lock:
+            cutoff = datetime.now() - self.retention
+            dropped = 0
+            while self.events and self.events[0].timestamp < cutoff:
+                self._evict_oldest()
+                dropped += 1
+            if dropped:
+                self.expired += dropped
+                logger.debug(f"Expired {dropped} events older than {cutoff}")
+            return dropped
+
+    # ---------- reads ----------
+
+    def get(self, event_id: str) -> Optional[DisasterEvent]:
+        with self.lock:
+            self.expire()
+            return self.by_id.get(event_id)
+
+    def recent(
+        self,
+        limit: int = 10,
+        severity: Optional[Severity] = None,
+        disaster_type: Optional[DisasterType] = None,
+        since: Optional[datetime] = None,
+    ) -> List[DisasterEvent]:
+        """
+        Newest `limit` events matching the filters, oldest first.
+
+        Walks the smallest applicable index backwards from the newest event
+        and stops at `since` or once `limit` events are found.
+        """
+        with self.lock:
+            self.expire()
+            candidates = self.events
+            if severity is not None:
+                candidates = self.by_severity[severity]
+            if disaster_type is not None and len(self.by_type[disaster_type]) < len(candidates):
+                candidates = self.by_type[disaster_type]
+            matched = []
+            for event in reversed(candidates):
+                if len(matched) >= limit or (since is not None and event.timestamp <= since):
+                    break
+                if severity is not None and event.severity != severity:
+                    continue
+                if disaster_type is not None and event.disaster_type != disaster_type:
+                    continue
+                matched.append(event)
+            matched.reverse()
+            return matched
+
+    def __iter__(self) -> Iterator[DisasterEvent]:
+        with self.lock:
+            self.expire()
+            return iter(list(self.events))
+
+    def __len__(self) -> int:
+        with self.lock:
+            self.expire()
+            return len(self.events)
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            self.expire()
+            return {
+                'total_events': len(self.events),
+                'severity_distribution': dict(self.severity_counts),
+                'disaster_types': dict(self.type_counts),
+                'expired': self.expired,
+            }
@@ -1,15 +1,222 @@
-from typing import Optional, Tuple
+import asyncio
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 from loguru import logger
 
 
+Coordinates = Tuple[float, float]
+
+DEFAULT_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "data/geocode_cache.sqlite3")
+DEFAULT_GAZETTEER_PATH = os.getenv("GEOCODER_GAZETTEER")
+MEMORY_CACHE_SIZE = 4096
+POSITIVE_TTL_SECONDS = 90 * 24 * 3600
+# Places the provider could not find are retried after a day
+NEGATIVE_TTL_SECONDS = 24 * 3600
+# Nominatim's usage policy allows at most one request per second
+MIN_REQUEST_INTERVAL_SECONDS = 1.0
+REQUEST_TIMEOUT_SECONDS = 5
+
+_NOT_CACHED = object()
+_PUNCTUATION = re.compile(r"[^\w\s,]")
+_WHITESPACE = re.compile(r"\s+")
+
+GEOCODE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    location_key TEXT PRIMARY KEY,
+    lat REAL,
+    lon REAL,
+    source TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def normalize_location(location_text: str) -> str:
+    """
+    Cache key for a location: case, accents, punctuation and spacing removed.
+
+    "Bandra West,  Mumbai!" and "bandra west, mumbai" share a key.
+    """
+    text = unicodedata.normalize("NFKD", location_text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    text = ", ".join(part for part in (_WHITESPACE.sub(" ", p).strip() for p in text.split(",")) if part)
+    return text
+
+
+class RateLimiter:
+    """Spaces calls at least `min_interval` seconds apart, across threads and event loops."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claims the next slot; returns how long to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.min_interval
+            return slot - now
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class GeocodeCache:
+    """Persistent geocoding results in SQLite, including negative (not found) results."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(GEOCODE_CACHE_SCHEMA)
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        """Returns coordinates, None for a cached miss, or _NOT_CACHED."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT lat, lon FROM geocodes WHERE location_key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        if row is None:
+            return _NOT_CACHED
+        return (row[0], row[1]) if row[0] is not None else None
+
+    def put(self, key: str, coords: Optional[Coordinates], source: str):
+        ttl = POSITIVE_TTL_SECONDS if coords else NEGATIVE_TTL_SECONDS
+        lat, lon = coords if coords else (None, None)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocodes (location_key, lat, lon, source, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lon, source, time.time() + ttl)
+            )
+
+
+def load_gazetteer(path: str) -> Dict[str, Coordinates]:
+    """Reads a CSV with name,lat,lon columns (header required) into normalised keys."""
+    places = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                places[normalize_location(row["name"])] = (float(row["lat"]), float(row["lon"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+    logger.info(f"Loaded {len(places)} places from gazetteer {path}")
+    return places
+
+
+def _retrieve_exception(task: asyncio.Task):
+    """Keeps a failed lookup whose callers were all cancelled from being reported as never retrieved."""
+    if not task.cancelled():
+        task.exception()
+
+
 class LocationGeocoder:
-    def __init__(self):
-        self.geocoder = Nominatim(user_agent="crisis_lens")
-        self.cache = {}  # Cache results
+    """
+    Geocoding service shared by the stream processor and the scripts.
+
+    Lookups go through, in order: an in-memory LRU, a persistent SQLite
+    cache (keyed by normalize_location, with negative caching), an optional
+    local gazetteer CSV, and finally Nominatim, rate limited to one request
+    per second. With offline=True Nominatim is never called, so the
+    gazetteer acts as an offline stand-in. geocode_async coalesces
+    concurrent lookups of the same place into one provider request.
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+        gazetteer_path: Optional[str] = DEFAULT_GAZETTEER_PATH,
+        offline: bool = False,
+        memory_cache_size: int = MEMORY_CACHE_SIZE,
+    ):
+        self.geocoder = None if offline else Nominatim(user_agent="crisis_lens")
+        self.offline = offline
+        self.cache: "OrderedDict[str, Optional[Coordinates]]" = OrderedDict()  # In-memory LRU
+        self.memory_cache_size = memory_cache_size
+        self.cache_lock = threading.Lock()
+        self.store = GeocodeCache(cache_path) if cache_path else None
+        self.gazetteer = load_gazetteer(gazetteer_path) if gazetteer_path else {}
+        self.rate_limiter = RateLimiter(MIN_REQUEST_INTERVAL_SECONDS)
+        # Provider lookups shared by concurrent geocode_async callers
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = defaultdict(int)
+
+    # ---------- cache layers ----------
 
-    def geocode(self, location_text: str) -> Optional[Tuple[float, float]]:
+    def _remember(self, key: str, coords: Optional[Coordinates]):
+        with self.cache_lock:
+            self.cache[key] = coords
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.memory_cache_size:
+                self.cache.popitem(last=False)
+
+    def _cached(self, key: str):
+        """Memory, then SQLite, then gazetteer; returns _NOT_CACHED if none has the key."""
+        with self.cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self.cache[key]
+        if self.store:
+            coords = self.store.get(key)
+            if coords is not _NOT_CACHED:
+                self.stats['sqlite_hits'] += 1
+                self._remember(key, coords)
+                return coords
+        if key in self.gazetteer:
+            self.stats['gazetteer_hits'] += 1
+            coords = self.gazetteer[key]
+            self._remember(key, coords)
+            return coords
+        if self.offline:
+            return None
+        return _NOT_CACHED
+
+    def _query_provider(self, location_text: str, key: str) -> Optional[Coordinates]:
+        """One Nominatim request (caller has waited for the rate limiter); caches definite answers."""
+        self.stats['provider_requests'] += 1
+        try:
+            location = self.geocoder.geocode(location_text, timeout=REQUEST_TIMEOUT_SECONDS)
+        except GeocoderTimedOut:
+            logger.warning(f"Geocoding timed out for {location_text}")
+            return None
+        except Exception as e:
+            logger.error(f"Geocoding error for {location_text}: {e}")
+            return None
+        # Timeouts and errors are transient and not cached; "not found" is,
+        # with the shorter negative TTL
+        coords = (location.latitude, location.longitude) if location else None
+        if coords:
+            logger.info(f"Geocoded {location_text} to {coords}")
+        self._remember(key, coords)
+        if self.store:
+            self.store.put(key, coords, "nominatim")
+        return coords
+
+    # ---------- lookups ----------
+
+    def geocode(self, location_text: str) -> Optional[Coordinates]:
         """
         Convert location text to coordinates.
 
@@ -19,26 +226,53 @@ class LocationGeocoder:
 
         Returns: (latitude, longitude) or None
         """
-        if location_text in self.cache:
-            return self.cache[location_text]
+        if not location_text:
+            return None
+        key = normalize_location(location_text)
+        coords = self._cached(key)
+        if coords is not _NOT_CACHED:
+            return coords
+        self.rate_limiter.wait()
+        return self._query_provider(location_text, key)
 
+    async def geocode_async(self, location_text: str) -> Optional[Coordinates]:
+        """geocode() without blocking the event loop; concurrent lookups of one place share a request."""
+        if not location_text:
+            return None
+        key = normalize_location(location_text)
+        coords = self._cached(key)
+        if coords is not _NOT_CACHED:
+            return coords
+
+        task = self.in_flight.get(key)
+        if task is None:
+            # The lookup belongs to the geocoder, not to the first caller, so
+            # cancelling any one caller never cancels the others
+            task = asyncio.ensure_future(self._lookup(location_text, key))
+            task.add_done_callback(_retrieve_exception)
+            self.in_flight[key] = task
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    async def _lookup(self, location_text: str, key: str) -> Optional[Coordinates]:
         try:
-            location = self.geocoder.geocode(location_text, timeout=5)
-            if location:
-                coords = (location.latitude, location.longitude)
-                self.cache[location_text] = coords
-                logger.info(f"Geocoded {location_text} to {coords}")
-                return coords
-        except GeocoderTimedOut:
-            logger.warning(f"Geocoding timed out for {location_text}")
-        except Exception as e:
-            logger.error(f"Geocoding error for {location_text}: {e}")
-        return None
+            await self.rate_limiter.wait_async()
+            return await asyncio.to_thread(self._query_provider, location_text, key)
+        finally:
+            del self.in_flight[key]
+
+    async def geocode_many(self, locations: Iterable[str]) -> List[Optional[Coordinates]]:
+        """Geocodes several locations concurrently; duplicates cost one lookup."""
+        return list(await asyncio.gather(*(self.geocode_async(loc) for loc in locations)))
 
     def reverse_geocode(self, lat: float, lon: float) -> str:
         """Get address from coordinates."""
+        if self.offline:
+            return ""
         try:
-            location = self.geocoder.reverse((lat, lon), timeout=5)
+            self.rate_limiter.wait()
+            location = self.geocoder.reverse((lat, lon), timeout=REQUEST_TIMEOUT_SECONDS)
             if location:
                 return location.address
             else:
@@ -49,3 +283,17 @@ class LocationGeocoder:
         except Exception as e:
             logger.error(f"Reverse geocoding error for {lat}, {lon}: {e}")
             return ""
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'memory_entries': len(self.cache)}
+
+
+_shared_geocoder: Optional[LocationGeocoder] = None
+
+
+def get_geocoder() -> LocationGeocoder:
+    """The process-wide geocoder (settings from GEOCODE_CACHE_PATH, GEOCODER_GAZETTEER, GEOCODER_OFFLINE)."""
+    global _shared_geocoder
+    if _shared_geocoder is None:
+        _shared_geocoder = LocationGeocoder(offline=os.getenv("GEOCODER_OFFLINE", "").lower() in ("1", "true", "yes"))
+    return _shared_geocoder
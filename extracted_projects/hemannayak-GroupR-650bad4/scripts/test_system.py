@@ -115,6 +115,345 @@ def test_resource_matcher():
         print(f"❌ Resource matcher failed: {e}")
         return False
 
+def full_scan_matches(matcher, event, k):
+    """The matcher's ranking as a plain scan over every resource"""
+    needed_types = matcher.map_needs_to_types(event.needs)
+    ranked = []
+    for resource in matcher.resources:
+        if resource.available and resource.type in needed_types:
+            distance = matcher.calculate_distance(event.coordinates, resource.coordinates) if event.coordinates else 100
+            ranked.append((matcher.calculate_score(distance, resource.capacity, resource.available), resource.id))
+    # Sort by score descending; ties keep resource order
+    ranked.sort(key=lambda x: -x[0])
+    return [(resource_id, round(score, 9)) for score, resource_id in ranked[:k]]
+
+def test_resource_matcher_index():
+    """Indexed matching against a full scan, across availability and resource changes"""
+    print("\n🧪 Testing resource matcher index...")
+    import random
+    from backend.agents.resource_matcher import ResourceMatcher, MOCK_RESOURCES
+    from backend.models import Resource, ResourceType, DisasterType, Severity
+
+    rng = random.Random(23)
+    needs = ["rescue", "medical", "food", "water", "shelter", "help", "boats"]
+
+    def random_resource(resource_id):
+        return Resource(id=resource_id, type=rng.choice(list(ResourceType)), location="Mumbai",
+                        coordinates=(19.0 + rng.uniform(-0.4, 0.4), 72.9 + rng.uniform(-0.4, 0.4)),
+                        capacity=rng.choice([5, 10, 25, 49, 50, 80, 200]), available=rng.random() < 0.8)
+
+    def random_event(i):
+        # Far-away events score every resource the same, so ties are exercised too
+        coordinates = rng.choice([None, (19.0 + rng.uniform(-0.5, 0.5), 72.9 + rng.uniform(-0.5, 0.5)), (21.1, 79.1)])
+        event = make_test_event(f"m{i}", 0, DisasterType.FLOOD, Severity.HIGH, coordinates)
+        event.needs = rng.sample(needs, rng.randint(1, 3))
+        return event
+
+    def check(matcher, rounds):
+        for i in range(rounds):
+            event, k = random_event(i), rng.randint(1, 8)
+            got = [(m.resource_id, round(m.priority_score, 9)) for m in matcher.match_resources(event, k=k)]
+            expected = full_scan_matches(matcher, event, k)
+            assert got == expected, f"event {event.coordinates} {event.needs} k={k}: {got} != {expected}"
+
+    matcher = ResourceMatcher([random_resource(f"X{i:03d}") for i in range(120)])
+    check(matcher, 200)
+
+    for _ in range(5):
+        for resource in rng.sample(matcher.resources, 30):
+            assert matcher.set_availability(resource.id, not resource.available)
+        check(matcher, 60)
+    assert not matcher.set_availability("missing", True)
+
+    removed = rng.sample([r.id for r in matcher.resources], 40)
+    for resource_id in removed:
+        assert matcher.remove_resource(resource_id)
+    assert not matcher.remove_resource(removed[0])
+    check(matcher, 100)
+    # Re-added ids go into freed slots, possibly under a different type
+    for resource_id in removed[:25]:
+        matcher.add_resource(random_resource(resource_id))
+    for i in range(10):
+        matcher.add_resource(random_resource(f"N{i:03d}"))
+    # Replacing a live resource moves it to the end of the tie order
+    for resource in rng.sample(matcher.resources, 5):
+        matcher.add_resource(random_resource(resource.id))
+    assert len(matcher.resources) == len({r.id for r in matcher.resources}) == 115
+    check(matcher, 200)
+
+    # A close call: due east, exact distances run slightly longer than
+    # haversine, so B (10 km nearer, 10 less capacity) trails A by 0.005
+    # on the approximate score but wins on the exact one
+    import math
+    from backend.agents.resource_matcher import EARTH_RADIUS_KM
+
+    def east_of(origin, km):
+        lat = math.radians(origin[0])
+        dlon = 2 * math.asin(math.sin(km / (2 * EARTH_RADIUS_KM)) / math.cos(lat))
+        return (origin[0], origin[1] + math.degrees(dlon))
+
+    origin = (19.0, 72.9)
+    close = ResourceMatcher([
+        Resource(id="A", type=ResourceType.MEDICAL, location="A", coordinates=east_of(origin, 25.0), capacity=30),
+        Resource(id="B", type=ResourceType.MEDICAL, location="B", coordinates=east_of(origin, 15.0075), capacity=20),
+    ])
+    event = make_test_event("close", 0, DisasterType.FLOOD, Severity.HIGH, origin)
+    event.needs = ["medical"]
+    assert full_scan_matches(close, event, 1)[0][0] == "B"
+    assert [m.resource_id for m in close.match_resources(event, k=1)] == ["B"]
+
+    # The default matcher works on its own copy of the mock resources
+    default = ResourceMatcher()
+    default.set_availability("R001", False)
+    default.remove_resource("R002")
+    assert MOCK_RESOURCES[0].available and [r.id for r in MOCK_RESOURCES][:2] == ["R001", "R002"]
+    assert ResourceMatcher().set_availability("R002", True)
+    print("✅ Resource matcher index matches a full scan")
+
+def test_event_batcher():
+    """Test micro-batched vector store writes"""
+    print("\n🧪 Testing event batcher...")
+    import asyncio
+    import time
+    from backend.models import DisasterType, Severity
+    from backend.streaming.batcher import EventBatcher
+
+    batches = []
+
+    def write(batch):
+        if any(e.id == "poison" for e in batch):
+            raise RuntimeError("vector store unavailable")
+        batches.append([e.id for e in batch])
+
+    async def run():
+        batcher = EventBatcher(write, max_batch_size=64, max_delay_ms=50, max_pending=32)
+        # max_pending < total: put() waits for flushes instead of buffering everything
+        for i in range(150):
+            await batcher.put(make_test_event(f"t{i}", 0, DisasterType.FLOOD, Severity.LOW))
+        await batcher.flush()
+        assert [i for b in batches for i in b] == [f"t{i}" for i in range(150)]
+        assert max(len(b) for b in batches) <= 64
+
+        # A lone event is flushed once the delay expires
+        batches.clear()
+        started = time.monotonic()
+        await batcher.put(make_test_event("late", 0, DisasterType.FIRE, Severity.LOW))
+        await batcher.flush()
+        assert batches == [["late"]] and time.monotonic() - started >= 0.04
+
+        # A failed write is counted and the loop keeps going
+        await batcher.put(make_test_event("poison", 0, DisasterType.FIRE, Severity.LOW))
+        await batcher.flush()
+        await batcher.put(make_test_event("after", 0, DisasterType.FIRE, Severity.LOW))
+        await batcher.close()
+        assert batches[-1] == ["after"]
+        try:
+            await batcher.put(make_test_event("closed", 0, DisasterType.FIRE, Severity.LOW))
+            raise AssertionError("put() after close() should fail")
+        except RuntimeError:
+            pass
+        return batcher.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["events_flushed"] == 152 and stats["events_failed"] == 1 and stats["pending"] == 0
+    print(f"✅ Event batcher works: {stats}")
+
+def test_geocoder():
+    """Test geocoder caching and request coalescing (no network)"""
+    print("\n🧪 Testing geocoder...")
+    import asyncio
+    import tempfile
+    import time
+    from types import SimpleNamespace
+    from backend.utils.geocoder import LocationGeocoder, normalize_location
+
+    assert normalize_location("Bandra West,  Mumbai!") == normalize_location("bandra west, mumbai")
+    assert normalize_location("Chennaí") == "chennai"
+
+    class FakeProvider:
+        def __init__(self, delay=0.0):
+            self.calls = []
+            self.delay = delay
+
+        def geocode(self, text, timeout=None):
+            self.calls.append(text)
+            time.sleep(self.delay)
+            if "atlantis" in text.lower():
+                return None
+            return SimpleNamespace(latitude=18.5204, longitude=73.8567)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gazetteer = os.path.join(tmp, "places.csv")
+        with open(gazetteer, "w", encoding="utf-8") as f:
+            f.write("name,lat,lon\nMumbai,19.0760,72.8777\nbad row,x,y\n")
+        cache_path = os.path.join(tmp, "geocode_cache.sqlite3")
+
+        geocoder = LocationGeocoder(cache_path=cache_path, gazetteer_path=gazetteer)
+        provider = FakeProvider()
+        geocoder.geocoder = provider
+        geocoder.rate_limiter.min_interval = 0
+
+        assert geocoder.geocode("MUMBAI") == (19.0760, 72.8777)
+        coords = asyncio.run(geocoder.geocode_many(["Pune", "pune!", " PUNE ", "Atlantis"]))
+        assert coords == [(18.5204, 73.8567)] * 3 + [None]
+        assert sorted(provider.calls) == ["Atlantis", "Pune"], provider.calls
+        assert geocoder.geocode("Atlantis") is None and len(provider.calls) == 2
+
+        # A new instance answers from the SQLite cache, including the miss
+        restarted = LocationGeocoder(cache_path=cache_path)
+        restarted.geocoder = FakeProvider()
+        assert restarted.geocode("pune") == (18.5204, 73.8567)
+        assert restarted.geocode("atlantis") is None
+        assert restarted.geocoder.calls == []
+
+        # Cancelling the caller that started a shared lookup leaves the others waiting for it
+        async def cancel_first_caller():
+            shared = LocationGeocoder(cache_path=None)
+            shared.geocoder = FakeProvider(delay=0.2)
+            shared.rate_limiter.min_interval = 0
+            first = asyncio.ensure_future(shared.geocode_async("Nagpur"))
+            second = asyncio.ensure_future(shared.geocode_async("nagpur"))
+            await asyncio.sleep(0.05)
+            first.cancel()
+            coords = await second
+            assert first.cancelled() and not second.cancelled()
+            assert coords == (18.5204, 73.8567)
+            assert shared.geocoder.calls == ["Nagpur"] and not shared.in_flight
+            # The lookup still completed, so the next caller is served from memory
+            assert await shared.geocode_async("NAGPUR") == coords
+            assert shared.geocoder.calls == ["Nagpur"]
+
+        asyncio.run(cancel_first_caller())
+
+        offline = LocationGeocoder(cache_path=None, gazetteer_path=gazetteer, offline=True)
+        assert offline.geocode("Mumbai") == (19.0760, 72.8777)
+        assert offline.geocode("Nowhere") is None
+
+    print(f"✅ Geocoder works: {geocoder.get_stats()}")
+
+def make_test_event(event_id, minutes_ago, disaster_type, severity, coordinates=None):
+    """A DisasterEvent stamped `minutes_ago` before now"""
+    from backend.models import DisasterEvent
+    from datetime import datetime, timedelta
+    return DisasterEvent(
+        id=event_id,
+        text=f"{disaster_type.value} report {event_id}",
+        timestamp=datetime.now() - timedelta(minutes=minutes_ago),
+        location="Mumbai",
+        coordinates=coordinates,
+        disaster_type=disaster_type,
+        severity=severity,
+        confidence=0.9,
+        source="test",
+        needs=[],
+        is_verified=False
+    )
+
+def test_event_store():
+    """Test the indexed event store"""
+    print("\n🧪 Testing event store...")
+    from backend.models import DisasterType, Severity
+    from backend.utils.event_store import EventStore
+    from datetime import datetime, timedelta
+
+    store = EventStore(max_events=5, retention_hours=0)
+    added = []
+    store.add_listener(lambda event: added.append(event.id))
+    store.add(make_test_event("e1", 50, DisasterType.FLOOD, Severity.HIGH))
+    store.add(make_test_event("e2", 40, DisasterType.FIRE, Severity.LOW))
+    store.add(make_test_event("e3", 30, DisasterType.FLOOD, Severity.CRITICAL))
+    # Arrives late: stored in timestamp order, not arrival order
+    store.add(make_test_event("e0", 60, DisasterType.FLOOD, Severity.LOW))
+    assert [e.id for e in store] == ["e0", "e1", "e2", "e3"]
+    assert added == ["e1", "e2", "e3", "e0"]
+
+    assert [e.id for e in store.recent(limit=2)] == ["e2", "e3"]
+    assert [e.id for e in store.recent(limit=10, disaster_type=DisasterType.FLOOD)] == ["e0", "e1", "e3"]
+    assert [e.id for e in store.recent(limit=10, severity=Severity.LOW, disaster_type=DisasterType.FLOOD)] == ["e0"]
+    since = datetime.now() - timedelta(minutes=45)
+    assert [e.id for e in store.recent(limit=10, since=since)] == ["e2", "e3"]
+
+    # Same id replaces the old event and its counts
+    store.add(make_test_event("e2", 20, DisasterType.STORM, Severity.MEDIUM))
+    assert store.get("e2").disaster_type == DisasterType.STORM
+    assert [e.id for e in store.recent(limit=10, disaster_type=DisasterType.FIRE)] == []
+    assert store.get_stats()["disaster_types"] == {"FLOOD": 3, "STORM": 1}
+
+    # Past max_events the oldest event goes, from every index
+    store.add_many([
+        make_test_event("e4", 10, DisasterType.FIRE, Severity.HIGH),
+        make_test_event("e5", 5, DisasterType.FLOOD, Severity.HIGH),
+    ])
+    assert len(store) == 5 and store.get("e0") is None
+    assert [e.id for e in store.recent(limit=10, severity=Severity.LOW)] == []
+    stats = store.get_stats()
+    assert stats["severity_distribution"] == {"HIGH": 3, "CRITICAL": 1, "MEDIUM": 1}
+    assert sum(stats["disaster_types"].values()) == 5
+
+    assert store.remove("e3").id == "e3" and store.remove("e3") is None
+    assert store.get_stats()["severity_distribution"] == {"HIGH": 3, "MEDIUM": 1}
+
+    recent_only = EventStore(max_events=100, retention_hours=1)
+    assert not recent_only.add(make_test_event("old", 120, DisasterType.FIRE, Severity.LOW))
+    assert recent_only.add(make_test_event("new", 1, DisasterType.FIRE, Severity.LOW))
+    assert [e.id for e in recent_only] == ["new"]
+
+    print(f"✅ Event store works: {stats}")
+
+def test_broadcaster():
+    """Test WebSocket fan-out filters and bounded queues"""
+    print("\n🧪 Testing broadcaster...")
+    import asyncio
+    import json
+    import threading
+    from backend.models import DisasterType, Severity
+    from backend.streaming.broadcast import EventBroadcaster, parse_region
+
+    assert parse_region("18.8,72.7,19.3,73.1") == (18.8, 72.7, 19.3, 73.1)
+    assert parse_region("") is None
+    try:
+        parse_region("1,2,3")
+        raise AssertionError("a 3-number region should be rejected")
+    except ValueError:
+        pass
+
+    async def run():
+        broadcaster = EventBroadcaster(queue_size=2)
+        everything = broadcaster.subscribe()
+        floods = broadcaster.subscribe(types=["flood"], severities=["high", "critical"])
+        mumbai = broadcaster.subscribe(region=parse_region("18.8,72.7,19.3,73.1"))
+
+        broadcaster.publish(make_test_event("b1", 3, DisasterType.FLOOD, Severity.HIGH, (19.07, 72.87)))
+        broadcaster.publish(make_test_event("b2", 2, DisasterType.FIRE, Severity.CRITICAL, (28.61, 77.20)))
+        # Published from another thread: delivered on the loop, not in that thread
+        worker = threading.Thread(target=broadcaster.publish, args=(
+            make_test_event("b3", 1, DisasterType.FLOOD, Severity.LOW),))
+        worker.start()
+        worker.join()
+        await asyncio.sleep(0.05)
+
+        def drain(subscription):
+            ids = []
+            while not subscription.queue.empty():
+                ids += [e["id"] for e in json.loads(subscription.queue.get_nowait())]
+            return ids
+
+        # queue_size=2: the oldest message is dropped for the slow client
+        assert drain(everything) == ["b2", "b3"] and everything.dropped == 1
+        assert drain(floods) == ["b1"]
+        assert drain(mumbai) == ["b1"]
+
+        broadcaster.unsubscribe(floods)
+        broadcaster.publish(make_test_event("b4", 0, DisasterType.FLOOD, Severity.HIGH))
+        assert drain(floods) == [] and drain(everything) == ["b4"]
+        return broadcaster.get_stats()
+
+    stats = asyncio.run(run())
+    # One serialisation per event, however many subscribers received it
+    assert stats["published"] == 4 and stats["serialized"] == 4
+    assert stats["delivered"] == 6 and stats["dropped"] == 1
+    print(f"✅ Broadcaster works: {stats}")
+
 def main():
     print("=" * 60)
     print("🚀 DisasterLens AI - System Test")
@@ -127,15 +466,21 @@ def main():
         ("Vector Store", test_vector_store),
         ("Query Engine", test_query_engine),
         ("Resource Matcher", test_resource_matcher),
+        ("Resource Matcher Index", test_resource_matcher_index),
+        ("Event Batcher", test_event_batcher),
+        ("Geocoder", test_geocoder),
+        ("Event Store", test_event_store),
+        ("Broadcaster", test_broadcaster),
     ]
     
     results = []
     for name, test_func in tests:
+        # Older checks report failure by returning False; the rest raise
         try:
             result = test_func()
-            results.append((name, result))
+            results.append((name, result is not False))
         except Exception as e:
-            print(f"❌ {name} crashed: {e}")
+            print(f"❌ {name} failed: {e!r}")
             results.append((name, False))
     
     print("\n" + "=" * 60)
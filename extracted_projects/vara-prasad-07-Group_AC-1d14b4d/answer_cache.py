@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+# Cosine similarity between query embeddings; all-MiniLM-L6-v2 puts paraphrases
+# like "router not working" / "my router is not working" well above this.
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+
+ANONYMOUS = "anonymous"
+PERSONAL = "personal"
+
+
+def user_context_class(user_context: str) -> str:
+    """
+    Class of the user context an answer was generated with.
+
+    Answers generated with account information (balance, plan, bill date)
+    are personal and never cached; everything else is anonymous.
+    """
+    return PERSONAL if user_context and user_context.strip() else ANONYMOUS
+
+
+class SemanticAnswerCache:
+    """
+    Cache of RAG answers keyed by query embedding.
+
+    A lookup hits when a cached answer was generated for a query whose
+    embedding has cosine similarity >= `similarity_threshold`, from the same
+    retrieved case ids (in the same order) and the same user context class.
+    Entries expire after `ttl_seconds`; beyond `max_entries` the least
+    recently used entry is evicted. Personal answers bypass the cache.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        # entry id -> {"key", "embedding", "result", "expires"}, least recently used first
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # (case ids, context class) -> entry ids; only these are compared on lookup
+        self._buckets: Dict[Tuple[Tuple[str, ...], str], Dict[int, None]] = {}
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalise(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets.get(entry["key"])
+        if bucket is not None:
+            bucket.pop(entry_id, None)
+            if not bucket:
+                del self._buckets[entry["key"]]
+
+    def lookup(self, embedding: Sequence[float], case_ids: Sequence[str], context_class: str = ANONYMOUS) -> Optional[Dict[str, Any]]:
+        """Return a copy of the best cached answer, or None on a miss (or for personal context)."""
+        if context_class == PERSONAL or self.max_entries <= 0:
+            with self._lock:
+                self.bypassed += 1
+            return None
+        key = (tuple(case_ids), context_class)
+        query = self._normalise(embedding)
+        now = time.monotonic()
+        with self._lock:
+            candidates = list(self._buckets.get(key, ()))
+            best_id, best_score = None, self.similarity_threshold
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry["expires"] <= now:
+                    self._remove(entry_id)
+                    self.evictions += 1
+                    continue
+                score = float(np.dot(query, entry["embedding"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return dict(self._entries[best_id]["result"])
+
+    def store(self, embedding: Sequence[float], case_ids: Sequence[str], context_class: str, result: Dict[str, Any]) -> None:
+        """Cache an answer; personal answers are ignored."""
+        if context_class == PERSONAL or self.max_entries <= 0:
+            return
+        key = (tuple(case_ids), context_class)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "key": key,
+                "embedding": self._normalise(embedding),
+                "result": dict(result),
+                "expires": time.monotonic() + self.ttl_seconds,
+            }
+            self._buckets.setdefault(key, {})[entry_id] = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def create_answer_cache() -> SemanticAnswerCache:
+    """
+    Build the answer cache from environment variables:
+
+    - ANSWER_CACHE_SIZE: maximum cached answers (0 disables the cache)
+    - ANSWER_CACHE_TTL_SECONDS: how long an answer stays valid
+    - ANSWER_CACHE_THRESHOLD: minimum cosine similarity for a hit
+    """
+    return SemanticAnswerCache(
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        similarity_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD)),
+    )
@@ -1,52 +1,359 @@
 import os
-from typing import List, Dict, Any
+import json
+import asyncio
+import threading
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Union
 import chromadb
+import numpy as np
 from dotenv import load_dotenv
 
 # Load env vars from .env file
 load_dotenv()
 
-class ChromaClientWrapper:
-  """Wrapper around a Chroma CloudClient for simple upsert and search operations.
+Embeddings = Union[np.ndarray, Sequence[Sequence[float]]]
+
+DEFAULT_BACKEND = "cloud"
+DEFAULT_STORE_PATH = "chroma_data"
+SYNC_BATCH_SIZE = 500
+HNSW_INITIAL_CAPACITY = 1024
+HNSW_EF_CONSTRUCTION = 200
+HNSW_M = 16
+HNSW_EF_SEARCH = 64
+
+
+def default_checkpoint_path(collection_name: str) -> str:
+  """Where ingest.py records the tickets already upserted into a collection."""
+  return f".ingest_checkpoint_{collection_name}.json"
 
-  Expects environment variables or explicit args:
-    - CHROMA_API_KEY
-    - CHROMA_TENANT
-    - CHROMA_DB
-  """
 
-  def __init__(self, collection_name: str = "tickets", api_key: str | None = None, tenant: str | None = None, database: str | None = None):
-    api_key = api_key or os.getenv("CHROMA_API_KEY")
-    tenant = tenant or os.getenv("CHROMA_TENANT")
-    database = database or os.getenv("CHROMA_DB")
+# ---------------------------------------------------------------------------
+# Backends
+#
+# Every backend implements the same small interface:
+#   upsert(ids, embeddings, metadatas, documents)
+#   query(query_embeddings, n_results) -> Chroma query format (one list per query)
+#   count() -> int
+#   iter_records(batch_size) -> (ids, embeddings, metadatas, documents) batches
+#   flush()  -> persist buffered writes; `defers_writes` says whether any are buffered
+#   delete_collection()
+# and a `target` string naming where the data lives (backend kind and path or
+# account), which ingest checkpoints are tied to.
+# ---------------------------------------------------------------------------
 
-    if not api_key:
-      raise ValueError("CHROMA_API_KEY is required in environment or constructor")
+class ChromaBackend:
+  """A collection on any chromadb client: Chroma Cloud or an embedded PersistentClient."""
 
-    # Create CloudClient
-    self.client = chromadb.CloudClient(api_key=api_key, tenant=tenant, database=database)
+  # Chroma persists each upsert itself
+  defers_writes = False
 
+  def __init__(self, client, collection_name: str, target: str):
+    self.client = client
+    self.collection_name = collection_name
+    self.target = target
     # get or create collection
     try:
       self.collection = self.client.get_collection(collection_name)
     except Exception:
       self.collection = self.client.create_collection(collection_name)
 
-  def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[dict], documents: List[str]):
-    """Add or update documents in the collection."""
-    return self.collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+  def upsert(self, ids: List[str], embeddings: Embeddings, metadatas: List[dict], documents: List[str]):
+    return self.collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+  def query(self, query_embeddings: Embeddings, n_results: int) -> Dict[str, Any]:
+    return self.collection.query(
+        query_embeddings=query_embeddings,
+        n_results=n_results,
+        include=["metadatas", "documents", "distances"]
+    )
+
+  def count(self) -> int:
+    return self.collection.count()
+
+  def iter_records(self, batch_size: int = SYNC_BATCH_SIZE) -> Iterator[Tuple[List[str], Embeddings, List[dict], List[str]]]:
+    offset = 0
+    while True:
+      page = self.collection.get(limit=batch_size, offset=offset, include=["embeddings", "metadatas", "documents"])
+      ids = page.get("ids") or []
+      if not ids:
+        return
+      yield ids, np.asarray(page["embeddings"], dtype=np.float32), page["metadatas"], page["documents"]
+      offset += len(ids)
+
+  def flush(self):
+    pass
+
+  def delete_collection(self):
+    self.client.delete_collection(name=self.collection_name)
+
+
+def cloud_backend(collection_name: str, api_key: str | None = None, tenant: str | None = None, database: str | None = None) -> ChromaBackend:
+  api_key = api_key or os.getenv("CHROMA_API_KEY")
+  tenant = tenant or os.getenv("CHROMA_TENANT")
+  database = database or os.getenv("CHROMA_DB")
+
+  if not api_key:
+    raise ValueError("CHROMA_API_KEY is required in environment or constructor")
+
+  target = f"cloud:{tenant or 'default'}/{database or 'default'}"
+  return ChromaBackend(chromadb.CloudClient(api_key=api_key, tenant=tenant, database=database), collection_name, target)
+
+
+def persistent_backend(collection_name: str, path: str = DEFAULT_STORE_PATH) -> ChromaBackend:
+  """Embedded Chroma that keeps its HNSW index on local disk; no network, no API key."""
+  return ChromaBackend(chromadb.PersistentClient(path=path), collection_name, f"local:{os.path.abspath(path)}")
+
+
+class HnswBackend:
+  """Bare hnswlib index on local disk, for the lowest query latency.
+
+  Vectors live in <path>/<collection>.index and ids, metadatas and documents
+  in <path>/<collection>.json. Upserts only update memory; flush() replaces
+  both files atomically, so a bulk load writes them once rather than once
+  per batch. Uses squared L2 distance, like a default Chroma collection, so
+  distances are comparable across backends. hnswlib ships with chromadb
+  (chroma-hnswlib) and is imported on first use.
+  """
+
+  defers_writes = True
+
+  def __init__(self, collection_name: str, path: str = DEFAULT_STORE_PATH):
+    import hnswlib
+
+    self._hnswlib = hnswlib
+    self.collection_name = collection_name
+    self.target = f"hnsw:{os.path.abspath(path)}"
+    os.makedirs(path, exist_ok=True)
+    self.index_path = os.path.join(path, f"{collection_name}.index")
+    self.records_path = os.path.join(path, f"{collection_name}.json")
+    self._lock = threading.Lock()
+    self.index = None
+    self.dim: Optional[int] = None
+    # Parallel lists indexed by hnswlib label
+    self.ids: List[str] = []
+    self.metadatas: List[dict] = []
+    self.documents: List[str] = []
+    self.labels: Dict[str, int] = {}
+    # True while memory holds upserts that flush() has not written yet
+    self.dirty = False
+    if os.path.exists(self.records_path) and os.path.exists(self.index_path):
+      self._load()
+
+  def _load(self):
+    with open(self.records_path, "r", encoding="utf-8") as f:
+      records = json.load(f)
+    self.dim = records["dim"]
+    self.ids = records["ids"]
+    self.metadatas = records["metadatas"]
+    self.documents = records["documents"]
+    self.labels = {tid: label for label, tid in enumerate(self.ids)}
+    self.index = self._hnswlib.Index(space="l2", dim=self.dim)
+    self.index.load_index(self.index_path, max_elements=max(len(self.ids), HNSW_INITIAL_CAPACITY))
+    self.index.set_ef(HNSW_EF_SEARCH)
+
+  def _save(self):
+    tmp_index = self.index_path + ".tmp"
+    self.index.save_index(tmp_index)
+    os.replace(tmp_index, self.index_path)
+    tmp_records = self.records_path + ".tmp"
+    with open(tmp_records, "w", encoding="utf-8") as f:
+      json.dump({"dim": self.dim, "ids": self.ids, "metadatas": self.metadatas, "documents": self.documents}, f)
+    os.replace(tmp_records, self.records_path)
+
+  def upsert(self, ids: List[str], embeddings: Embeddings, metadatas: List[dict], documents: List[str]):
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    with self._lock:
+      if self.index is None:
+        self.dim = int(vectors.shape[1])
+        self.index = self._hnswlib.Index(space="l2", dim=self.dim)
+        self.index.init_index(max_elements=HNSW_INITIAL_CAPACITY, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        self.index.set_ef(HNSW_EF_SEARCH)
+      labels = []
+      for tid, meta, doc in zip(ids, metadatas, documents):
+        label = self.labels.get(tid)
+        if label is None:
+          label = len(self.ids)
+          self.labels[tid] = label
+          self.ids.append(tid)
+          self.metadatas.append(meta)
+          self.documents.append(doc)
+        else:
+          self.metadatas[label] = meta
+          self.documents[label] = doc
+        labels.append(label)
+      if len(self.ids) > self.index.get_max_elements():
+        self.index.resize_index(max(len(self.ids), 2 * self.index.get_max_elements()))
+      self.index.add_items(vectors, np.asarray(labels, dtype=np.int64))
+      self.dirty = True
+
+  def flush(self):
+    """Write the index and records to disk if anything changed since the last flush."""
+    with self._lock:
+      if self.dirty and self.index is not None:
+        self._save()
+      self.dirty = False
+
+  def query(self, query_embeddings: Embeddings, n_results: int) -> Dict[str, Any]:
+    queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+    with self._lock:
+      k = min(n_results, len(self.ids))
+      if k == 0:
+        empty = [[] for _ in queries]
+        return {"ids": empty, "documents": empty, "metadatas": empty, "distances": empty}
+      labels, distances = self.index.knn_query(queries, k=k)
+      return {
+          "ids": [[self.ids[label] for label in row] for row in labels],
+          "documents": [[self.documents[label] for label in row] for row in labels],
+          "metadatas": [[self.metadatas[label] for label in row] for row in labels],
+          "distances": [row.tolist() for row in distances],
+      }
+
+  def count(self) -> int:
+    return len(self.ids)
+
+  def iter_records(self, batch_size: int = SYNC_BATCH_SIZE) -> Iterator[Tuple[List[str], Embeddings, List[dict], List[str]]]:
+    for start in range(0, len(self.ids), batch_size):
+      labels = list(range(start, min(start + batch_size, len(self.ids))))
+      vectors = np.asarray(self.index.get_items(labels), dtype=np.float32)
+      yield self.ids[start:labels[-1] + 1], vectors, self.metadatas[start:labels[-1] + 1], self.documents[start:labels[-1] + 1]
+
+  def delete_collection(self):
+    with self._lock:
+      for path in (self.index_path, self.records_path):
+        if os.path.exists(path):
+          os.remove(path)
+      self.index = None
+      self.dim = None
+      self.ids, self.metadatas, self.documents, self.labels = [], [], [], {}
+      self.dirty = False
+
 
-  def search_by_embedding(self, query_embedding: List[float], n_results: int = 3) -> Dict[str, Any]:
+class MirroredBackend:
+  """A primary store (usually Chroma Cloud) with a local read replica.
+
+  Queries are answered by the replica; writes go to the primary first and
+  then to the replica. sync() copies the primary into the replica and runs
+  at startup whenever their record counts differ, so each API replica can
+  serve reads from local disk while Chroma Cloud stays the source of truth.
+  """
+
+  def __init__(self, primary, replica, sync_on_start: bool = True):
+    self.primary = primary
+    self.replica = replica
+    self.defers_writes = replica.defers_writes
+    self.target = f"mirror:{primary.target}+{replica.target}"
+    self.collection_name = primary.collection_name
+    if sync_on_start and self.replica.count() != self.primary.count():
+      self.sync()
+
+  def sync(self, batch_size: int = SYNC_BATCH_SIZE) -> int:
+    """Copy every record from the primary into the replica; returns the number copied."""
+    copied = 0
+    for ids, embeddings, metadatas, documents in self.primary.iter_records(batch_size):
+      self.replica.upsert(ids, embeddings, metadatas, documents)
+      copied += len(ids)
+    self.replica.flush()
+    print(f"✓ Synced {copied} records from the primary into the local mirror of '{self.collection_name}'")
+    return copied
+
+  def upsert(self, ids: List[str], embeddings: Embeddings, metadatas: List[dict], documents: List[str]):
+    resp = self.primary.upsert(ids, embeddings, metadatas, documents)
+    self.replica.upsert(ids, embeddings, metadatas, documents)
+    return resp
+
+  def query(self, query_embeddings: Embeddings, n_results: int) -> Dict[str, Any]:
+    return self.replica.query(query_embeddings, n_results)
+
+  def count(self) -> int:
+    return self.primary.count()
+
+  def iter_records(self, batch_size: int = SYNC_BATCH_SIZE):
+    return self.primary.iter_records(batch_size)
+
+  def flush(self):
+    self.replica.flush()
+
+  def delete_collection(self):
+    self.primary.delete_collection()
+    self.replica.delete_collection()
+
+
+def local_backend(collection_name: str, kind: str, path: str):
+  if kind == "hnsw":
+    return HnswBackend(collection_name, path=path)
+  return persistent_backend(collection_name, path=path)
+
+
+def create_backend(kind: str, collection_name: str, path: str | None = None, **cloud_args):
+  """Build a backend by name: "cloud", "local" (persistent Chroma), "hnsw" or "mirror".
+
+  "mirror" pairs Chroma Cloud with a local replica whose kind comes from
+  VECTOR_MIRROR_BACKEND ("local" or "hnsw", default "hnsw").
+  """
+  path = path or os.getenv("VECTOR_STORE_PATH", DEFAULT_STORE_PATH)
+  if kind == "cloud":
+    return cloud_backend(collection_name, **cloud_args)
+  if kind in ("local", "hnsw"):
+    return local_backend(collection_name, kind, path)
+  if kind == "mirror":
+    replica_kind = os.getenv("VECTOR_MIRROR_BACKEND", "hnsw")
+    return MirroredBackend(cloud_backend(collection_name, **cloud_args), local_backend(collection_name, replica_kind, path))
+  raise ValueError(f"Unknown vector backend '{kind}' (expected cloud, local, hnsw or mirror)")
+
+
+class ChromaClientWrapper:
+  """Wrapper around a vector store backend for simple upsert and search operations.
+
+  The backend is chosen by the `backend` argument or the VECTOR_BACKEND
+  environment variable (default "cloud"):
+    - cloud:  Chroma Cloud; needs CHROMA_API_KEY (CHROMA_TENANT, CHROMA_DB optional)
+    - local:  embedded persistent Chroma under VECTOR_STORE_PATH (default chroma_data)
+    - hnsw:   a bare hnswlib index under VECTOR_STORE_PATH
+    - mirror: Chroma Cloud for writes, a local replica for reads
+  """
+
+  def __init__(self, collection_name: str = "tickets", api_key: str | None = None, tenant: str | None = None, database: str | None = None, backend: str | None = None, path: str | None = None):
+    kind = backend or os.getenv("VECTOR_BACKEND", DEFAULT_BACKEND)
+    self.backend = create_backend(kind, collection_name, path=path, api_key=api_key, tenant=tenant, database=database)
+    self.backend_name = kind
+    self.collection_name = collection_name
+
+  def upsert(self, ids: List[str], embeddings: Embeddings, metadatas: List[dict], documents: List[str]):
+    """Add or update documents in the collection.
+
+    Embeddings may be a 2-D numpy array; they are passed through without
+    converting each vector to a list. Re-sending an id overwrites it, so a
+    resumed ingest can safely repeat a chunk.
+    """
+    return self.backend.upsert(ids, embeddings, metadatas, documents)
+
+  def flush(self):
+    """Persist upserts the backend has buffered (the hnsw index and its local replica)."""
+    self.backend.flush()
+
+  @property
+  def defers_writes(self) -> bool:
+    """True if upserts are only durable after flush()."""
+    return self.backend.defers_writes
+
+  @property
+  def target(self) -> str:
+    """Backend kind and location, e.g. "hnsw:/srv/chroma_data"; checkpoints are only valid for one target."""
+    return self.backend.target
+
+  def delete_collection(self):
+    """Drop the collection (and any local replica of it) and its ingest checkpoint."""
+    self.backend.delete_collection()
+    checkpoint_path = default_checkpoint_path(self.collection_name)
+    if os.path.exists(checkpoint_path):
+      os.remove(checkpoint_path)
+
+  def search_by_embedding(self, query_embedding: Union[np.ndarray, List[float]], n_results: int = 3) -> Dict[str, Any]:
     """Query the collection using a vector and return Chroma result format.
 
     Returns a dict with keys: 'ids', 'documents', 'metadatas', 'distances'
     Compatible with format expected by rag_chain.py
     """
-    result = self.collection.query(
-        query_embeddings=[query_embedding],
-        n_results=n_results,
-        include=["metadatas", "documents", "distances"]
-    )
+    result = self.backend.query([query_embedding], n_results)
 
     # Chroma returns nested lists; unpack and structure for downstream use
     if not result or not result.get("documents"):
@@ -75,5 +382,9 @@ class ChromaClientWrapper:
         "distances": dists_list
     }
 
+  async def asearch_by_embedding(self, query_embedding: Union[np.ndarray, List[float]], n_results: int = 3) -> Dict[str, Any]:
+    """search_by_embedding on a worker thread, so network or disk I/O does not block the event loop."""
+    return await asyncio.to_thread(self.search_by_embedding, query_embedding, n_results)
+
 if __name__ == "__main__":
-  print("Chroma client wrapper loaded. Set CHROMA_API_KEY env var to use.")
\ No newline at end of file
+  print("Chroma client wrapper loaded. Set VECTOR_BACKEND (and CHROMA_API_KEY for cloud) to use.")
@@ -1,7 +1,11 @@
 import json
-from typing import List
+from typing import Iterator, List
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from json_stream import iter_json_array
+
 
 class EmbeddingGenerator:
     """Generate embeddings using a sentence-transformers model.
@@ -9,7 +13,9 @@ class EmbeddingGenerator:
     Methods
     - embed_text(text) -> List[float]
     - embed_texts(list_of_texts) -> List[List[float]]
+    - embed_batch(list_of_texts) -> np.ndarray (float32, one row per text)
     - load_tickets(file_path) -> List[dict]
+    - iter_tickets(file_path) -> Iterator[dict]
     """
 
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
@@ -26,6 +32,15 @@ class EmbeddingGenerator:
         embs = self.model.encode(texts)
         return [e.tolist() if hasattr(e, "tolist") else list(e) for e in embs]
 
+    def embed_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Return embeddings for a list of texts as one float32 array.
+
+        Skips the per-vector list conversion of embed_texts; Chroma accepts
+        the array as is.
+        """
+        embs = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(embs, dtype=np.float32)
+
     @staticmethod
     def load_tickets(file_path: str = "tickets.json") -> List[dict]:
         """Load tickets JSON file and return list of ticket dicts."""
@@ -33,6 +48,15 @@ class EmbeddingGenerator:
             data = json.load(f)
         return data.get("tickets", [])
 
+    @staticmethod
+    def iter_tickets(file_path: str = "tickets.json") -> Iterator[dict]:
+        """Yield ticket dicts one at a time without loading the whole file.
+
+        Accepts JSON Lines (one ticket per line, for .jsonl files) or the
+        {"tickets": [...]} layout of tickets.json.
+        """
+        return iter_json_array(file_path, "tickets")
+
 
 if __name__ == "__main__":
     # Load JSON data
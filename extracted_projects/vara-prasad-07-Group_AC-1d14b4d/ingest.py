@@ -1,76 +1,203 @@
 import os
+import json
+import hashlib
 import argparse
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional, Set
 from dotenv import load_dotenv
 
 from embeddings import EmbeddingGenerator
-from chroma import ChromaClientWrapper
+from chroma import ChromaClientWrapper, default_checkpoint_path
 
 # Load env vars from .env file
 load_dotenv()
 
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_CONCURRENCY = 4
+METADATA_FIELDS = ("ticket_id", "category", "status", "priority", "created_date")
+
 
 def build_document(ticket: dict) -> str:
     """Return only the customer query for embedding."""
     return ticket.get("customer_query", "").strip()
 
 
-def ingest(tickets_file: str, dry_run: bool = False, collection_name: str = "tickets"):
-    # load tickets
-    tickets = EmbeddingGenerator.load_tickets(tickets_file)
-    if not tickets:
-        print("No tickets found in", tickets_file)
-        return
-
-    embedder = EmbeddingGenerator()
-
-    ids: List[str] = []
-    documents: List[str] = []
-    metadatas: List[dict] = []
-
-    texts_for_embedding: List[str] = []
-
+def build_metadata(ticket: dict) -> dict:
+    """Metadata stored next to the embedding, including the resolution for search results."""
+    meta = {k: ticket.get(k) for k in METADATA_FIELDS}
+    if ticket.get("resolution"):
+        meta["resolution"] = ticket["resolution"]
+    return meta
+
+
+def content_hash(document: str, metadata: dict) -> str:
+    """Hash of everything that gets upserted for a ticket; unchanged tickets are skipped."""
+    payload = json.dumps({"document": document, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestCheckpoint:
+    """Content hashes of the tickets already upserted, persisted after every chunk.
+
+    A crashed or interrupted ingest resumes by skipping every ticket whose
+    hash is recorded here, and a re-run after editing tickets.json only
+    re-embeds the tickets that changed. The hashes only describe the store
+    named by `target` (see ChromaClientWrapper.target): a checkpoint written
+    for another backend or path is discarded, so the new store gets every
+    ticket. A target of None (dry runs) accepts any checkpoint.
+    """
+
+    def __init__(self, path: str, target: Optional[str] = None):
+        self.path = path
+        self.target = target
+        self.hashes: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if target is None or saved.get("target") == target:
+                self.hashes = saved.get("hashes", {})
+            else:
+                print(f"⚠️  Checkpoint {path} was written for {saved.get('target') or 'an unknown store'}, not {target}; re-ingesting every ticket")
+
+    def is_current(self, ticket_id: str, digest: str) -> bool:
+        return self.hashes.get(ticket_id) == digest
+
+    def record(self, digests: Dict[str, str]) -> None:
+        """Merge the hashes of a finished chunk and write the file atomically."""
+        self.hashes.update(digests)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"target": self.target, "hashes": self.hashes}, f)
+        os.replace(tmp_path, self.path)
+
+
+def iter_batches(tickets: Iterator[dict], checkpoint: Optional[IngestCheckpoint], batch_size: int, stats: Dict[str, int]) -> Iterator[Dict[str, list]]:
+    """Group tickets that need (re-)ingesting into batches of ids, documents, metadatas and hashes."""
+    batch = {"ids": [], "documents": [], "metadatas": [], "hashes": []}
     for t in tickets:
         tid = t.get("ticket_id") or t.get("id")
-        ids.append(tid)
+        if not tid:
+            stats["invalid"] += 1
+            continue
         doc = build_document(t)
-        documents.append(doc)
-        # Save useful metadata including resolution for reference during search
-        meta = {
-            k: t.get(k) for k in ("ticket_id", "category", "status", "priority", "created_date")
-        }
-        # Also add resolution to metadata so it's available after search
-        if t.get("resolution"):
-            meta["resolution"] = t["resolution"]
-        metadatas.append(meta)
-        # Embed only the customer query
-        texts_for_embedding.append(doc)
-
-    print(f"Generated {len(ids)} document entries. Generating embeddings...")
-    embeddings = embedder.embed_texts(texts_for_embedding)
+        meta = build_metadata(t)
+        digest = content_hash(doc, meta)
+        if checkpoint is not None and checkpoint.is_current(tid, digest):
+            stats["unchanged"] += 1
+            continue
+        batch["ids"].append(tid)
+        batch["documents"].append(doc)
+        batch["metadatas"].append(meta)
+        batch["hashes"].append(digest)
+        if len(batch["ids"]) == batch_size:
+            yield batch
+            batch = {"ids": [], "documents": [], "metadatas": [], "hashes": []}
+    if batch["ids"]:
+        yield batch
+
+
+def ingest(
+    tickets_file: str,
+    dry_run: bool = False,
+    collection_name: str = "tickets",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    checkpoint_path: Optional[str] = None,
+    full: bool = False,
+):
+    """Stream tickets into Chroma: embed a batch, upsert it in the background, checkpoint it.
+
+    At most `concurrency` upserts are in flight while the next batch is
+    being embedded; when that many are pending, embedding waits for one to
+    finish. A batch's hashes are only checkpointed once its upsert succeeded;
+    for backends that buffer writes until flush() (hnsw), once the final
+    flush has written them to disk.
+    """
+    embedder = EmbeddingGenerator()
+    chroma = None if dry_run else ChromaClientWrapper(collection_name=collection_name)
+    checkpoint = IngestCheckpoint(
+        checkpoint_path or default_checkpoint_path(collection_name),
+        target=chroma.target if chroma else None,
+    )
+    if full:
+        checkpoint.hashes = {}
+
+    stats = {"embedded": 0, "upserted": 0, "unchanged": 0, "invalid": 0}
+    batches = iter_batches(EmbeddingGenerator.iter_tickets(tickets_file), checkpoint, batch_size, stats)
 
     if dry_run:
         print("Dry run enabled — not upserting to Chroma. Sample output:")
-        for i in range(min(3, len(ids))):
-            print(f"ID={ids[i]}, meta={metadatas[i]}, doc_preview={documents[i][:120]}...")
-        return
-
-    # create chroma wrapper and upsert
-    chroma = ChromaClientWrapper(collection_name=collection_name)
-
-    print("Upserting embeddings to Chroma collection:", collection_name)
-    resp = chroma.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
-    print("Upsert response:", resp)
+        shown = 0
+        for batch in batches:
+            embeddings = embedder.embed_batch(batch["documents"], batch_size=batch_size)
+            stats["embedded"] += len(batch["ids"])
+            for i in range(min(3 - shown, len(batch["ids"]))):
+                print(f"ID={batch['ids'][i]}, meta={batch['metadatas'][i]}, dim={embeddings.shape[1]}, doc_preview={batch['documents'][i][:120]}...")
+                shown += 1
+        print(f"Embedded {stats['embedded']} tickets, {stats['unchanged']} unchanged, {stats['invalid']} without an id.")
+        return stats
+
+    print(f"Upserting embeddings to Chroma collection: {collection_name} (batch size {batch_size}, concurrency {concurrency})")
+
+    def finish(done: Set[Future]) -> None:
+        for future in done:
+            batch = pending.pop(future)
+            future.result()
+            unflushed.update(zip(batch["ids"], batch["hashes"]))
+            if not chroma.defers_writes:
+                checkpoint.record(unflushed)
+                unflushed.clear()
+            stats["upserted"] += len(batch["ids"])
+            print(f"  upserted {stats['upserted']} tickets")
+
+    pending: Dict[Future, Dict[str, list]] = {}
+    unflushed: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for batch in batches:
+            embeddings = embedder.embed_batch(batch["documents"], batch_size=batch_size)
+            stats["embedded"] += len(batch["ids"])
+            if len(pending) >= concurrency:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                finish(done)
+            future = executor.submit(
+                chroma.upsert,
+                ids=batch["ids"],
+                embeddings=embeddings,
+                metadatas=batch["metadatas"],
+                documents=batch["documents"],
+            )
+            pending[future] = batch
+        finish(set(pending))
+    chroma.flush()
+    if unflushed:
+        checkpoint.record(unflushed)
+
+    if not stats["embedded"] and not stats["unchanged"]:
+        print("No tickets found in", tickets_file)
+    print(f"Upserted {stats['upserted']} tickets, skipped {stats['unchanged']} unchanged, {stats['invalid']} without an id.")
+    return stats
 
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest tickets.json into Chroma with embeddings")
-    parser.add_argument("--tickets", default="tickets.json", help="Path to tickets.json")
+    parser.add_argument("--tickets", default="tickets.json", help="Path to tickets.json (or a .jsonl file with one ticket per line)")
     parser.add_argument("--dry-run", action="store_true", help="Generate embeddings but don't upsert to Chroma")
     parser.add_argument("--collection", default="tickets", help="Chroma collection name")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Tickets embedded and upserted per batch")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Maximum upserts in flight")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: .ingest_checkpoint_<collection>.json)")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and re-ingest every ticket")
     args = parser.parse_args()
 
-    ingest(tickets_file=args.tickets, dry_run=args.dry_run, collection_name=args.collection)
+    ingest(
+        tickets_file=args.tickets,
+        dry_run=args.dry_run,
+        collection_name=args.collection,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint,
+        full=args.full,
+    )
 
 
 if __name__ == "__main__":
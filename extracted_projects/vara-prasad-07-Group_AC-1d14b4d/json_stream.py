@@ -0,0 +1,75 @@
+import json
+import re
+from typing import Any, Iterator
+
+# Bytes read per step when streaming records out of a large JSON file.
+READ_CHUNK_SIZE = 1 << 16
+# Whitespace and the comma between two elements
+_SEPARATOR = re.compile(r"\s*,*\s*")
+
+
+def _may_continue(item: Any, buffer: str, end: int) -> bool:
+    """True if `item` is a number not yet followed by "," or "]", so the next chunk may extend it.
+
+    raw_decode stops at the end of the buffer, so "12" may really be "1234"
+    and "1.5" may be "1.5e-07".
+    """
+    if not isinstance(item, (int, float)) or isinstance(item, bool):
+        return False
+    while end < len(buffer) and buffer[end].isspace():
+        end += 1
+    return end == len(buffer) or buffer[end] not in ",]"
+
+
+def iter_json_array(file_path: str, key: str) -> Iterator[Any]:
+    """Yield the elements of the top-level array `key` without loading the whole file.
+
+    Handles the {"<key>": [...]} layout of tickets.json and userdata.json by
+    decoding one element at a time from a rolling buffer. Files ending in
+    .jsonl are read as JSON Lines, one element per line. Raises ValueError
+    if the array is missing and json.JSONDecodeError if the file is malformed.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        if file_path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = ""
+        # Skip ahead to the opening bracket of the array
+        while True:
+            found = buffer.find(f'"{key}"')
+            start = buffer.find("[", found) if found != -1 else -1
+            if start != -1:
+                buffer = buffer[start + 1:]
+                break
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise ValueError(f'No "{key}" array found in {file_path}')
+            buffer += chunk
+
+        # Decoded elements are skipped by moving `pos`; the consumed text is
+        # dropped once per read rather than the buffer being copied per element
+        pos = 0
+        eof = False
+        while True:
+            pos = _SEPARATOR.match(buffer, pos).end()
+            if buffer.startswith("]", pos):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                complete = eof or not _may_continue(item, buffer, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+            pos = end
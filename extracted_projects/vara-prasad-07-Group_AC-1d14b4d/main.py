@@ -1,7 +1,8 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from datetime import datetime
 
 from fastapi import FastAPI, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,6 +13,7 @@ from embeddings import EmbeddingGenerator
 from chroma import ChromaClientWrapper
 from rag_chain import TelecomRAGChain
 from userdata_manager import get_user_manager, get_user_by_phone, format_user_context, extract_phone_number
+from session_store import create_session_store
 
 load_dotenv()
 
@@ -24,8 +26,17 @@ try:
 except Exception as e:
     raise RuntimeError(f"Failed to initialize components: {e}")
 
-# In-memory session storage: {session_id: {"messages": [...], "created": datetime, "updated": datetime, "type": "chat|voice", "caller": None}}
-SESSIONS: Dict[str, Dict] = {}
+# Session storage: {session_id: {"messages": [...], "created_at": str, "last_updated": str, "type": "chat|voice", "caller": None}}
+# Bounded per-session history with idle-TTL eviction; in-process by default, or a
+# SQLite file shared by all workers with SESSION_BACKEND=sqlite (see session_store.py)
+sessions = create_session_store()
+
+# Voice webhooks must answer before Twilio's 15 second webhook timeout, including
+# the TwiML round trip, so the RAG pipeline gets a tighter budget.
+VOICE_RAG_TIMEOUT_SECONDS = float(os.getenv("VOICE_RAG_TIMEOUT_SECONDS", "8"))
+# Embedding is CPU-bound; a small dedicated pool keeps it off the event loop
+# without letting concurrent calls oversubscribe the CPU.
+EMBED_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("EMBED_WORKERS", "2")), thread_name_prefix="embed")
 
 
 class ChatRequest(BaseModel):
@@ -86,7 +97,9 @@ def health_check():
         "status": "ok",
         "service": "Telecom Support AI Agent",
         "components": ["embedding", "chroma", "rag_chain", "llm"],
-        "sessions_active": len(SESSIONS)
+        "vector_backend": chroma_client.backend_name,
+        "sessions_active": len(sessions),
+        "answer_cache": rag_chain.answer_cache.stats()
     }
 
 
@@ -100,29 +113,17 @@ def create_session(session_id: str, session_type: str = "chat", caller: Optional
         session_type: "chat" for text, "voice" for phone calls
         caller: Phone number for voice sessions
     """
-    SESSIONS[session_id] = {
-        "messages": [],
-        "created_at": datetime.utcnow().isoformat(),
-        "last_updated": datetime.utcnow().isoformat(),
-        "type": session_type,
-        "caller": caller
-    }
+    sessions.create(session_id, session_type=session_type, caller=caller)
 
 
 def add_to_session(session_id: str, role: str, content: str) -> None:
-    """Add a message to a session's conversation history."""
-    if session_id not in SESSIONS:
-        create_session(session_id)
-    
-    SESSIONS[session_id]["messages"].append({"role": role, "content": content})
-    SESSIONS[session_id]["last_updated"] = datetime.utcnow().isoformat()
+    """Add a message to a session's conversation history (only the most recent messages are kept)."""
+    sessions.add_message(session_id, role, content)
 
 
 def get_session_history(session_id: str) -> List[Dict[str, str]]:
     """Retrieve conversation history for a session."""
-    if session_id not in SESSIONS:
-        return []
-    return SESSIONS[session_id]["messages"]
+    return sessions.history(session_id)
 
 
 def format_history_for_context(history: List[Dict[str, str]]) -> str:
@@ -138,33 +139,70 @@ def format_history_for_context(history: List[Dict[str, str]]) -> str:
     return history_text + "\n---\n\n"
 
 
-def get_ai_answer_via_rag(question: str, phone_number: Optional[str] = None, session_id: Optional[str] = None, top_k: int = 3) -> Dict:
+def fallback_answer(search_results: Optional[Dict]) -> Dict:
+    """
+    Answer without the LLM, used when the voice RAG pipeline runs out of time.
+
+    Reads out the resolution of the closest past case if retrieval finished,
+    otherwise offers a transfer to a human agent.
+    """
+    metadatas = (search_results or {}).get("metadatas") or []
+    resolution = metadatas[0].get("resolution") if metadatas and metadatas[0] else None
+    if resolution:
+        return {
+            "answer": f"Here is what usually fixes this: {resolution}",
+            "sources": (search_results or {}).get("ids", [])[:1],
+            "needs_escalation": False
+        }
+    return {
+        "answer": "I'm having trouble connecting to my knowledge base right now. Let me transfer you to a human agent who can help.",
+        "sources": [],
+        "needs_escalation": True
+    }
+
+
+async def get_ai_answer_via_rag(question: str, phone_number: Optional[str] = None, session_id: Optional[str] = None, top_k: int = 3, timeout: float = VOICE_RAG_TIMEOUT_SECONDS) -> Dict:
     """
-    Get AI answer using the RAG chain with optional user data.
+    Get AI answer using the RAG chain with optional user data, without blocking the event loop.
+
+    The query is embedded on EMBED_EXECUTOR, the vector search runs on a worker
+    thread and the LLM calls use LangChain's async API, so concurrent callers
+    are not stalled by one slow request. The whole pipeline must finish within
+    `timeout` seconds; otherwise fallback_answer() is returned.
     
     Args:
         question: Customer's question
         phone_number: Optional phone number to load user data
         session_id: Optional session ID to include conversation history
         top_k: Number of similar tickets to retrieve
+        timeout: Seconds allowed for the whole pipeline (kept below Twilio's webhook timeout)
     
     Returns:
         Dict with "answer", "sources", and "needs_escalation"
     """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    search_results = None
     try:
         # Load user data if phone number is provided
         user_context = ""
         if phone_number:
-            user_data = get_user_by_phone(phone_number)
+            user_data = await asyncio.to_thread(get_user_by_phone, phone_number)
             if user_data:
                 user_context = format_user_context(user_data)
                 print(f"✓ Loaded user context for {phone_number}")
         
         # Embed query
-        q_emb = embedding_gen.embed_text(question)
+        q_emb = await asyncio.wait_for(
+            loop.run_in_executor(EMBED_EXECUTOR, embedding_gen.embed_text, question),
+            timeout=max(deadline - loop.time(), 0)
+        )
         
         # Search Chroma
-        search_results = chroma_client.search_by_embedding(q_emb, n_results=top_k)
+        search_results = await asyncio.wait_for(
+            chroma_client.asearch_by_embedding(q_emb, n_results=top_k),
+            timeout=max(deadline - loop.time(), 0)
+        )
         
         if not search_results or not search_results.get("documents"):
             return {
@@ -174,17 +212,19 @@ def get_ai_answer_via_rag(question: str, phone_number: Optional[str] = None, ses
             }
         
         # Run RAG pipeline with user context
-        rag_result = rag_chain.run(question, search_results, user_context=user_context)
+        rag_result = await asyncio.wait_for(
+            rag_chain.arun(question, search_results, user_context=user_context, query_embedding=q_emb),
+            timeout=max(deadline - loop.time(), 0)
+        )
         
         return rag_result
         
+    except asyncio.TimeoutError:
+        print(f"⏱️ RAG pipeline exceeded {timeout:.1f}s, using fallback answer")
+        return fallback_answer(search_results)
     except Exception as e:
         print(f"❌ RAG Chain Error: {e}")
-        return {
-            "answer": "I'm having trouble connecting to my knowledge base right now. Let me transfer you to a human agent who can help.",
-            "sources": [],
-            "needs_escalation": True
-        }
+        return fallback_answer(None)
 
 
 # ============ Stateless Chat Endpoint (no session) ============
@@ -248,7 +288,7 @@ def chat(req: ChatRequest):
             )
 
         # Step 5-6: Run LangChain RAG pipeline with user context
-        rag_result = rag_chain.run(req.query, search_results, user_context=user_context)
+        rag_result = rag_chain.run(req.query, search_results, user_context=user_context, query_embedding=q_emb)
 
         return ChatResponse(
             answer=rag_result["answer"],
@@ -271,7 +311,8 @@ def session_chat(req: SessionChatRequest):
     
     The LLM can see and reference previous messages in the conversation.
     User data is loaded from phone number if provided.
-    Session history is stored in-memory and will be cleared on app restart.
+    Only the most recent messages are kept, and sessions expire after a period of
+    inactivity (SESSION_TTL_SECONDS); see session_store.py.
     
     Args:
         req: SessionChatRequest with session_id, query, optional top_k, and optional phone_number
@@ -288,7 +329,7 @@ def session_chat(req: SessionChatRequest):
             raise HTTPException(status_code=400, detail="Session ID required")
         
         # Create session if it doesn't exist
-        if req.session_id not in SESSIONS:
+        if not sessions.exists(req.session_id):
             create_session(req.session_id)
         
         # Extract phone number if provided
@@ -324,7 +365,7 @@ def session_chat(req: SessionChatRequest):
             )
         
         # Step 3-4: Run RAG pipeline with user context
-        rag_result = rag_chain.run(req.query, search_results, user_context=user_context)
+        rag_result = rag_chain.run(req.query, search_results, user_context=user_context, query_embedding=q_emb)
         
         # Step 5: Add to session history
         add_to_session(req.session_id, "user", req.query)
@@ -347,10 +388,10 @@ def session_chat(req: SessionChatRequest):
 @app.get("/session/{session_id}")
 def get_session_info(session_id: str) -> SessionInfoResponse:
     """Get information about a session (message count, timestamps)."""
-    if session_id not in SESSIONS:
+    session = sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
     
-    session = SESSIONS[session_id]
     return SessionInfoResponse(
         session_id=session_id,
         created_at=session["created_at"],
@@ -362,23 +403,16 @@ def get_session_info(session_id: str) -> SessionInfoResponse:
 @app.delete("/session/{session_id}")
 def clear_session(session_id: str):
     """Clear (delete) a session and all its history."""
-    if session_id not in SESSIONS:
+    if not sessions.delete(session_id):
         raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
     
-    del SESSIONS[session_id]
     return {"message": f"Session {session_id} cleared"}
 
 
 @app.get("/sessions")
 def list_sessions():
     """List all active sessions with summary info."""
-    sessions_info = []
-    for sid, session in SESSIONS.items():
-        sessions_info.append({
-            "session_id": sid,
-            "created_at": session["created_at"],
-            "message_count": len(session["messages"])
-        })
+    sessions_info = sessions.list()
     return {"sessions": sessions_info, "total": len(sessions_info)}
 
 
@@ -442,7 +476,7 @@ async def incoming_call(request: Request):
         
         if phone_number:
             try:
-                user_data = get_user_by_phone(phone_number)
+                user_data = await asyncio.to_thread(get_user_by_phone, phone_number)
                 if user_data and "name" in user_data:
                     user_name = user_data["name"].split()[0]  # Get first name only
                     user_context_loaded = True
@@ -451,9 +485,7 @@ async def incoming_call(request: Request):
                 print(f"   ⚠️ Could not load user data: {e}")
         
         # Create voice session with user info
-        create_session(call_sid, session_type="voice", caller=caller)
-        SESSIONS[call_sid]["user_name"] = user_name
-        SESSIONS[call_sid]["phone_number"] = phone_number
+        sessions.create(call_sid, session_type="voice", caller=caller, user_name=user_name, phone_number=phone_number)
         
         # Personalized greeting
         twiml = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -517,9 +549,10 @@ async def process_speech(
         # Get user name from session
         user_name = "there"
         phone_number = None
-        if CallSid in SESSIONS:
-            user_name = SESSIONS[CallSid].get("user_name", "there")
-            phone_number = SESSIONS[CallSid].get("phone_number")
+        session = sessions.get(CallSid) if CallSid else None
+        if session:
+            user_name = session.get("user_name", "there")
+            phone_number = session.get("phone_number")
         
         # Check if speech was understood
         if not SpeechResult or Confidence < 0.5:
@@ -559,7 +592,7 @@ async def process_speech(
         
         # Get AI-powered answer using RAG chain with user data
         print(f"   🌟 Getting RAG chain response...")
-        rag_result = get_ai_answer_via_rag(SpeechResult, phone_number=phone_number, session_id=CallSid)
+        rag_result = await get_ai_answer_via_rag(SpeechResult, phone_number=phone_number, session_id=CallSid)
         answer = rag_result["answer"]
         needs_escalation = rag_result["needs_escalation"]
         
@@ -567,7 +600,7 @@ async def process_speech(
         print(f"   🚨 Escalation needed: {needs_escalation}")
         
         # Store in session
-        if CallSid in SESSIONS:
+        if session:
             add_to_session(CallSid, "user", SpeechResult)
             add_to_session(CallSid, "assistant", answer)
         
@@ -632,8 +665,9 @@ async def followup(
     """
     try:
         user_name = "there"
-        if CallSid in SESSIONS:
-            user_name = SESSIONS[CallSid].get("user_name", "there")
+        session = sessions.get(CallSid) if CallSid else None
+        if session:
+            user_name = session.get("user_name", "there")
         
         # If no response or unclear, end call
         print(f"\n🔄 Follow-up from {From}: no response or end of call")
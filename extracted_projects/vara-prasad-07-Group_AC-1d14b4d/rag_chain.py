@@ -5,6 +5,8 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from dotenv import load_dotenv
 
+from answer_cache import create_answer_cache, user_context_class
+
 load_dotenv()
 
 
@@ -15,6 +17,7 @@ class TelecomRAGChain:
     - Generates response using Gemini LLM via LangChain
     - Handles escalation logic
     - Uses prompt templates for consistency
+    - Reuses answers to near-identical questions (see answer_cache.py)
     """
 
     def __init__(self):
@@ -70,6 +73,30 @@ Respond with ONLY: "YES" or "NO" (no explanation)""",
 
         self.output_parser = StrOutputParser()
 
+        # Semantic cache of anonymous answers, keyed by query embedding
+        self.answer_cache = create_answer_cache()
+
+        # LangChain runnables, built once and shared by the sync and async paths
+        self.rag_runnable = (
+            {
+                "user_context": RunnablePassthrough(),
+                "case_context": RunnablePassthrough(),
+                "question": RunnablePassthrough()
+            }
+            | self.rag_prompt
+            | self.llm
+            | self.output_parser
+        )
+        self.escalation_runnable = (
+            {
+                "question": RunnablePassthrough(),
+                "response": RunnablePassthrough()
+            }
+            | self.escalation_prompt
+            | self.llm
+            | self.output_parser
+        )
+
     def format_case_context(self, search_results):
         """
         Format Chroma search results into readable context for the LLM.
@@ -110,20 +137,8 @@ Respond with ONLY: "YES" or "NO" (no explanation)""",
         Returns:
             dict: {'response': str, 'user_context': str, 'case_context': str}
         """
-        # Build RAG chain using LangChain
-        rag_chain = (
-            {
-                "user_context": RunnablePassthrough(),
-                "case_context": RunnablePassthrough(),
-                "question": RunnablePassthrough()
-            }
-            | self.rag_prompt
-            | self.llm
-            | self.output_parser
-        )
-
         # Generate response
-        response = rag_chain.invoke({
+        response = self.rag_runnable.invoke({
             "user_context": user_context,
             "case_context": case_context,
             "question": question
@@ -146,31 +161,34 @@ Respond with ONLY: "YES" or "NO" (no explanation)""",
         Returns:
             bool: True if escalation needed
         """
-        escalation_chain = (
-            {
-                "question": RunnablePassthrough(),
-                "response": RunnablePassthrough()
-            }
-            | self.escalation_prompt
-            | self.llm
-            | self.output_parser
-        )
-
-        decision = escalation_chain.invoke({
+        decision = self.escalation_runnable.invoke({
             "question": question,
             "response": response
         }).strip().upper()
 
         return "YES" in decision
 
-    def run(self, question, search_results, user_context=""):
+    def _cached(self, query_embedding, search_results, user_context):
+        """Return (cached result or None, cache key args) for a query; key args are None without an embedding."""
+        if query_embedding is None:
+            return None, None
+        key = (query_embedding, search_results.get("ids", []), user_context_class(user_context))
+        return self.answer_cache.lookup(*key), key
+
+    def run(self, question, search_results, user_context="", query_embedding=None):
         """
         Full RAG pipeline: retrieve -> format -> generate -> escalate check.
 
+        When query_embedding is given, an answer generated earlier for a
+        semantically similar question with the same retrieved cases is reused
+        instead of calling the LLM. Answers built with user_context are never
+        cached.
+
         Args:
             question (str): Customer query
             search_results (dict): Chroma search results with documents, ids, metadatas
             user_context (str): Optional formatted user account information
+            query_embedding (list | np.ndarray): Optional embedding of the question, enables the cache
 
         Returns:
             dict: {
@@ -180,6 +198,10 @@ Respond with ONLY: "YES" or "NO" (no explanation)""",
                 'confidence': str
             }
         """
+        cached, cache_key = self._cached(query_embedding, search_results, user_context)
+        if cached is not None:
+            return cached
+
         # Step 1: Format retrieved case context
         case_context = self.format_case_context(search_results)
 
@@ -189,12 +211,63 @@ Respond with ONLY: "YES" or "NO" (no explanation)""",
         # Step 3: Check if escalation needed
         needs_escalation = self.check_escalation(question, result["response"])
 
+        rag_result = {
+            "answer": result["response"],
+            "source_tickets": search_results.get("ids", []),
+            "needs_escalation": needs_escalation,
+            "confidence": "low" if needs_escalation else "high"
+        }
+        if cache_key is not None:
+            self.answer_cache.store(*cache_key, rag_result)
+        return rag_result
+
+
+    async def agenerate_response(self, question, user_context, case_context):
+        """Async version of generate_response; the LLM call does not block the event loop."""
+        response = await self.rag_runnable.ainvoke({
+            "user_context": user_context,
+            "case_context": case_context,
+            "question": question
+        })
+
         return {
+            "response": response.strip(),
+            "user_context": user_context,
+            "case_context": case_context
+        }
+
+    async def acheck_escalation(self, question, response):
+        """Async version of check_escalation."""
+        decision = await self.escalation_runnable.ainvoke({
+            "question": question,
+            "response": response
+        })
+
+        return "YES" in decision.strip().upper()
+
+    async def arun(self, question, search_results, user_context="", query_embedding=None):
+        """
+        Async version of run, for callers on an event loop (the Twilio voice webhooks).
+
+        Same arguments, answer cache and return value as run().
+        """
+        cached, cache_key = self._cached(query_embedding, search_results, user_context)
+        if cached is not None:
+            return cached
+
+        case_context = self.format_case_context(search_results)
+        result = await self.agenerate_response(question, user_context, case_context)
+        needs_escalation = await self.acheck_escalation(question, result["response"])
+
+        rag_result = {
             "answer": result["response"],
             "source_tickets": search_results.get("ids", []),
             "needs_escalation": needs_escalation,
             "confidence": "low" if needs_escalation else "high"
         }
+        if cache_key is not None:
+            self.answer_cache.store(*cache_key, rag_result)
+        return rag_result
 
 
 if __name__ == "__main__":
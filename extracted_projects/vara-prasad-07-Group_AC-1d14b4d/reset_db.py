@@ -5,18 +5,20 @@ This ensures we only embed customer_query, not the full resolution.
 """
 import os
 from dotenv import load_dotenv
-from chroma import ChromaClientWrapper
+from chroma import ChromaClientWrapper, default_checkpoint_path
 
 load_dotenv()
 
 # Delete old collection
 try:
     client = ChromaClientWrapper()
-    # Get the raw client to delete collection
-    client.client.delete_collection(name="tickets")
-    print("✓ Old collection 'tickets' deleted")
+    client.delete_collection()
+    print("✓ Old collection 'tickets' and its ingest checkpoint deleted")
 except Exception as e:
     print(f"Note: Could not delete collection (may not exist): {e}")
+    # Without its collection the checkpoint would make ingest skip every ticket
+    if os.path.exists(default_checkpoint_path("tickets")):
+        os.remove(default_checkpoint_path("tickets"))
 
 print("\nNow run: python ingest.py --tickets tickets.json")
 print("This will ingest with customer_query embeddings only.")
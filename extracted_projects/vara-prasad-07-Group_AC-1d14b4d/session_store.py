@@ -0,0 +1,363 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_TTL_SECONDS = 30 * 60
+DEFAULT_MAX_SESSIONS = 10000
+# format_history_for_context only looks at the last 6 messages; keep a little more
+# so clients showing the conversation still get a few turns of it.
+DEFAULT_MAX_MESSAGES = 20
+# Expired sessions are swept at most this often, on the next write.
+EVICT_INTERVAL_SECONDS = 60
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class InMemorySessionStore:
+    """
+    Per-process session store with bounded memory.
+
+    - Each session keeps only its last `max_messages` messages (a ring buffer).
+    - Sessions idle for longer than `ttl_seconds` are evicted.
+    - At most `max_sessions` sessions are kept; the least recently active goes first.
+
+    Sessions are dicts with "messages", "created_at", "last_updated", "type",
+    "caller" and any extra fields set through create() or update().
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_sessions: int = DEFAULT_MAX_SESSIONS, max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        # session_id -> session, least recently active first
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.evicted = 0
+
+    def _touch(self, session_id: str, session: Dict[str, Any]) -> None:
+        session["last_updated"] = _now_iso()
+        session["_last_seen"] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+
+    def _expired(self, session: Dict[str, Any], now: float) -> bool:
+        return now - session["_last_seen"] > self.ttl_seconds
+
+    def _sweep(self) -> None:
+        """Drop expired sessions and enforce the session cap (caller holds the lock)."""
+        now = time.monotonic()
+        if now - self._last_sweep >= EVICT_INTERVAL_SECONDS:
+            self._last_sweep = now
+            # Oldest activity first, so stop at the first live session
+            while self._sessions:
+                session_id, session = next(iter(self._sessions.items()))
+                if not self._expired(session, now):
+                    break
+                del self._sessions[session_id]
+                self.evicted += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def _get_live(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is not None and self._expired(session, time.monotonic()):
+            del self._sessions[session_id]
+            self.evicted += 1
+            return None
+        return session
+
+    def _public(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        public = {k: v for k, v in session.items() if not k.startswith("_")}
+        public["messages"] = list(session["messages"])
+        return public
+
+    def _create(self, session_id: str, session_type: str = "chat", caller: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+        now = _now_iso()
+        session = {
+            "messages": deque(maxlen=self.max_messages),
+            "created_at": now,
+            "last_updated": now,
+            "type": session_type,
+            "caller": caller,
+            **fields,
+        }
+        self._sessions[session_id] = session
+        self._touch(session_id, session)
+        return session
+
+    def create(self, session_id: str, session_type: str = "chat", caller: Optional[str] = None, **fields: Any) -> None:
+        with self._lock:
+            self._create(session_id, session_type, caller, **fields)
+            self._sweep()
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return self._get_live(session_id) is not None
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the session, or None if it does not exist or has expired."""
+        with self._lock:
+            session = self._get_live(session_id)
+            return self._public(session) if session is not None else None
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        """Set extra fields (e.g. user_name, phone_number) on an existing session."""
+        with self._lock:
+            session = self._get_live(session_id)
+            if session is not None:
+                session.update(fields)
+                self._touch(session_id, session)
+
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        """Append a message, creating the session if needed; old messages fall off the end."""
+        with self._lock:
+            session = self._get_live(session_id) or self._create(session_id)
+            session["messages"].append({"role": role, "content": content})
+            self._touch(session_id, session)
+            self._sweep()
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            session = self._get_live(session_id)
+            return list(session["messages"]) if session is not None else []
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the live sessions: session_id, created_at, message_count."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {"session_id": sid, "created_at": s["created_at"], "message_count": len(s["messages"])}
+                for sid, s in self._sessions.items()
+                if not self._expired(s, now)
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    type TEXT,
+    caller TEXT,
+    fields TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    last_updated TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions(last_seen);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+"""
+
+
+class SQLiteSessionStore:
+    """
+    Session store in a SQLite file, shared by every worker process that opens it.
+
+    Same interface and limits as InMemorySessionStore. Uses WAL mode so
+    uvicorn workers can read while another writes; point `path` at a tmpfs
+    such as /dev/shm to keep it in shared memory.
+    """
+
+    def __init__(self, path: str = "sessions.sqlite3", ttl_seconds: float = DEFAULT_TTL_SECONDS, max_sessions: int = DEFAULT_MAX_SESSIONS, max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.evicted = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    def _live_row(self, session_id: str):
+        return self._conn.execute(
+            "SELECT type, caller, fields, created_at, last_updated FROM sessions WHERE session_id = ? AND last_seen >= ?",
+            (session_id, time.time() - self.ttl_seconds),
+        ).fetchone()
+
+    def _touch(self, session_id: str) -> None:
+        self._conn.execute(
+            "UPDATE sessions SET last_updated = ?, last_seen = ? WHERE session_id = ?",
+            (_now_iso(), time.time(), session_id),
+        )
+
+    def _delete_where(self, condition: str, params: tuple) -> int:
+        ids = [row[0] for row in self._conn.execute(f"SELECT session_id FROM sessions WHERE {condition}", params)]
+        for session_id in ids:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return len(ids)
+
+    def _sweep(self) -> None:
+        """Drop expired sessions and enforce the session cap (caller holds the lock, in a transaction)."""
+        now = time.time()
+        if now - self._last_sweep >= EVICT_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self.evicted += self._delete_where("last_seen < ?", (now - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        if count > self.max_sessions:
+            self.evicted += self._delete_where(
+                "session_id IN (SELECT session_id FROM sessions ORDER BY last_seen LIMIT ?)",
+                (count - self.max_sessions,),
+            )
+
+    def _create(self, session_id: str, session_type: str = "chat", caller: Optional[str] = None, **fields: Any) -> None:
+        now = _now_iso()
+        self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, type, caller, fields, created_at, last_updated, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, session_type, caller, json.dumps(fields), now, now, time.time()),
+        )
+
+    def create(self, session_id: str, session_type: str = "chat", caller: Optional[str] = None, **fields: Any) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._create(session_id, session_type, caller, **fields)
+                self._sweep()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return self._live_row(session_id) is not None
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._live_row(session_id)
+            if row is None:
+                return None
+            session_type, caller, fields, created_at, last_updated = row
+            return {
+                **json.loads(fields),
+                "messages": self._messages(session_id),
+                "created_at": created_at,
+                "last_updated": last_updated,
+                "type": session_type,
+                "caller": caller,
+            }
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._live_row(session_id)
+                if row is not None:
+                    merged = {**json.loads(row[2]), **fields}
+                    self._conn.execute("UPDATE sessions SET fields = ? WHERE session_id = ?", (json.dumps(merged), session_id))
+                    self._touch(session_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._live_row(session_id) is None:
+                    self._create(session_id)
+                self._conn.execute(
+                    "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                    (session_id, role, content),
+                )
+                # Ring buffer: keep only the newest max_messages rows
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND id <= "
+                    "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (session_id, session_id, self.max_messages),
+                )
+                self._touch(session_id)
+                self._sweep()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _messages(self, session_id: str) -> List[Dict[str, str]]:
+        rows = self._conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id",
+            (session_id,),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            if self._live_row(session_id) is None:
+                return []
+            return self._messages(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._delete_where("session_id = ?", (session_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return deleted > 0
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.session_id, s.created_at, COUNT(m.id) FROM sessions s "
+                "LEFT JOIN messages m ON m.session_id = s.session_id "
+                "WHERE s.last_seen >= ? GROUP BY s.session_id ORDER BY s.last_seen",
+                (time.time() - self.ttl_seconds,),
+            ).fetchall()
+        return [{"session_id": sid, "created_at": created_at, "message_count": count} for sid, created_at, count in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE last_seen >= ?",
+                (time.time() - self.ttl_seconds,),
+            ).fetchone()
+            return count
+
+
+def create_session_store():
+    """
+    Build the session store from environment variables:
+
+    - SESSION_BACKEND: "memory" (default) or "sqlite"
+    - SESSION_DB_PATH: SQLite file for the sqlite backend (default sessions.sqlite3)
+    - SESSION_TTL_SECONDS, SESSION_MAX_SESSIONS, SESSION_MAX_MESSAGES: limits
+    """
+    limits = {
+        "ttl_seconds": float(os.getenv("SESSION_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        "max_sessions": int(os.getenv("SESSION_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)),
+        "max_messages": int(os.getenv("SESSION_MAX_MESSAGES", DEFAULT_MAX_MESSAGES)),
+    }
+    backend = os.getenv("SESSION_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_DB_PATH", "sessions.sqlite3"), **limits)
+    if backend == "memory":
+        return InMemorySessionStore(**limits)
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}' (expected memory or sqlite)")
@@ -0,0 +1,66 @@
+import time
+import numpy as np
+
+from answer_cache import ANONYMOUS, PERSONAL, SemanticAnswerCache, user_context_class
+
+# Runs offline: hand-made embeddings stand in for the sentence-transformer
+
+print("\n" + "="*50)
+print("🧪 ANSWER CACHE TEST")
+print("="*50)
+
+rng = np.random.default_rng(3)
+router = rng.normal(size=384).astype(np.float32)
+paraphrase = router + 0.05 * rng.normal(size=384).astype(np.float32)
+unrelated = rng.normal(size=384).astype(np.float32)
+cases = ["T0001", "T0042"]
+answer = {"answer": "Restart the router and wait two minutes.", "sources": cases}
+
+print("\n🔍 Lookups...")
+cache = SemanticAnswerCache(max_entries=3, ttl_seconds=60, similarity_threshold=0.92)
+assert cache.lookup(router, cases) is None
+cache.store(router, cases, ANONYMOUS, answer)
+hit = cache.lookup(paraphrase * 3.0, cases)
+assert hit == answer
+hit["answer"] = "changed by the caller"
+assert cache.lookup(router, cases)["answer"] == answer["answer"]
+print("   ✓ a paraphrased query hits, whatever its embedding's scale, and returns a copy")
+
+assert cache.lookup(unrelated, cases) is None
+assert cache.lookup(router, list(reversed(cases))) is None
+assert cache.lookup(router, ["T0001"]) is None
+print("   ✓ a different query or different retrieved cases miss")
+
+assert user_context_class("") == ANONYMOUS and user_context_class("  \n") == ANONYMOUS
+assert user_context_class("Current Balance: ₹120") == PERSONAL
+cache.store(router, cases, PERSONAL, {"answer": "Your balance is ₹120"})
+assert cache.lookup(router, cases, PERSONAL) is None
+assert cache.stats()["entries"] == 1
+print("   ✓ answers built with account details are never cached")
+
+print("\n♻️  Eviction...")
+for i in range(3):
+    cache.store(rng.normal(size=384), [f"T1{i}"], ANONYMOUS, {"answer": f"answer {i}"})
+assert cache.stats()["entries"] == 3
+assert cache.lookup(router, cases) is None
+print("   ✓ the least recently used answer is evicted at max_entries")
+
+short = SemanticAnswerCache(max_entries=10, ttl_seconds=0.1)
+short.store(router, cases, ANONYMOUS, answer)
+assert short.lookup(router, cases) == answer
+time.sleep(0.2)
+assert short.lookup(router, cases) is None
+assert short.stats()["entries"] == 0
+print("   ✓ answers expire after the TTL")
+
+disabled = SemanticAnswerCache(max_entries=0)
+disabled.store(router, cases, ANONYMOUS, answer)
+assert disabled.lookup(router, cases) is None and disabled.stats()["bypassed"] == 1
+print("   ✓ max_entries=0 disables the cache")
+
+stats = cache.stats()
+assert stats["hits"] == 2 and stats["hit_rate"] == round(2 / (stats["hits"] + stats["misses"]), 3)
+print(f"   📊 {stats}")
+
+print("\n✅ All answer cache checks passed")
+print("="*50 + "\n")
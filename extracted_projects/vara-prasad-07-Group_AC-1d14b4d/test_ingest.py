@@ -0,0 +1,70 @@
+import os
+import json
+import tempfile
+
+from chroma import ChromaClientWrapper, HnswBackend, default_checkpoint_path
+from ingest import ingest
+
+# Runs offline against local hnsw stores (no Chroma Cloud key needed);
+# embeddings come from the all-MiniLM-L6-v2 model used by the app
+
+TICKET_COUNT = 30
+
+print("\n" + "="*50)
+print("🧪 INGEST CHECKPOINT TEST")
+print("="*50)
+
+original_dir = os.getcwd()
+with tempfile.TemporaryDirectory() as work_dir:
+    os.chdir(work_dir)
+    try:
+        tickets = [
+            {"ticket_id": f"T{i:03d}", "customer_query": f"my internet stopped working {i}", "category": "network", "resolution": "Restart the router"}
+            for i in range(TICKET_COUNT)
+        ]
+        with open("tickets.json", "w", encoding="utf-8") as f:
+            json.dump({"tickets": tickets}, f)
+        store_a = os.path.join(work_dir, "store_a")
+        store_b = os.path.join(work_dir, "store_b")
+        os.environ["VECTOR_BACKEND"] = "hnsw"
+
+        def run(store_path):
+            os.environ["VECTOR_STORE_PATH"] = store_path
+            return ingest("tickets.json", batch_size=8, concurrency=2)
+
+        print("\n📥 First ingest into store A...")
+        stats = run(store_a)
+        assert stats["upserted"] == TICKET_COUNT
+        assert HnswBackend("tickets", path=store_a).count() == TICKET_COUNT
+        stats = run(store_a)
+        assert stats["upserted"] == 0 and stats["unchanged"] == TICKET_COUNT
+        print("   ✓ a re-run against the same store skips unchanged tickets")
+
+        print("\n🔀 Switching VECTOR_STORE_PATH to store B...")
+        stats = run(store_b)
+        assert stats["upserted"] == TICKET_COUNT, stats
+        assert HnswBackend("tickets", path=store_b).count() == TICKET_COUNT
+        with open(default_checkpoint_path("tickets"), "r", encoding="utf-8") as f:
+            assert json.load(f)["target"] == f"hnsw:{store_b}"
+        print("   ✓ a checkpoint for another store is discarded and everything re-ingested")
+
+        print("\n🗑️  Deleting the collection...")
+        os.environ["VECTOR_STORE_PATH"] = store_b
+        ChromaClientWrapper().delete_collection()
+        assert not os.path.exists(default_checkpoint_path("tickets"))
+        stats = run(store_b)
+        assert stats["upserted"] == TICKET_COUNT, stats
+        assert HnswBackend("tickets", path=store_b).count() == TICKET_COUNT
+        print("   ✓ delete_collection removes the checkpoint, so the next ingest refills the store")
+
+        print("\n📜 Checkpoint from before targets were recorded...")
+        with open(default_checkpoint_path("tickets"), "w", encoding="utf-8") as f:
+            json.dump({"hashes": {t["ticket_id"]: "stale" for t in tickets}}, f)
+        stats = run(store_a)
+        assert stats["upserted"] == TICKET_COUNT, stats
+        print("   ✓ a checkpoint without a target is not trusted")
+    finally:
+        os.chdir(original_dir)
+
+print("\n✅ All ingest checkpoint checks passed")
+print("="*50 + "\n")
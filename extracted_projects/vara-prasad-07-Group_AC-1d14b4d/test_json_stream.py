@@ -0,0 +1,86 @@
+import os
+import json
+import random
+import tempfile
+
+import json_stream
+from json_stream import iter_json_array
+
+# Runs offline: streams generated files with tiny read chunks so records
+# (and numbers, strings and escapes inside them) are split across reads
+
+print("\n" + "="*50)
+print("🧪 JSON STREAM TEST")
+print("="*50)
+
+rng = random.Random(11)
+records = [
+    {"ticket_id": f"T{i}", "customer_query": "naïve \"quoted\" query, with [brackets] {braces}", "amount": i * 10.5}
+    for i in range(40)
+]
+records += [12345, -0.25, 1.5e-07, True, None, "text, with ] and }", [1, [2, 3]], 7]
+rng.shuffle(records)
+original_chunk_size = json_stream.READ_CHUNK_SIZE
+
+with tempfile.TemporaryDirectory() as data_dir:
+    path = os.path.join(data_dir, "tickets.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": {"note": "not the array"}, "tickets": records}, f, indent=2, ensure_ascii=False)
+
+    print(f"\n📄 Streaming {len(records)} records with small read chunks...")
+    try:
+        for chunk_size in [1, 2, 3, 5, 7, 16, 61, 1 << 16] + [rng.randint(1, 40) for _ in range(20)]:
+            json_stream.READ_CHUNK_SIZE = chunk_size
+            streamed = list(iter_json_array(path, "tickets"))
+            assert streamed == records, f"chunk size {chunk_size} changed the records"
+    finally:
+        json_stream.READ_CHUNK_SIZE = original_chunk_size
+    print("   ✓ every chunk size yields the same records")
+
+    compact = os.path.join(data_dir, "numbers.json")
+    with open(compact, "w", encoding="utf-8") as f:
+        f.write('{"users":[1234,56789,0.125,-42]}')
+    try:
+        for chunk_size in range(1, 12):
+            json_stream.READ_CHUNK_SIZE = chunk_size
+            assert list(iter_json_array(compact, "users")) == [1234, 56789, 0.125, -42], f"chunk size {chunk_size}"
+    finally:
+        json_stream.READ_CHUNK_SIZE = original_chunk_size
+    print("   ✓ numbers split across reads are not cut short")
+
+    empty = os.path.join(data_dir, "empty.json")
+    with open(empty, "w", encoding="utf-8") as f:
+        f.write('{"tickets": []}')
+    assert list(iter_json_array(empty, "tickets")) == []
+    print("   ✓ an empty array yields nothing")
+
+    lines = os.path.join(data_dir, "tickets.jsonl")
+    with open(lines, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n\n")
+    assert list(iter_json_array(lines, "tickets")) == records
+    print("   ✓ .jsonl files are read one record per line")
+
+    print("\n⚠️  Malformed input...")
+    try:
+        list(iter_json_array(path, "users"))
+        raise AssertionError("a missing array should raise ValueError")
+    except ValueError as e:
+        assert "users" in str(e)
+    print("   ✓ a missing array raises ValueError")
+
+    truncated = os.path.join(data_dir, "truncated.json")
+    with open(truncated, "w", encoding="utf-8") as f:
+        f.write('{"tickets": [{"ticket_id": "T1"}, {"ticket_id": "T2", "customer_qu')
+    seen = []
+    try:
+        for record in iter_json_array(truncated, "tickets"):
+            seen.append(record)
+        raise AssertionError("a truncated file should raise JSONDecodeError")
+    except json.JSONDecodeError:
+        pass
+    assert seen == [{"ticket_id": "T1"}]
+    print("   ✓ a truncated file raises JSONDecodeError after the complete records")
+
+print("\n✅ All JSON stream checks passed")
+print("="*50 + "\n")
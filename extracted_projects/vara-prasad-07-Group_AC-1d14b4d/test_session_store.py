@@ -0,0 +1,77 @@
+import os
+import time
+import tempfile
+
+from session_store import InMemorySessionStore, SQLiteSessionStore
+
+# Runs offline: exercises both session backends with tiny limits
+
+print("\n" + "="*50)
+print("🧪 SESSION STORE TEST")
+print("="*50)
+
+
+def check_store(name, make_store):
+    print(f"\n🗂️  {name}...")
+
+    store = make_store(ttl_seconds=60, max_sessions=3, max_messages=4)
+    store.create("call-1", session_type="voice", caller="+919876543210", user_name="Asha")
+    for i in range(6):
+        store.add_message("call-1", "user" if i % 2 == 0 else "assistant", f"message {i}")
+    session = store.get("call-1")
+    assert session["type"] == "voice" and session["caller"] == "+919876543210"
+    assert session["user_name"] == "Asha"
+    assert [m["content"] for m in session["messages"]] == ["message 2", "message 3", "message 4", "message 5"]
+    assert store.history("call-1") == session["messages"]
+    print("   ✓ only the newest max_messages messages are kept")
+
+    store.update("call-1", phone_number="+919876543210")
+    session = store.get("call-1")
+    assert session["phone_number"] == "+919876543210" and session["user_name"] == "Asha"
+    store.update("missing", user_name="nobody")
+    assert not store.exists("missing")
+    print("   ✓ update merges fields and ignores unknown sessions")
+
+    # Writing a fifth session evicts the least recently active ones
+    for sid in ("chat-2", "chat-3", "chat-4"):
+        time.sleep(0.01)
+        store.add_message(sid, "user", "hello")
+    time.sleep(0.01)
+    store.add_message("chat-2", "user", "still here")
+    time.sleep(0.01)
+    store.create("chat-5")
+    assert len(store) == 3
+    assert not store.exists("call-1") and not store.exists("chat-3")
+    assert {s["session_id"] for s in store.list()} == {"chat-2", "chat-4", "chat-5"}
+    assert store.evicted == 2
+    print("   ✓ the least recently active sessions are evicted at the cap")
+
+    assert store.delete("chat-4") and not store.delete("chat-4")
+    assert store.history("chat-4") == []
+    print("   ✓ delete removes a session and its messages")
+
+    short = make_store(ttl_seconds=0.2, max_sessions=10, max_messages=4)
+    short.add_message("brief", "user", "hi")
+    assert short.exists("brief")
+    time.sleep(0.3)
+    assert not short.exists("brief") and short.get("brief") is None and short.history("brief") == []
+    short.add_message("brief", "user", "back again")
+    assert [m["content"] for m in short.history("brief")] == ["back again"]
+    print("   ✓ idle sessions expire after the TTL and start fresh")
+
+
+with tempfile.TemporaryDirectory() as data_dir:
+    check_store("InMemorySessionStore", InMemorySessionStore)
+    paths = iter(os.path.join(data_dir, f"sessions-{i}.sqlite3") for i in range(10))
+    check_store("SQLiteSessionStore", lambda **limits: SQLiteSessionStore(next(paths), **limits))
+
+    print("\n🔗 Sharing a SQLite store between processes...")
+    shared = os.path.join(data_dir, "shared.sqlite3")
+    writer = SQLiteSessionStore(shared)
+    reader = SQLiteSessionStore(shared)
+    writer.add_message("call-9", "user", "recharge my plan")
+    assert [m["content"] for m in reader.history("call-9")] == ["recharge my plan"]
+    print("   ✓ a second connection sees the session immediately")
+
+print("\n✅ All session store checks passed")
+print("="*50 + "\n")
@@ -0,0 +1,77 @@
+import os
+import json
+import tempfile
+
+from userdata_manager import UserDataManager
+
+# Runs offline against a generated userdata.json in a temp directory
+
+USER_COUNT = 12000
+
+
+def make_users(plan: str):
+    return [
+        {"name": f"User {i}", "phone_number": f"98{i:08d}", "recharge_plan": plan, "current_balance": i % 500}
+        for i in range(USER_COUNT)
+    ]
+
+
+def write_users(path: str, users, truncate_at=None):
+    text = json.dumps({"users": users})
+    if truncate_at is not None:
+        text = text[:truncate_at]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Make sure the manager sees a new file signature even within one mtime tick
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def snapshot(manager: UserDataManager):
+    return manager._connect().execute("SELECT phone, digest FROM users ORDER BY phone").fetchall()
+
+
+print("\n" + "="*50)
+print("🧪 USERDATA INDEX TEST")
+print("="*50)
+
+with tempfile.TemporaryDirectory() as data_dir:
+    path = os.path.join(data_dir, "userdata.json")
+    write_users(path, make_users("Basic 199"))
+    manager = UserDataManager(path)
+
+    print(f"\n📥 Initial load of {USER_COUNT} users...")
+    manager.load_data()
+    assert len(manager) == USER_COUNT
+    user = manager.get_user_by_phone("+91-98000-00042")
+    assert user and user["name"] == "User 42" and user["recharge_plan"] == "Basic 199"
+    before = snapshot(manager)
+    print("   ✓ every user is indexed and found by phone number")
+
+    print("\n✂️  Reloading a truncated file that changes every record...")
+    rewritten = make_users("Unlimited 599")
+    write_users(path, rewritten, truncate_at=len(json.dumps({"users": rewritten})) * 3 // 4)
+    manager.load_data()
+    assert snapshot(manager) == before, "a failed reload must leave the index unchanged"
+    assert manager._failed_signature == manager._source_signature()
+    assert manager.get_user_by_phone("9800011999")["recharge_plan"] == "Basic 199"
+    print("   ✓ the index still holds the previous data")
+
+    print("\n🔄 Reloading the complete file...")
+    rewritten = rewritten[:-10]  # and drop the last ten users
+    write_users(path, rewritten)
+    manager.load_data()
+    assert len(manager) == USER_COUNT - 10
+    assert manager.get_user_by_phone("9800000042")["recharge_plan"] == "Unlimited 599"
+    assert manager.get_user_by_phone("9800011999") is None
+    assert manager._connect().execute("SELECT COUNT(*) FROM temp.staged").fetchone()[0] == 0
+    print("   ✓ changed users are updated and removed users dropped")
+
+    print("\n♻️  Reopening the index...")
+    reopened = UserDataManager(path)
+    assert len(reopened) == USER_COUNT - 10
+    assert reopened.get_user_by_phone("+919800000007")["recharge_plan"] == "Unlimited 599"
+    print("   ✓ the index persists and is not rebuilt on restart")
+
+print("\n✅ All userdata checks passed")
+print("="*50 + "\n")
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import numpy as np
+
+from chroma import HnswBackend, MirroredBackend
+
+# Runs offline: needs hnswlib (installed with chromadb), no API keys
+
+print("\n" + "="*50)
+print("🧪 HNSW VECTOR STORE TEST")
+print("="*50)
+
+rng = np.random.default_rng(7)
+vectors = rng.normal(size=(300, 16)).astype(np.float32)
+ids = [f"T{i:04d}" for i in range(len(vectors))]
+metadatas = [{"ticket_id": tid, "category": "billing" if i % 2 else "network"} for i, tid in enumerate(ids)]
+documents = [f"customer query {i}" for i in range(len(vectors))]
+
+with tempfile.TemporaryDirectory() as store_dir:
+    print(f"\n📥 Upserting {len(ids)} vectors in batches of 100...")
+    store = HnswBackend("tickets", path=store_dir)
+    saves = 0
+    original_save = store._save
+
+    def counting_save():
+        global saves
+        saves += 1
+        original_save()
+
+    store._save = counting_save
+    for start in range(0, len(ids), 100):
+        end = start + 100
+        store.upsert(ids[start:end], vectors[start:end], metadatas[start:end], documents[start:end])
+    assert store.count() == len(ids)
+    assert saves == 0, "upserts should not write the index to disk"
+    assert not os.path.exists(store.index_path)
+
+    # Round trip: each vector's nearest neighbour is itself, at distance 0
+    result = store.query(vectors[:5], n_results=3)
+    assert [row[0] for row in result["ids"]] == ids[:5]
+    assert [row[0] for row in result["documents"]] == documents[:5]
+    assert [row[0] for row in result["metadatas"]] == metadatas[:5]
+    assert all(abs(row[0]) < 1e-4 for row in result["distances"])
+    print("   ✓ query returns the upserted ids, documents and metadatas")
+
+    # Re-sending an id overwrites it instead of adding a record
+    store.upsert([ids[0]], vectors[1:2], [{"ticket_id": ids[0], "category": "refund"}], ["updated query"])
+    assert store.count() == len(ids)
+    result = store.query(vectors[1:2], n_results=2)
+    assert set(result["ids"][0]) == {ids[0], ids[1]}
+    print("   ✓ upserting an existing id replaces it")
+
+    store.flush()
+    store.flush()
+    assert saves == 1, f"expected one save, got {saves}"
+    print("   ✓ flush writes the index once")
+
+    reloaded = HnswBackend("tickets", path=store_dir)
+    assert reloaded.count() == len(ids)
+    result = reloaded.query(vectors[10:11], n_results=1)
+    assert result["ids"][0] == [ids[10]] and result["documents"][0] == [documents[10]]
+    result = reloaded.query(vectors[1:2], n_results=2)
+    assert "updated query" in result["documents"][0]
+    print("   ✓ a new backend on the same path loads the flushed index")
+
+    empty = HnswBackend("empty", path=store_dir)
+    assert empty.query(vectors[:2], n_results=3)["ids"] == [[], []]
+    print("   ✓ querying an empty store returns empty results")
+
+with tempfile.TemporaryDirectory() as primary_dir, tempfile.TemporaryDirectory() as replica_dir:
+    print(f"\n🔁 Syncing a mirror replica...")
+    primary = HnswBackend("tickets", path=primary_dir)
+    primary.upsert(ids, vectors, metadatas, documents)
+    replica = HnswBackend("tickets", path=replica_dir)
+    replica_saves = 0
+    original_replica_save = replica._save
+
+    def counting_replica_save():
+        global replica_saves
+        replica_saves += 1
+        original_replica_save()
+
+    replica._save = counting_replica_save
+    mirror = MirroredBackend(primary, replica)
+    assert replica.count() == len(ids)
+    assert replica_saves == 1, f"sync should save the replica once, saved {replica_saves} times"
+    result = mirror.query(vectors[42:43], n_results=1)
+    assert result["ids"][0] == [ids[42]]
+    assert HnswBackend("tickets", path=replica_dir).count() == len(ids)
+    print("   ✓ sync copies every record and saves the replica once")
+
+print("\n✅ All vector store checks passed")
+print("="*50 + "\n")
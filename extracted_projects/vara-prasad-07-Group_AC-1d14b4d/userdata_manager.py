@@ -1,54 +1,224 @@
+import os
 import json
 import re
+import time
+import hashlib
+import sqlite3
+import threading
 from typing import Optional, Dict, Any
-from pathlib import Path
+
+from json_stream import iter_json_array
+
+
+# Phone number normalisation, compiled once
+_SEPARATORS = re.compile(r'[\s\-\(\)\.]+')
+_TRAILING_10_DIGITS = re.compile(r'(\d{10})$')
+_COUNTRY_CODE_DIGITS = re.compile(r'91(\d{10})')
+_PLUS_91_NUMBER = re.compile(r'(\+91\d{10})')
+_NORMALISED = re.compile(r'\+91\d{10}')
+
+# How often (at most) lookups check userdata.json for changes
+RELOAD_CHECK_SECONDS = 2.0
+
+USER_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    phone TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Per-connection scratch table a reload parses the file into before publishing
+STAGING_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS staged (
+    phone TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def normalize_phone_number(text: str) -> Optional[str]:
+    """
+    Extract a phone number from various formats and normalise it to +91XXXXXXXXXX.
+    Handles formats like +919876543210, 9876543210, +91-98765-43210, etc.
+    """
+    if not text:
+        return None
+
+    # Fast path: already normalised, or a bare 10-digit number
+    if len(text) == 13 and _NORMALISED.fullmatch(text):
+        return text
+    if len(text) == 10 and text.isdigit():
+        return "+91" + text
+
+    # Remove common separators and spaces
+    cleaned = _SEPARATORS.sub('', text)
+
+    # Try to find 10-digit number (Indian format)
+    match = _TRAILING_10_DIGITS.search(cleaned)
+    if match:
+        return "+91" + match.group(1)
+
+    # Try to find 12-digit number starting with 91
+    match = _COUNTRY_CODE_DIGITS.search(cleaned)
+    if match:
+        return "+91" + match.group(1)
+
+    # Try to find number starting with +91
+    match = _PLUS_91_NUMBER.search(cleaned)
+    if match:
+        return match.group(1)
+
+    return None
 
 
 class UserDataManager:
     """
     Manages user data from userdata.json.
     Handles loading, querying, and formatting user information.
+
+    Users are kept in a SQLite index keyed by normalised phone number
+    (userdata.index.sqlite3 next to the JSON file), not in memory. The index
+    is built lazily on the first lookup and persists across restarts. When
+    userdata.json changes, it is re-read as a stream in a background thread
+    into a temporary staging table, then new, changed and removed users are
+    applied in a single transaction. Lookups keep answering from the previous
+    data until that commit, and a file that fails to parse leaves the index
+    untouched.
     """
 
-    def __init__(self, filepath: str = "userdata.json"):
+    def __init__(self, filepath: str = "userdata.json", index_path: Optional[str] = None):
         """
-        Initialize UserDataManager and load user data.
+        Initialize UserDataManager. Nothing is read until the first lookup.
         
         Args:
             filepath: Path to userdata.json file
+            index_path: SQLite index file (default: <filepath stem>.index.sqlite3)
         """
         self.filepath = filepath
-        self.users_data = {}
-        self.load_data()
+        self.index_path = index_path or os.path.splitext(filepath)[0] + ".index.sqlite3"
+        self._local = threading.local()
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._next_check = 0.0
+        self._ready = False
+        # A file version that failed to parse is not retried until it changes again
+        self._failed_signature: Optional[str] = None
 
-    def load_data(self):
-        """Load user data from JSON file."""
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets lookups read while a reload writes."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(USER_INDEX_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _source_signature(self) -> Optional[str]:
         try:
-            if not Path(self.filepath).exists():
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _indexed_signature(self) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM index_meta WHERE key = 'source'").fetchone()
+        return row[0] if row else None
+
+    def _ensure_fresh(self) -> None:
+        """Build the index on first use; afterwards start a background reload when the file changes."""
+        now = time.monotonic()
+        if self._ready and now < self._next_check:
+            return
+        self._next_check = now + RELOAD_CHECK_SECONDS
+
+        signature = self._source_signature()
+        if signature is None:
+            if not self._ready:
+                print(f"⚠️  UserData file not found at {self.filepath}")
+                self._ready = True
+            return
+        if signature == self._indexed_signature() or signature == self._failed_signature:
+            self._ready = True
+            return
+
+        if not self._ready:
+            # Nothing usable yet: build the index before answering
+            self.load_data()
+            self._ready = True
+        elif self._reload_thread is None or not self._reload_thread.is_alive():
+            print(f"🔄 {self.filepath} changed, reloading user index in the background")
+            self._reload_thread = threading.Thread(target=self.load_data, name="userdata-reload", daemon=True)
+            self._reload_thread.start()
+
+    def load_data(self):
+        """Load user data from the JSON file into the index, writing only what changed."""
+        with self._reload_lock:
+            signature = self._source_signature()
+            if signature is None:
                 print(f"⚠️  UserData file not found at {self.filepath}")
-                self.users_data = {}
                 return
+            if signature == self._indexed_signature():
+                return
+
+            conn = self._connect()
+            stats = {"users": 0, "changed": 0, "removed": 0}
+            try:
+                # Parse into the temp table first; it lives outside the index
+                # file, so this neither locks out nor is seen by other readers
+                conn.executescript(STAGING_SCHEMA)
+                conn.execute("BEGIN")
+                conn.execute("DELETE FROM temp.staged")
+                for user in iter_json_array(self.filepath, "users"):
+                    phone = normalize_phone_number(str(user.get("phone_number", "")).strip())
+                    if not phone:
+                        continue
+                    data = json.dumps(user, sort_keys=True, ensure_ascii=False)
+                    digest = hashlib.sha1(data.encode("utf-8")).hexdigest()
+                    conn.execute(
+                        "INSERT OR REPLACE INTO temp.staged (phone, data, digest) VALUES (?, ?, ?)",
+                        (phone, data, digest),
+                    )
+                    stats["users"] += 1
+                conn.execute("COMMIT")
+
+                # Publish the whole file in one transaction
+                conn.execute("BEGIN IMMEDIATE")
+                stats["changed"] = conn.execute(
+                    "INSERT OR REPLACE INTO users (phone, data, digest) "
+                    "SELECT s.phone, s.data, s.digest FROM temp.staged s "
+                    "LEFT JOIN users u ON u.phone = s.phone WHERE u.digest IS NOT s.digest"
+                ).rowcount
+                stats["removed"] = conn.execute(
+                    "DELETE FROM users WHERE phone NOT IN (SELECT phone FROM temp.staged)"
+                ).rowcount
+                conn.execute(
+                    "INSERT OR REPLACE INTO index_meta (key, value) VALUES ('source', ?)",
+                    (signature,),
+                )
+                conn.execute("COMMIT")
+            except (json.JSONDecodeError, ValueError) as e:
+                conn.execute("ROLLBACK")
+                self._failed_signature = signature
+                print(f"❌ Error parsing {self.filepath}: {e}")
+                return
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                print(f"❌ Error loading user data: {e}")
+                return
+            finally:
+                if not conn.in_transaction:
+                    conn.execute("DELETE FROM temp.staged")
 
-            with open(self.filepath, 'r') as f:
-                data = json.load(f)
-                
-            # Create a phone number index for fast lookup
-            self.users_data = {}
-            if "users" in data and isinstance(data["users"], list):
-                for user in data["users"]:
-                    phone = user.get("phone_number", "").strip()
-                    if phone:
-                        self.users_data[phone] = user
-                print(f"✓ Loaded {len(self.users_data)} users from {self.filepath}")
-            else:
-                print(f"⚠️  Invalid userdata.json format")
-                
-        except json.JSONDecodeError as e:
-            print(f"❌ Error parsing {self.filepath}: {e}")
-            self.users_data = {}
-        except Exception as e:
-            print(f"❌ Error loading user data: {e}")
-            self.users_data = {}
+            print(f"✓ Loaded {stats['users']} users from {self.filepath} "
+                  f"({stats['changed']} new or changed, {stats['removed']} removed)")
 
     def extract_phone_number(self, text: str) -> Optional[str]:
         """
@@ -61,28 +231,7 @@ class UserDataManager:
         Returns:
             Normalized phone number (+91...) or None
         """
-        if not text:
-            return None
-
-        # Remove common separators and spaces
-        cleaned = re.sub(r'[\s\-\(\)\.]+', '', text)
-        
-        # Try to find 10-digit number (Indian format)
-        match = re.search(r'(\d{10})$', cleaned)
-        if match:
-            return "+91" + match.group(1)
-        
-        # Try to find 12-digit number starting with 91
-        match = re.search(r'91(\d{10})', cleaned)
-        if match:
-            return "+91" + match.group(1)
-        
-        # Try to find number starting with +91
-        match = re.search(r'(\+91\d{10})', cleaned)
-        if match:
-            return match.group(1)
-        
-        return None
+        return normalize_phone_number(text)
 
     def get_user_by_phone(self, phone_number: Optional[str]) -> Optional[Dict[str, Any]]:
         """
@@ -98,12 +247,14 @@ class UserDataManager:
             return None
             
         # Normalize the phone number
-        normalized = self.extract_phone_number(phone_number)
+        normalized = normalize_phone_number(phone_number)
         
         if not normalized:
             return None
         
-        user = self.users_data.get(normalized)
+        self._ensure_fresh()
+        row = self._connect().execute("SELECT data FROM users WHERE phone = ?", (normalized,)).fetchone()
+        user = json.loads(row[0]) if row else None
         if user:
             print(f"✓ Found user: {user.get('name')} ({normalized})")
         else:
@@ -111,6 +262,10 @@ class UserDataManager:
             
         return user
 
+    def __len__(self) -> int:
+        self._ensure_fresh()
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
     def format_user_context(self, user_data: Optional[Dict[str, Any]]) -> str:
         """
         Format user data into readable context for the LLM.
@@ -169,7 +324,7 @@ def format_user_context(user_data: Optional[Dict[str, Any]]) -> str:
 
 def extract_phone_number(text: str) -> Optional[str]:
     """Convenience function to extract phone number."""
-    return get_user_manager().extract_phone_number(text)
+    return normalize_phone_number(text)
 
 
 if __name__ == "__main__":
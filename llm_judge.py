@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+# ==============================================================================
+#  LLM JUDGING CLIENT
+# ==============================================================================
+#
+#  One client is shared by every repository evaluated in the process. It
+#  spaces requests with a token bucket (so a burst of finished repos does not
+#  trip the API's per-minute quota), retries failures with exponential backoff
+#  and full jitter, and lets many judgements be in flight at once. Repos run on
+#  separate threads with their own event loops, so all shared state is guarded
+#  by threading locks and waiting is done with asyncio.sleep.
+#
+#  The model is behind a small backend interface:
+#
+#    config()          JSON-serialisable identity, part of the AI stage's cache key
+#    generate(prompt)  coroutine returning the raw response text
+#
+#  "gemini" calls the Gemini API (google.generativeai is imported on first
+#  use); "stub" answers instantly and deterministically from a hash of the
+#  prompt, for offline load tests and benchmarks.
+#
+# ==============================================================================
+
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_BURST = 4
+DEFAULT_MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+STUB_VERSION = 1
+SCORE_NAMES = ("innovation", "technical_execution", "use_of_ai", "impact_scalability")
+
+def parse_json_block(text):
+    """Extracts the JSON object from a ```json fenced block in a model response."""
+    match = re.search(r"```json\n(.*)\n```", text, re.DOTALL)
+    if not match:
+        raise ValueError("AI response did not contain a valid JSON code block.")
+    return json.loads(match.group(1))
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class TokenBucket:
+    """Thread-safe token bucket shared by the event loops of all worker threads."""
+
+    def __init__(self, requests_per_minute, burst=DEFAULT_BURST):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Takes one token, possibly on credit; returns how long to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class GeminiBackend:
+    """Calls the Gemini API; the SDK is only imported when the first request is made."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def config(self):
+        return {"backend": "gemini", "model": self.model_name}
+
+    def _load_model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    async def generate(self, prompt):
+        model = await asyncio.to_thread(self._load_model)
+        response = await asyncio.to_thread(model.generate_content, prompt)
+        return response.text
+
+class StubBackend:
+    """Deterministic offline judge: the same prompt always gets the same evaluation.
+
+    latency_seconds simulates API round trips; failure_rate makes that share
+    of prompts fail on their first attempt, to exercise the retry path.
+    """
+
+    def __init__(self, latency_seconds=0.0, failure_rate=0.0):
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self._attempts = Counter()
+        self._lock = threading.Lock()
+
+    def config(self):
+        return {"backend": "stub", "version": STUB_VERSION}
+
+    async def generate(self, prompt):
+        digest = hashlib.sha256(prompt.encode()).digest()
+        with self._lock:
+            self._attempts[digest] += 1
+            first_attempt = self._attempts[digest] == 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        if first_attempt and digest[-1] < self.failure_rate * 256:
+            raise RuntimeError("Stub backend: simulated transient failure.")
+        evaluation = {
+            "scores": {name: 1 + digest[i] % 10 for i, name in enumerate(SCORE_NAMES)},
+            "strengths": [f"Stub strength {digest[4] % 7}"],
+            "steelman_weaknesses": [f"Stub weakness {digest[5] % 7}"],
+            "recommended_fixes": [f"Stub fix {digest[6] % 7}"],
+            "notes_for_judges": f"Deterministic stub evaluation {digest.hex()[:12]}.",
+        }
+        return f"```json\n{json.dumps(evaluation, indent=2)}\n```"
+
+JUDGE_BACKENDS = {"gemini": GeminiBackend, "stub": StubBackend}
+
+class JudgeClient:
+    """Rate-limited, retrying front end to a judging backend."""
+
+    def __init__(self, backend, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 burst=DEFAULT_BURST, max_attempts=DEFAULT_MAX_ATTEMPTS, slot=None):
+        self.backend = backend
+        self.bucket = TokenBucket(requests_per_minute, burst) if requests_per_minute else None
+        self.max_attempts = max_attempts
+        # Optional factory of an async context manager that bounds in-flight
+        # requests; it is held per attempt, never across a backoff sleep.
+        self.slot = slot
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def config(self):
+        return self.backend.config()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    async def _attempt(self, prompt):
+        if self.bucket:
+            await self.bucket.acquire()
+        self._count("requests")
+        if self.slot is None:
+            return parse_json_block(await self.backend.generate(prompt))
+        async with self.slot():
+            return parse_json_block(await self.backend.generate(prompt))
+
+    async def judge(self, prompt, log_file=None):
+        """Returns the parsed JSON evaluation, raising the last error once attempts run out."""
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._attempt(prompt)
+            except Exception as e:
+                if attempt == self.max_attempts - 1:
+                    self._count("failures")
+                    raise
+                delay = backoff_delay(attempt)
+                self._count("retries")
+                if log_file is not None:
+                    log_file.write(
+                        f"AI evaluation attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s\n"
+                    )
+                await asyncio.sleep(delay)
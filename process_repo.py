@@ -1,10 +1,31 @@
-import google.generativeai as genai
+import argparse
+import asyncio
 import json
 import os
-import re
-import subprocess
+import signal
 import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
+from functools import partial
+
+from build_sandbox import BuildSandbox
+from command_stream import (
+    BoundedCapture,
+    JsonStreamParser,
+    copy_spool_to_log,
+    parse_shim_report,
+    pump_stream,
+    read_shim_report,
+    shim_argv,
+)
+from evaluation_cache import EvaluationCache, repo_tree_hash, tool_version
+from evidence_packer import PROMPT_TOKEN_BUDGET, log_packed_prompt, pack_evidence, packing_config
+from llm_judge import DEFAULT_REQUESTS_PER_MINUTE, JUDGE_BACKENDS, JudgeClient
+from repo_scanner import CONTENT_PATTERNS, DEFAULT_PRUNE_DIRS, MAX_READ_BYTES_PER_FILE, scan_repository
+from stage_graph import StageGraph, acquire_thread_lock, record_stage_usage
 
 # --- AI Configuration ---
 # The script now assumes it is run in an environment like Cursor
@@ -18,52 +39,215 @@ MODEL_SIZE_LARGE_MB_THRESHOLD = 2000
 SMALL_MODEL_TEST_MB_THRESHOLD = 200
 ENABLE_RUNTIME_VALIDATION = True
 ALLOW_NETWORK_CHECKS = False
+GEMINI_MODEL = 'gemini-pro'
+
+# Part of every cache key. Bump it, or the version of a single stage below,
+# whenever evidence gathering changes in a way that invalidates cached results.
+# Scoring (penalties, weights, classification) is deliberately not part of any
+# key: it is recomputed from cached evidence on every run.
+EVALUATOR_VERSION = "2025.10-1"
+STAGE_CACHE_CONFIG = {
+    "static_analysis": {"version": 2},
+    "check_presentation": {"version": 1},
+    "security_scan": {"version": 2},
+    "model_runtime_validation": {"version": 1, "large_model_mb": MODEL_SIZE_LARGE_MB_THRESHOLD},
+    "build_and_test": {"version": 1, "timeout_seconds": MAX_SECONDS_PER_REPO},
+    "ai_evaluation": {"version": 2, "model": GEMINI_MODEL},
+}
+DEFAULT_CACHE_DIRNAME = "cache"
+DEFAULT_SANDBOX_DIRNAME = "sandbox"
+
+# Resource classes used to bound concurrent work when several repositories are
+# evaluated at once (see run_parallel_evaluation.py). "cpu" covers scanners and
+# test runners, "io" covers package installs and "llm" covers the Gemini call.
+RESOURCE_CPU = "cpu"
+RESOURCE_IO = "io"
+RESOURCE_LLM = "llm"
+_RESOURCE_SLOTS = {}
+
+def configure_resource_limits(limits):
+    """Installs process-wide concurrency limits, e.g. {"cpu": 4, "io": 8, "llm": 2}."""
+    _RESOURCE_SLOTS.clear()
+    for kind, limit in limits.items():
+        if limit:
+            _RESOURCE_SLOTS[kind] = threading.BoundedSemaphore(limit)
+
+@contextmanager
+def resource_slot(kind):
+    """Holds one slot of the given resource class; unlimited if none was configured."""
+    slot = _RESOURCE_SLOTS.get(kind)
+    if slot is None:
+        yield
+        return
+    slot.acquire()
+    try:
+        yield
+    finally:
+        slot.release()
+
+@asynccontextmanager
+async def async_resource_slot(kind):
+    """Async variant of resource_slot; waits for the shared slot without blocking the loop."""
+    slot = _RESOURCE_SLOTS.get(kind)
+    if slot is None:
+        yield
+        return
+    await acquire_thread_lock(slot)
+    try:
+        yield
+    finally:
+        slot.release()
+
+# The judging client is shared by every repository evaluated in this process,
+# so its rate limit applies across all of them.
+_JUDGE = {}
+
+def configure_judge(backend="gemini", requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, **options):
+    """Installs the process-wide judging client; options go to the backend."""
+    if backend == "gemini":
+        options.setdefault("model_name", GEMINI_MODEL)
+    _JUDGE["client"] = JudgeClient(
+        JUDGE_BACKENDS[backend](**options),
+        requests_per_minute=requests_per_minute,
+        slot=partial(async_resource_slot, RESOURCE_LLM),
+    )
+    return _JUDGE["client"]
 
-def run_command(command, cwd, log_file):
-    """Runs a shell command and logs its output."""
-    start_time = datetime.now()
-    log_file.write(f"--- Running command: {command} ---\n")
+def get_judge():
+    """Returns the configured judging client, defaulting to Gemini."""
+    if "client" not in _JUDGE:
+        configure_judge()
+    return _JUDGE["client"]
+
+def _kill_process_group(process):
     try:
-        process = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=MAX_SECONDS_PER_REPO,
-            cwd=cwd,
-        )
-        runtime_seconds = (datetime.now() - start_time).total_seconds()
-        log_file.write(f"Exit Code: {process.returncode}\n")
-        log_file.write(f"Runtime: {runtime_seconds:.2f}s\n")
-        log_file.write("--- stdout ---\n")
-        log_file.write(process.stdout)
-        log_file.write("\n--- stderr ---\n")
-        log_file.write(process.stderr)
-        log_file.write("\n\n")
-        return {
-            "exit_code": process.returncode,
-            "stdout": process.stdout,
-            "stderr": process.stderr,
-            "runtime_seconds": runtime_seconds,
-        }
-    except subprocess.TimeoutExpired as e:
-        runtime_seconds = (datetime.now() - start_time).total_seconds()
-        log_file.write(f"Command timed out after {runtime_seconds:.2f}s\n")
-        log_file.write(f"Error: {e}\n\n")
-        return {
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+async def run_command(command, cwd, log_file, resource=None, parse_json=False):
+    """Runs a shell command as an asyncio subprocess, streaming its output to the log.
+
+    Only a bounded head and tail of stdout/stderr is kept in memory; the full
+    output goes to the log. With parse_json, stdout is also parsed
+    incrementally and returned under "json" (or "json_error").
+    """
+    async with async_resource_slot(resource):
+        start_time = datetime.now()
+        stdout_capture, stderr_capture = BoundedCapture(), BoundedCapture()
+        parser = JsonStreamParser() if parse_json else None
+        # Output is spooled to disk and appended to the log in one block at
+        # the end, because stages running concurrently share the log file.
+        with tempfile.TemporaryFile() as stdout_spool, tempfile.TemporaryFile() as stderr_spool:
+            report_read, report_write = os.pipe()
+            try:
+                # A new session lets a timeout kill the whole pipeline, not just the shell.
+                process = await asyncio.create_subprocess_exec(
+                    *shim_argv(command, report_write),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=cwd,
+                    start_new_session=True,
+                    pass_fds=(report_write,),
+                )
+            except BaseException:
+                os.close(report_read)
+                raise
+            finally:
+                os.close(report_write)
+
+            timed_out = False
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        pump_stream(process.stdout, stdout_capture, stdout_spool, parser),
+                        pump_stream(process.stderr, stderr_capture, stderr_spool),
+                        process.wait(),
+                    ),
+                    timeout=MAX_SECONDS_PER_REPO,
+                )
+            except asyncio.TimeoutError:
+                timed_out = True
+                _kill_process_group(process)
+                await process.wait()
+            except asyncio.CancelledError:
+                _kill_process_group(process)
+                os.close(report_read)
+                raise
+            peak_rss_kb, cpu_seconds = parse_shim_report(read_shim_report(report_read))
+            runtime_seconds = (datetime.now() - start_time).total_seconds()
+
+            log_file.write(f"--- Running command: {command} ---\n")
+            if timed_out:
+                log_file.write(f"Command timed out after {runtime_seconds:.2f}s\n\n")
+            else:
+                log_file.write(f"Exit Code: {process.returncode}\n")
+                log_file.write(f"Runtime: {runtime_seconds:.2f}s\n")
+            log_file.write(
+                f"Output: {stdout_capture.total_bytes} bytes stdout, "
+                f"{stderr_capture.total_bytes} bytes stderr, largest process peak RSS {peak_rss_kb} KB\n"
+            )
+            log_file.write("--- stdout ---\n")
+            copy_spool_to_log(stdout_spool, log_file)
+            log_file.write("\n--- stderr ---\n")
+            copy_spool_to_log(stderr_spool, log_file)
+            log_file.write("\n\n")
+
+    record_stage_usage(
+        cpu_seconds=cpu_seconds,
+        peak_rss_kb=peak_rss_kb,
+        bytes_read=stdout_capture.total_bytes + stderr_capture.total_bytes,
+        commands=1,
+    )
+    result = {
+        "runtime_seconds": runtime_seconds,
+        "cpu_seconds": cpu_seconds,
+        "peak_rss_kb": peak_rss_kb,
+        "stdout_bytes": stdout_capture.total_bytes,
+        "stderr_bytes": stderr_capture.total_bytes,
+        "stdout_truncated": stdout_capture.truncated,
+    }
+    if timed_out:
+        result.update({
             "exit_code": -1,
             "stdout": "",
             "stderr": f"Timeout expired after {MAX_SECONDS_PER_REPO} seconds.",
-            "runtime_seconds": runtime_seconds,
-        }
-
-def static_analysis(repo_path, log_file):
+        })
+        return result
+    result.update({
+        "exit_code": process.returncode,
+        "stdout": stdout_capture.text(),
+        "stderr": stderr_capture.text(),
+    })
+    if parser is not None:
+        try:
+            result["json"], result["json_error"] = parser.close(), None
+        except ValueError as e:
+            result["json"], result["json_error"] = None, str(e)
+    return result
+
+def timed_scan(repo_path):
+    """Runs the scanner and returns (scan, CPU seconds spent by this thread)."""
+    started = time.thread_time()
+    scan = scan_repository(repo_path)
+    return scan, time.thread_time() - started
+
+async def scan_stage(repo_path, log_file):
+    """Walks the repository once, off the event loop, for all tree-based evidence."""
+    print("Scanning repository tree...")
+    scan, cpu_seconds = await asyncio.to_thread(timed_scan, repo_path)
+    record_stage_usage(cpu_seconds=cpu_seconds, bytes_read=scan.bytes_read)
+    log_file.write(f"--- Repository scan: {repo_path} ---\n")
+    log_file.write(f"{json.dumps(scan.stats())}\n\n")
+    return scan
+
+async def static_analysis(repo_path, log_file, scan):
     """Performs static analysis on the repository."""
     print("Performing static analysis...")
     evidence = {}
     
     # Git log
-    git_log = run_command(
+    git_log = await run_command(
         f"git -C {repo_path} log -n 5 --pretty=format:'%h %ad %an %s' --date=short",
         repo_path,
         log_file,
@@ -71,39 +255,23 @@ def static_analysis(repo_path, log_file):
     evidence["git_log"] = git_log["stdout"]
 
     # File listing
-    ls_la = run_command(f"ls -la {repo_path}", repo_path, log_file)
+    ls_la = await run_command(f"ls -la {repo_path}", repo_path, log_file)
     evidence["file_listing"] = ls_la["stdout"]
 
-    # AI keyword search
-    ai_keywords = run_command(
-        f"grep -RIn -E 'openai|transformers|langchain|huggingface|cohere|llama|vertex-ai|ollama' {repo_path} || true",
-        repo_path,
-        log_file,
-    )
-    evidence["ai_keywords"] = ai_keywords["stdout"]
-
-    # Model file search
-    model_files = run_command(
-        f"find {repo_path} -type f -name '*.pt' -o -name '*.bin' -o -name '*.safetensors' -ls || true",
-        repo_path,
-        log_file,
-    )
-    evidence["model_files"] = model_files["stdout"]
+    # AI keyword search and model file search come from the shared scan
+    evidence["ai_keywords"] = scan.ai_keywords_text
+    evidence["ai_keyword_hits"] = scan.ai_keyword_hits
+    evidence["model_files"] = scan.model_files_text
 
     return evidence
 
-def check_presentation(repo_path, log_file):
+async def check_presentation(repo_path, log_file, scan):
     """Checks for a presentation link."""
     print("Checking for presentation link...")
-    presentation_check = run_command(
-        f"grep -RIn -E 'youtube\\.com|youtu\\.be|vercel\\.app|netlify\\.app|render\\.com|herokuapp\\.com|huggingface\\.co/spaces' {repo_path} || true",
-        repo_path,
-        log_file,
-    )
-    if presentation_check["stdout"]:
+    if scan.presentation_hits:
         return {
             "presentation_link_detected": True,
-            "presentation_link_excerpt": presentation_check["stdout"].strip(),
+            "presentation_link_excerpt": scan.presentation_text,
             "presentation_score": 1,
         }
     return {
@@ -112,7 +280,7 @@ def check_presentation(repo_path, log_file):
         "presentation_score": 0,
     }
 
-def build_and_test(repo_path, log_file):
+async def build_and_test(repo_path, log_file, sandbox=None):
     """Attempts to build and test the project."""
     print("Attempting to build and test...")
     reproducible = False
@@ -120,78 +288,99 @@ def build_and_test(repo_path, log_file):
     # Python
     if os.path.exists(os.path.join(repo_path, "requirements.txt")):
         print("Found requirements.txt, attempting to install and test...")
-        pip_install = run_command(
-            "pip install -r requirements.txt --no-deps",
-            repo_path,
-            log_file,
-        )
-        if pip_install["exit_code"] == 0:
-            pytest_run = run_command("pytest -q || echo pytest-failed", repo_path, log_file)
-            if "pytest-failed" not in pytest_run["stdout"]:
-                reproducible = True
+        if sandbox:
+            env_dir = await sandbox.prepare_python_env(repo_path, log_file)
+            if env_dir:
+                python = os.path.join(env_dir, "bin", "python")
+                pytest_run = await run_command(
+                    f"{python} -m pytest -q || echo pytest-failed", repo_path, log_file, resource=RESOURCE_CPU
+                )
+                if "pytest-failed" not in pytest_run["stdout"]:
+                    reproducible = True
+        else:
+            pip_install = await run_command(
+                "pip install -r requirements.txt --no-deps",
+                repo_path,
+                log_file,
+                resource=RESOURCE_IO,
+            )
+            if pip_install["exit_code"] == 0:
+                pytest_run = await run_command(
+                    "pytest -q || echo pytest-failed", repo_path, log_file, resource=RESOURCE_CPU
+                )
+                if "pytest-failed" not in pytest_run["stdout"]:
+                    reproducible = True
 
     # Node.js
     if os.path.exists(os.path.join(repo_path, "package.json")):
         print("Found package.json, attempting to install and test...")
-        npm_ci = run_command("npm ci --no-fund", repo_path, log_file)
+        if sandbox:
+            npm_ci = await sandbox.install_node_modules(repo_path, log_file)
+        else:
+            npm_ci = await run_command("npm ci --no-fund", repo_path, log_file, resource=RESOURCE_IO)
         if npm_ci["exit_code"] == 0:
-            npm_test = run_command("npm test || echo npm-test-failed", repo_path, log_file)
+            npm_test = await run_command(
+                "npm test || echo npm-test-failed", repo_path, log_file, resource=RESOURCE_CPU
+            )
             if "npm-test-failed" not in npm_test["stdout"]:
                 reproducible = True
     
     # Docker
     if os.path.exists(os.path.join(repo_path, "Dockerfile")):
         print("Found Dockerfile, attempting to build...")
-        docker_build = run_command(
+        docker_build = await run_command(
             f"docker build -t test-{os.path.basename(repo_path)} . || echo docker-build-failed",
             repo_path,
             log_file,
+            resource=RESOURCE_CPU,
         )
         if "docker-build-failed" not in docker_build["stdout"]:
             reproducible = True
 
     return {"reproducible": reproducible}
 
-def security_scan(repo_path, log_file):
+async def security_scan(repo_path, log_file, scan):
     """Performs security scans."""
     print("Performing security scans...")
     risks = {}
     
     # Gitleaks
-    gitleaks_scan = run_command(
+    gitleaks_scan = await run_command(
         f"gitleaks detect --source={repo_path} --report-format=json || true",
         repo_path,
         log_file,
+        resource=RESOURCE_CPU,
+        parse_json=True,
     )
-    if gitleaks_scan["stdout"]:
-        risks["gitleaks"] = json.loads(gitleaks_scan["stdout"])
+    if gitleaks_scan["stdout_bytes"]:
+        if gitleaks_scan.get("json_error") is None:
+            risks["gitleaks"] = gitleaks_scan["json"]
+        else:
+            risks["gitleaks"] = "Error parsing gitleaks output"
 
     # Bandit
-    bandit_scan = run_command(
+    bandit_scan = await run_command(
         f"bandit -r {repo_path} -f json || true",
         repo_path,
         log_file,
+        resource=RESOURCE_CPU,
+        parse_json=True,
     )
-    if bandit_scan["stdout"]:
-        try:
-            risks["bandit"] = json.loads(bandit_scan["stdout"])
-        except json.JSONDecodeError:
+    if bandit_scan["stdout_bytes"]:
+        if bandit_scan.get("json_error") is None:
+            risks["bandit"] = bandit_scan["json"]
+        else:
             risks["bandit"] = "Error parsing bandit output"
 
     # License scan
-    license_scan = run_command(
-        f"find {repo_path} -maxdepth 2 -type f \\( -name '*LICENSE*' -o -name '*COPYING*' \\) || true",
-        repo_path,
-        log_file,
-    )
-    if license_scan["stdout"]:
-        risks["license"] = {"detected": True, "files": license_scan["stdout"].strip().split('\n')}
+    if scan.license_files:
+        risks["license"] = {"detected": True, "files": scan.license_files}
     else:
         risks["license"] = {"detected": False, "files": []}
 
     return {"risks": risks}
 
-def model_and_runtime_validation(repo_path, log_file):
+async def model_and_runtime_validation(repo_path, log_file, scan):
     """Handles model validation, runtime checks, and host recommendations."""
     print("Performing model and runtime validation...")
     validation_results = {
@@ -201,28 +390,18 @@ def model_and_runtime_validation(repo_path, log_file):
         "host_recommendation": "CPU"
     }
 
-    # Find model files and sizes
-    model_size_cmd = run_command(
-        f"find {repo_path} -type f -name '*.pt' -o -name '*.bin' -o -name '*.safetensors' -o -name '*.ggml*' -exec du -m {{}} + || true",
-        repo_path,
-        log_file
-    )
-    
-    if model_size_cmd["stdout"]:
+    # Model files and sizes
+    if scan.model_files:
         total_size = 0
-        for line in model_size_cmd["stdout"].strip().split('\n'):
-            if not line:
-                continue
-            parts = line.split()
-            size_mb, path = int(parts[0]), parts[1]
-            validation_results["model_files_details"].append({"path": path, "size_mb": size_mb})
-            total_size += size_mb
+        for model_file in scan.model_files:
+            validation_results["model_files_details"].append(dict(model_file))
+            total_size += model_file["size_mb"]
         
         if total_size > MODEL_SIZE_LARGE_MB_THRESHOLD:
             validation_results["host_recommendation"] = "GPU Recommended"
 
     # GPU probe
-    gpu_probe_cmd = run_command(
+    gpu_probe_cmd = await run_command(
         "command -v nvidia-smi >/dev/null && nvidia-smi --query-gpu=name,memory.total --format=csv,noheader || echo no-gpu",
         repo_path,
         log_file
@@ -273,42 +452,16 @@ def validate_evidence_and_apply_penalties(scores, evidence):
 
     return scores, penalties
 
-def get_ai_evaluation(evidence, repo_path, log_file):
+async def get_ai_evaluation(evidence, repo_path, log_file, token_budget=PROMPT_TOKEN_BUDGET):
     """
     Calls a Gemini model to get a dynamic, in-depth evaluation of the repository.
     """
     print("Getting AI evaluation...")
     log_file.write("--- Getting AI evaluation ---\n")
 
-    # Consolidate evidence into a text block for the prompt
-    context = f"""
-    Repository Path: {repo_path}
-
-    Static Analysis Evidence:
-    Git Log:
-    {evidence.get('git_log', 'N/A')}
-
-    File Listing:
-    {evidence.get('file_listing', 'N/A')}
-
-    AI Keyword Search Results (grep for 'openai|transformers|langchain|...'):
-    {evidence.get('ai_keywords', 'N/A')}
-
-    Model Files Found (*.pt, *.bin, *.safetensors):
-    {evidence.get('model_files', 'N/A')}
-
-    Model & Runtime Validation:
-    {json.dumps(evidence.get('model_runtime_validation', {}), indent=2)}
-    
-    Presentation Link Excerpt:
-    {evidence.get('presentation_link_excerpt', 'N/A')}
-
-    Build and Test Results:
-    Reproducible: {evidence.get('reproducible', False)}
-
-    Security Scan Results:
-    {json.dumps(evidence.get('risks', {}), indent=2)}
-    """
+    # Summarise the evidence into a prompt-sized block, most important sections first
+    packed = pack_evidence(evidence, repo_path, token_budget=token_budget)
+    print(f"  Packed evidence: ~{packed['estimated_tokens']}/{packed['token_budget']} tokens")
 
     prompt = f"""
     You are an expert Agentic AI Evaluation Analyst reviewing a hackathon project.
@@ -331,7 +484,7 @@ def get_ai_evaluation(evidence, repo_path, log_file):
     }}
 
     Here is the context for the project:
-    {context[:25000]} 
+    {packed["text"]}
     
     Please analyze the context and provide your evaluation in the specified JSON format. Justify your scores implicitly in the qualitative feedback.
     - innovation: How novel is the idea? Is it a creative use of AI?
@@ -343,21 +496,12 @@ def get_ai_evaluation(evidence, repo_path, log_file):
     - recommended_fixes: Suggest specific, actionable improvements.
     - notes_for_judges: A summary of your overall impression.
     """
-    
+    log_packed_prompt(log_file, prompt, packed)
+
     try:
-        # Removed the explicit GEMINI_API_KEY check
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
-        
-        # Extract JSON from the markdown code block
-        ai_response_text = response.text
-        match = re.search(r"```json\n(.*)\n```", ai_response_text, re.DOTALL)
-        if not match:
-            raise ValueError("AI response did not contain a valid JSON code block.")
-        
-        ai_response_json = match.group(1)
+        evaluation = await get_judge().judge(prompt, log_file)
         log_file.write("Successfully received AI evaluation.\n")
-        return json.loads(ai_response_json)
+        return evaluation
     except Exception as e:
         error_message = f"Error getting AI evaluation: {e}"
         print(error_message)
@@ -369,6 +513,7 @@ def get_ai_evaluation(evidence, repo_path, log_file):
             "steelman_weaknesses": [str(e)],
             "recommended_fixes": ["Check the logs for details on the AI evaluation failure."],
             "notes_for_judges": "The AI evaluation process failed for this repository.",
+            "evaluation_failed": True,
         }
 
 def get_scores(ai_scores, presentation_info):
@@ -400,96 +545,275 @@ def classify_repo(scores, reproducible):
     else:
         return "Not-fit"
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python process_repo.py <repo_path> <output_dir>")
-        sys.exit(1)
+def merge_evidence(static_evidence, presentation_info, build_info, security_info, model_runtime_info):
+    """Combines the results of the evidence stages into one evidence dict."""
+    return {
+        **static_evidence,
+        **presentation_info,
+        **build_info,
+        **security_info,
+        "model_runtime_validation": model_runtime_info
+    }
+
+async def ai_evaluation_stage(repo_path, log_file, *stage_results, token_budget=PROMPT_TOKEN_BUDGET):
+    """Stage wrapper that merges the evidence and asks the judge for an evaluation."""
+    full_evidence = merge_evidence(*stage_results)
+    ai_evaluation = await get_ai_evaluation(full_evidence, repo_path, log_file, token_budget=token_budget)
+    return full_evidence, ai_evaluation
+
+def scan_cache_config():
+    """The scanner settings that determine what the tree-based stages see."""
+    return {
+        "prune_dirs": sorted(DEFAULT_PRUNE_DIRS),
+        "content_patterns": {name: pattern.pattern.decode() for name, pattern in CONTENT_PATTERNS.items()},
+        "max_read_bytes": MAX_READ_BYTES_PER_FILE,
+    }
+
+async def run_evaluation_stages(repo_path, log_file, cache=None, root_key=None, sandbox=None,
+                                token_budget=PROMPT_TOKEN_BUDGET):
+    """Runs the evaluation stages as a dependency graph; returns (results, timings, keys)."""
+    graph = StageGraph()
+    # The scan is cheap and its result is not JSON, so it only contributes a key.
+    graph.add(
+        "scan_repository",
+        partial(scan_stage, repo_path, log_file),
+        cache_config=scan_cache_config(),
+        store=False,
+    )
+    scan_input = ("scan_repository",)
+    graph.add(
+        "static_analysis",
+        partial(static_analysis, repo_path, log_file),
+        inputs=scan_input,
+        cache_config=STAGE_CACHE_CONFIG["static_analysis"],
+    )
+    graph.add(
+        "check_presentation",
+        partial(check_presentation, repo_path, log_file),
+        inputs=scan_input,
+        cache_config=STAGE_CACHE_CONFIG["check_presentation"],
+    )
+    security_config = dict(STAGE_CACHE_CONFIG["security_scan"])
+    security_config["tools"] = {
+        "bandit": tool_version("bandit --version"),
+        "gitleaks": tool_version("gitleaks version"),
+    }
+    graph.add(
+        "security_scan",
+        partial(security_scan, repo_path, log_file),
+        inputs=scan_input,
+        cache_config=security_config,
+    )
+    graph.add(
+        "model_runtime_validation",
+        partial(model_and_runtime_validation, repo_path, log_file),
+        inputs=scan_input,
+        cache_config=STAGE_CACHE_CONFIG["model_runtime_validation"],
+    )
+    # npm ci writes node_modules (which can ship .py files) into the tree that
+    # bandit walks, so the build waits for the security scan. The repository
+    # scan prunes node_modules itself but is ordered first for the same reason.
+    build_config = dict(STAGE_CACHE_CONFIG["build_and_test"])
+    build_config["sandbox"] = sandbox.config() if sandbox else None
+    graph.add(
+        "build_and_test",
+        partial(build_and_test, repo_path, log_file, sandbox=sandbox),
+        after=("scan_repository", "security_scan"),
+        cache_config=build_config,
+    )
+    ai_config = dict(STAGE_CACHE_CONFIG["ai_evaluation"])
+    ai_config["judge"] = get_judge().config()
+    ai_config["packing"] = packing_config(token_budget)
+    graph.add(
+        "ai_evaluation",
+        partial(ai_evaluation_stage, repo_path, log_file, token_budget=token_budget),
+        inputs=(
+            "static_analysis",
+            "check_presentation",
+            "build_and_test",
+            "security_scan",
+            "model_runtime_validation",
+        ),
+        cache_config=ai_config,
+        # A failed Gemini call must be retried next run, not replayed.
+        cache_if=lambda result: not result[1].get("evaluation_failed"),
+        decode=tuple,
+    )
+    results, timings = await graph.run(cache=cache, root_key=root_key)
+    return results, timings, graph.stage_keys
+
+def build_report(repo_path, results, stage_timings):
+    """Scores the gathered evidence and assembles the report dict."""
+    repo_name = os.path.basename(repo_path)
+    presentation_info = results["check_presentation"]
+    build_info = results["build_and_test"]
+    security_info = results["security_scan"]
+    model_runtime_info = results["model_runtime_validation"]
+    full_evidence, ai_evaluation = results["ai_evaluation"]
+
+    # Apply penalties and construct the report
+    scores, penalties = validate_evidence_and_apply_penalties(
+        dict(ai_evaluation.get("scores", {})), full_evidence
+    )
+    final_scores = get_scores(scores, presentation_info)
+    classification = classify_repo(final_scores, build_info["reproducible"])
+
+    return {
+        "id": repo_path,
+        "name": repo_name,
+        "scores": final_scores,
+        "penalties_applied": penalties,
+        "presentation_link_detected": presentation_info["presentation_link_detected"],
+        "presentation_link_excerpt": presentation_info["presentation_link_excerpt"],
+        "reproducible": build_info["reproducible"],
+        "model_runtime_validation": model_runtime_info,
+        "strengths": ai_evaluation.get("strengths", []),
+        "steelman_weaknesses": ai_evaluation.get("steelman_weaknesses", []),
+        "recommended_fixes": ai_evaluation.get("recommended_fixes", []),
+        "risks": security_info["risks"],
+        "classification": classification,
+        "notes_for_judges": ai_evaluation.get("notes_for_judges", ""),
+        "stage_timings": stage_timings,
+    }
+
+def write_reports(report, output_dir):
+    """Writes the JSON and Markdown reports for one repository."""
+    repo_name = report["name"]
+    final_scores = report["scores"]
+
+    # Write individual JSON report
+    report_path = os.path.join(output_dir, "reports", f"{repo_name}.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=4)
+    
+    # Write individual Markdown report
+    md_report_path = os.path.join(output_dir, "reports", f"{repo_name}.md")
+    with open(md_report_path, "w") as f:
+        f.write(f"# Evaluation Report for {repo_name}\n\n")
+        f.write(f"**Classification:** {report['classification']}\n\n")
+        f.write(f"**Weighted Score:** {final_scores['weighted_score_percent']:.2f}%\n\n")
+        f.write("## Scores\n")
+        for key, value in final_scores.items():
+            f.write(f"- **{key.replace('_', ' ').title()}:** {value}\n")
+        f.write("\n## Details\n")
+        f.write(f"- **Reproducible:** {report['reproducible']}\n")
+        f.write(f"- **Presentation Link Detected:** {report['presentation_link_detected']}\n")
+        if report['presentation_link_excerpt']:
+            f.write(f"  - **Excerpt:** `{report['presentation_link_excerpt']}`\n")
+        
+        f.write("\n## Strengths\n")
+        for strength in report["strengths"]:
+            f.write(f"- {strength}\n")
 
-    repo_path = sys.argv[1]
-    output_dir = sys.argv[2]
+        f.write("\n## Weaknesses\n")
+        for weakness in report["steelman_weaknesses"]:
+            f.write(f"- {weakness}\n")
+        
+        f.write("\n## Recommended Fixes\n")
+        for fix in report["recommended_fixes"]:
+            f.write(f"- {fix}\n")
+
+        if report["risks"]:
+            f.write("\n## Security Risks\n")
+            for tool, findings in report["risks"].items():
+                f.write(f"### {tool.title()} Findings\n")
+                f.write(f"```json\n{json.dumps(findings, indent=2)}\n```\n")
+
+def open_cache(output_dir, cache_dir=None):
+    """Opens the evaluation cache, by default under <output_dir>/cache."""
+    return EvaluationCache(cache_dir or os.path.join(output_dir, DEFAULT_CACHE_DIRNAME), EVALUATOR_VERSION)
+
+def open_sandbox(output_dir, sandbox_dir=None, offline=False):
+    """Opens the shared build sandbox, by default under <output_dir>/sandbox."""
+    return BuildSandbox(
+        sandbox_dir or os.path.join(output_dir, DEFAULT_SANDBOX_DIRNAME),
+        run_command,
+        install_resource=RESOURCE_IO,
+        offline=offline,
+    )
+
+def evaluate_repo(repo_path, output_dir, cache=None, sandbox=None, token_budget=PROMPT_TOKEN_BUDGET):
+    """Evaluates one repository and writes its JSON and Markdown reports."""
+    repo_path = os.path.normpath(repo_path)
     repo_name = os.path.basename(repo_path)
     log_file_path = os.path.join(output_dir, "logs", f"{repo_name}_commands.log")
 
     with open(log_file_path, "w") as log_file:
-        # Step 1: Gather all evidence
-        static_evidence = static_analysis(repo_path, log_file)
-        presentation_info = check_presentation(repo_path, log_file)
-        build_info = build_and_test(repo_path, log_file)
-        security_info = security_scan(repo_path, log_file)
-        model_runtime_info = model_and_runtime_validation(repo_path, log_file)
-
-        full_evidence = {
-            **static_evidence,
-            **presentation_info,
-            **build_info,
-            **security_info,
-            "model_runtime_validation": model_runtime_info
-        }
-
-        # Step 2: Get evaluation from AI
-        ai_evaluation = get_ai_evaluation(full_evidence, repo_path, log_file)
+        root_key = repo_tree_hash(repo_path) if cache else None
+        # Steps 1-2: Gather all evidence and get the evaluation from AI
+        results, stage_timings, stage_keys = asyncio.run(
+            run_evaluation_stages(repo_path, log_file, cache=cache, root_key=root_key, sandbox=sandbox,
+                                  token_budget=token_budget)
+        )
+        if cache:
+            cache.write_run(repo_name, {
+                "id": repo_path,
+                "tree_hash": root_key,
+                "evaluator_version": EVALUATOR_VERSION,
+                "stage_keys": {name: stage_keys[name] for name in STAGE_CACHE_CONFIG},
+                "stage_timings": stage_timings,
+            })
 
         # Step 3: Apply penalties and construct the report
-        scores, penalties = validate_evidence_and_apply_penalties(
-            ai_evaluation.get("scores", {}), full_evidence
-        )
-        final_scores = get_scores(scores, presentation_info)
-        classification = classify_repo(final_scores, build_info["reproducible"])
-
-        report = {
-            "id": repo_path,
-            "name": repo_name,
-            "scores": final_scores,
-            "penalties_applied": penalties,
-            "presentation_link_detected": presentation_info["presentation_link_detected"],
-            "presentation_link_excerpt": presentation_info["presentation_link_excerpt"],
-            "reproducible": build_info["reproducible"],
-            "model_runtime_validation": model_runtime_info,
-            "strengths": ai_evaluation.get("strengths", []),
-            "steelman_weaknesses": ai_evaluation.get("steelman_weaknesses", []),
-            "recommended_fixes": ai_evaluation.get("recommended_fixes", []),
-            "risks": security_info["risks"],
-            "classification": classification,
-            "notes_for_judges": ai_evaluation.get("notes_for_judges", ""),
-        }
+        report = build_report(repo_path, results, stage_timings)
+        write_reports(report, output_dir)
+
+    return report
+
+def rescore_repo(repo_name, output_dir, cache):
+    """Rebuilds a repository's reports purely from the evidence cached by its last run."""
+    run, results = cache.load_run_results(repo_name)
+    results["ai_evaluation"] = tuple(results["ai_evaluation"])
+    report = build_report(run["id"], results, run["stage_timings"])
+    write_reports(report, output_dir)
+    return report
+
+def add_sandbox_arguments(parser):
+    parser.add_argument("--sandbox-dir", help="Build sandbox location (default: <output_dir>/sandbox).")
+    parser.add_argument("--offline", action="store_true",
+                        help="Install only from the prefetched wheelhouse and npm cache.")
+    parser.add_argument("--no-sandbox", action="store_true",
+                        help="Install into the evaluator's own interpreter as before.")
+
+def sandbox_from_args(args):
+    if args.no_sandbox:
+        return None
+    return open_sandbox(args.output_dir, args.sandbox_dir, offline=args.offline)
+
+def add_judge_arguments(parser):
+    parser.add_argument("--judge-backend", choices=sorted(JUDGE_BACKENDS), default="gemini",
+                        help="Model that scores the evidence; 'stub' is offline and deterministic.")
+    parser.add_argument("--llm-rpm", type=float, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help="Judge requests per minute across all repositories (0 = unlimited).")
+    parser.add_argument("--token-budget", type=int, default=PROMPT_TOKEN_BUDGET,
+                        help="Estimated tokens of packed evidence in the judge prompt.")
+
+def judge_from_args(args):
+    return configure_judge(args.judge_backend, requests_per_minute=args.llm_rpm)
 
-        # Write individual JSON report
-        report_path = os.path.join(output_dir, "reports", f"{repo_name}.json")
-        with open(report_path, "w") as f:
-            json.dump(report, f, indent=4)
-        
-        # Write individual Markdown report
-        md_report_path = os.path.join(output_dir, "reports", f"{repo_name}.md")
-        with open(md_report_path, "w") as f:
-            f.write(f"# Evaluation Report for {repo_name}\n\n")
-            f.write(f"**Classification:** {classification}\n\n")
-            f.write(f"**Weighted Score:** {final_scores['weighted_score_percent']:.2f}%\n\n")
-            f.write("## Scores\n")
-            for key, value in final_scores.items():
-                f.write(f"- **{key.replace('_', ' ').title()}:** {value}\n")
-            f.write("\n## Details\n")
-            f.write(f"- **Reproducible:** {build_info['reproducible']}\n")
-            f.write(f"- **Presentation Link Detected:** {presentation_info['presentation_link_detected']}\n")
-            if presentation_info['presentation_link_excerpt']:
-                f.write(f"  - **Excerpt:** `{presentation_info['presentation_link_excerpt']}`\n")
-            
-            f.write("\n## Strengths\n")
-            for strength in ai_evaluation.get("strengths", []):
-                f.write(f"- {strength}\n")
-
-            f.write("\n## Weaknesses\n")
-            for weakness in ai_evaluation.get("steelman_weaknesses", []):
-                f.write(f"- {weakness}\n")
-            
-            f.write("\n## Recommended Fixes\n")
-            for fix in ai_evaluation.get("recommended_fixes", []):
-                f.write(f"- {fix}\n")
-
-            if security_info["risks"]:
-                f.write("\n## Security Risks\n")
-                for tool, findings in security_info["risks"].items():
-                    f.write(f"### {tool.title()} Findings\n")
-                    f.write(f"```json\n{json.dumps(findings, indent=2)}\n```\n")
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a single hackathon repository.")
+    parser.add_argument("repo_path")
+    parser.add_argument("output_dir")
+    parser.add_argument("--cache-dir", help="Evaluation cache location (default: <output_dir>/cache).")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the cache.")
+    parser.add_argument("--rescore-only", action="store_true",
+                        help="Rebuild the reports from cached evidence without running any stage.")
+    add_sandbox_arguments(parser)
+    add_judge_arguments(parser)
+    args = parser.parse_args()
+
+    judge_from_args(args)
+    for subdir in ("logs", "reports"):
+        os.makedirs(os.path.join(args.output_dir, subdir), exist_ok=True)
+    cache = None if args.no_cache else open_cache(args.output_dir, args.cache_dir)
+    if args.rescore_only:
+        if cache is None:
+            parser.error("--rescore-only needs the cache")
+        rescore_repo(os.path.basename(os.path.normpath(args.repo_path)), args.output_dir, cache)
+    else:
+        evaluate_repo(args.repo_path, args.output_dir, cache=cache, sandbox=sandbox_from_args(args),
+                      token_budget=args.token_budget)
 
 
 if __name__ == "__main__":
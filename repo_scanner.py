@@ -0,0 +1,163 @@
+import math
+import os
+import re
+import time
+
+# ==============================================================================
+#  SINGLE-PASS REPOSITORY SCANNER
+# ==============================================================================
+#
+#  Walks a repository once and applies every content and file-name matcher the
+#  evaluation needs (AI keywords, presentation links, license files, model
+#  files) in that one pass. Replaces the separate `grep -RIn` / `find` runs that
+#  each walked the whole tree, including .git and node_modules.
+#
+# ==============================================================================
+
+# Directories that are never descended into. Vendored dependencies and VCS
+# metadata say nothing about the submission and dominate walk time.
+DEFAULT_PRUNE_DIRS = frozenset({
+    ".git",
+    ".hg",
+    ".svn",
+    "node_modules",
+    "__pycache__",
+    ".venv",
+    "venv",
+    ".tox",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".next",
+    ".cache",
+})
+
+# Only the head of each file is searched; anything past this is generated or
+# minified content that would just add noise.
+MAX_READ_BYTES_PER_FILE = 1024 * 1024
+BINARY_SNIFF_BYTES = 8192
+MAX_EXCERPT_LINE_CHARS = 500
+LICENSE_MAX_DEPTH = 2
+
+AI_KEYWORD_PATTERN = r"openai|transformers|langchain|huggingface|cohere|llama|vertex-ai|ollama"
+PRESENTATION_PATTERN = (
+    r"youtube\.com|youtu\.be|vercel\.app|netlify\.app|render\.com|herokuapp\.com"
+    r"|huggingface\.co/spaces"
+)
+# Matched independently, like the separate greps they replace: a line such as
+# "huggingface.co/spaces/..." is both a presentation link and AI evidence.
+CONTENT_PATTERNS = {
+    "presentation": re.compile(PRESENTATION_PATTERN.encode()),
+    "ai_keywords": re.compile(AI_KEYWORD_PATTERN.encode()),
+}
+# Every alternative above is a plain literal, so a substring test (memmem in C)
+# can rule out the vast majority of files before the regex runs at all.
+CONTENT_LITERALS = tuple(
+    alternative.replace("\\", "").encode()
+    for alternative in f"{PRESENTATION_PATTERN}|{AI_KEYWORD_PATTERN}".split("|")
+)
+LICENSE_NAME_PATTERN = re.compile(r"LICENSE|COPYING")
+MODEL_FILE_PATTERN = re.compile(r"\.(pt|bin|safetensors)$|\.ggml")
+
+class ScanEvidence:
+    """Structured result of one repository walk."""
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.ai_keyword_hits = []
+        self.presentation_hits = []
+        self.license_files = []
+        self.model_files = []
+        self.files_scanned = 0
+        self.bytes_read = 0
+        self.dirs_pruned = 0
+        self.runtime_seconds = 0.0
+
+    def grep_lines(self, hits):
+        """Renders hits in `grep -n` form ("path:line:text"), one per line."""
+        return "\n".join(f"{hit['path']}:{hit['line']}:{hit['text']}" for hit in hits)
+
+    @property
+    def ai_keywords_text(self):
+        return self.grep_lines(self.ai_keyword_hits)
+
+    @property
+    def presentation_text(self):
+        return self.grep_lines(self.presentation_hits)
+
+    @property
+    def model_files_text(self):
+        return "\n".join(f"{m['size_mb']}\t{m['path']}" for m in self.model_files)
+
+    def stats(self):
+        """Walk statistics suitable for logging."""
+        return {
+            "files_scanned": self.files_scanned,
+            "bytes_read": self.bytes_read,
+            "dirs_pruned": self.dirs_pruned,
+            "runtime_seconds": round(self.runtime_seconds, 3),
+        }
+
+def _scan_content(path, evidence, max_read_bytes):
+    """Searches the head of one file for every content matcher."""
+    try:
+        with open(path, "rb") as f:
+            content = f.read(max_read_bytes)
+    except OSError:
+        return
+    evidence.files_scanned += 1
+    evidence.bytes_read += len(content)
+    # Same heuristic as grep -I: a NUL byte near the start means binary.
+    if b"\0" in content[:BINARY_SNIFF_BYTES]:
+        return
+    if not any(literal in content for literal in CONTENT_LITERALS):
+        return
+
+    hits = {"presentation": evidence.presentation_hits, "ai_keywords": evidence.ai_keyword_hits}
+    for category, pattern in CONTENT_PATTERNS.items():
+        last_line = None
+        line_number = 1
+        last_pos = 0
+        for match in pattern.finditer(content):
+            line_number += content.count(b"\n", last_pos, match.start())
+            last_pos = match.start()
+            # One hit per matching line, as grep -n reports it
+            if line_number == last_line:
+                continue
+            last_line = line_number
+            line_start = content.rfind(b"\n", 0, match.start()) + 1
+            line_end = content.find(b"\n", match.end())
+            if line_end == -1:
+                line_end = len(content)
+            text = content[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r")
+            hits[category].append({"path": path, "line": line_number, "text": text[:MAX_EXCERPT_LINE_CHARS]})
+
+def scan_repository(repo_path, prune_dirs=DEFAULT_PRUNE_DIRS, max_read_bytes=MAX_READ_BYTES_PER_FILE):
+    """Walks the repository once and returns a ScanEvidence."""
+    start_time = time.perf_counter()
+    evidence = ScanEvidence(repo_path)
+    root_depth = repo_path.rstrip(os.sep).count(os.sep)
+
+    for dirpath, dirnames, filenames in os.walk(repo_path):
+        kept = [d for d in dirnames if d not in prune_dirs]
+        evidence.dirs_pruned += len(dirnames) - len(kept)
+        dirnames[:] = sorted(kept)
+        depth = dirpath.rstrip(os.sep).count(os.sep) - root_depth + 1
+
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            if depth <= LICENSE_MAX_DEPTH and LICENSE_NAME_PATTERN.search(filename):
+                evidence.license_files.append(path)
+            if MODEL_FILE_PATTERN.search(filename):
+                size_bytes = os.path.getsize(path)
+                evidence.model_files.append({
+                    "path": path,
+                    "size_mb": math.ceil(size_bytes / (1024 * 1024)),
+                })
+                # Weights are binary; reading them would only cost I/O.
+                continue
+            _scan_content(path, evidence, max_read_bytes)
+
+    evidence.runtime_seconds = time.perf_counter() - start_time
+    return evidence
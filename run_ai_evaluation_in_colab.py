@@ -1,6 +1,7 @@
 import google.generativeai as genai
 import json
 import os
+import random
 import re
 import subprocess
 import sys
@@ -166,7 +167,8 @@ def get_ai_evaluation(evidence, repo_path, retries=3, delay=5):
         except Exception as e:
             print(f"Attempt {attempt + 1} failed for {repo_path}: {e}")
             if attempt < retries - 1:
-                time.sleep(delay)
+                # Exponential backoff with full jitter, so parallel notebooks do not retry in lockstep
+                time.sleep(random.uniform(0, delay * 2 ** attempt))
             else:
                 print(f"All attempts failed for {repo_path}.")
                 return None
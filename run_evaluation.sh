@@ -58,15 +58,10 @@ main() {
     mkdir -p "${OUTPUT_DIR}/logs"
     mkdir -p "${OUTPUT_DIR}/reports"
 
-    # Process each repository
-    for repo_path in "${REPO_PATHS[@]}"; do
-        echo "Processing repository: ${repo_path}"
-        python3 process_repo.py "${repo_path}" "${OUTPUT_DIR}"
-    done
-
-    # Generate the final summary
-    echo "Generating final summary..."
-    python3 create_summary.py "${OUTPUT_DIR}"
+    # Process the repositories concurrently on a bounded worker pool; the
+    # summaries are updated as each repository finishes
+    echo "Processing ${#REPO_PATHS[@]} repositories..."
+    python3 run_parallel_evaluation.py "${OUTPUT_DIR}" "${REPO_PATHS[@]}"
 
     echo "Evaluation complete."
 }
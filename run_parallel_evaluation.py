@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import create_summary
+import process_repo
+
+# ==============================================================================
+#  PARALLEL EVALUATION SCHEDULER
+# ==============================================================================
+#
+#  Evaluates many repositories concurrently on a bounded worker pool instead of
+#  running process_repo.py once per repository. Each worker drives one
+#  repository end to end; the heavy steps inside it share three process-wide
+#  limits so that, for example, eight repos can be cloning packages while only
+#  as many bandit/pytest runs as there are cores compete for the CPU.
+#
+#  Stage results are cached under <output_dir>/cache, so re-running only redoes
+#  stages whose inputs changed. --rescore-only skips every stage and rebuilds
+#  the reports and summaries from the cache, e.g. after changing score weights.
+#  The summary files in <output_dir> are kept up to date while the run progresses.
+#
+#  Usage:
+#    python run_parallel_evaluation.py <output_dir> <repo_path> [<repo_path> ...]
+#    python run_parallel_evaluation.py <output_dir> --repo-list repos.txt
+#    python run_parallel_evaluation.py <output_dir> --rescore-only
+#
+# ==============================================================================
+
+CPU_COUNT = os.cpu_count() or 2
+DEFAULT_WORKERS = CPU_COUNT
+DEFAULT_CPU_LIMIT = max(1, CPU_COUNT // 2)
+DEFAULT_IO_LIMIT = 4
+DEFAULT_LLM_LIMIT = 2
+
+def read_repo_list(path):
+    """Reads repository paths from a file, one per line, ignoring blanks and comments."""
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def write_status(output_dir, repo_path, status):
+    """Writes the per-repo run status as soon as that repository finishes."""
+    repo_name = os.path.basename(os.path.normpath(repo_path))
+    with open(os.path.join(output_dir, "status", f"{repo_name}.json"), "w") as f:
+        json.dump(status, f, indent=4)
+
+def evaluate_one(repo_path, output_dir, cache=None, sandbox=None, token_budget=process_repo.PROMPT_TOKEN_BUDGET):
+    """Runs a single evaluation and captures its outcome instead of raising."""
+    start_time = datetime.now()
+    status = {"id": repo_path, "name": os.path.basename(os.path.normpath(repo_path))}
+    try:
+        report = process_repo.evaluate_repo(repo_path, output_dir, cache=cache, sandbox=sandbox,
+                                            token_budget=token_budget)
+        status["status"] = "completed"
+        status["weighted_score_percent"] = report["scores"].get("weighted_score_percent", 0)
+        status["classification"] = report["classification"]
+    except Exception as e:
+        status["status"] = "failed"
+        status["error"] = str(e)
+        status["traceback"] = traceback.format_exc()
+    status["runtime_seconds"] = (datetime.now() - start_time).total_seconds()
+    write_status(output_dir, repo_path, status)
+    return status
+
+def run_parallel_evaluation(repo_paths, output_dir, workers=DEFAULT_WORKERS,
+                            cpu_limit=DEFAULT_CPU_LIMIT, io_limit=DEFAULT_IO_LIMIT,
+                            llm_limit=DEFAULT_LLM_LIMIT, cache=None, sandbox=None,
+                            token_budget=process_repo.PROMPT_TOKEN_BUDGET):
+    """Evaluates all repositories on a bounded pool and returns their statuses."""
+    for subdir in ("logs", "reports", "status"):
+        os.makedirs(os.path.join(output_dir, subdir), exist_ok=True)
+
+    process_repo.configure_resource_limits({
+        process_repo.RESOURCE_CPU: cpu_limit,
+        process_repo.RESOURCE_IO: io_limit,
+        process_repo.RESOURCE_LLM: llm_limit,
+    })
+
+    # Summaries cover every report in the output directory and are updated as
+    # each repository finishes; reports of repos in this run are added then.
+    run_names = {os.path.basename(os.path.normpath(p)) for p in repo_paths}
+    summary = create_summary.SummaryAggregator(output_dir)
+    for path in create_summary.report_paths(output_dir, skip_names=run_names):
+        summary.add_report_file(path)
+
+    statuses = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(evaluate_one, repo_path, output_dir, cache, sandbox, token_budget): repo_path
+            for repo_path in repo_paths
+        }
+        for future in as_completed(futures):
+            status = future.result()
+            statuses.append(status)
+            # A failed repo keeps the report of its last successful run, if any.
+            report_path = os.path.join(output_dir, "reports", f"{status['name']}.json")
+            if os.path.exists(report_path):
+                summary.add_report_file(report_path)
+            print(
+                f"[{len(statuses)}/{len(futures)}] {status['name']}: {status['status']} "
+                f"in {status['runtime_seconds']:.1f}s"
+            )
+    summary.finalize()
+    return statuses
+
+def rescore_all(output_dir, cache, repo_paths=()):
+    """Rebuilds reports for the given (default: all cached) repositories and the summaries."""
+    os.makedirs(os.path.join(output_dir, "reports"), exist_ok=True)
+    repo_names = [os.path.basename(os.path.normpath(p)) for p in repo_paths] or cache.list_runs()
+    rescored = 0
+    for repo_name in repo_names:
+        try:
+            process_repo.rescore_repo(repo_name, output_dir, cache)
+            rescored += 1
+        except (OSError, KeyError) as e:
+            print(f"  SKIPPED {repo_name}: no complete cached run ({e})")
+    if rescored:
+        create_summary.create_summary_reports(output_dir)
+    print(f"Rescored {rescored}/{len(repo_names)} repositories from the cache.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate hackathon repositories in parallel.")
+    parser.add_argument("output_dir")
+    parser.add_argument("repo_paths", nargs="*")
+    parser.add_argument("--repo-list", help="File with one repository path per line.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Repositories evaluated at the same time.")
+    parser.add_argument("--cpu-limit", type=int, default=DEFAULT_CPU_LIMIT,
+                        help="Concurrent CPU-heavy commands (bandit, gitleaks, pytest, docker).")
+    parser.add_argument("--io-limit", type=int, default=DEFAULT_IO_LIMIT,
+                        help="Concurrent package installs (pip, npm ci).")
+    parser.add_argument("--llm-limit", type=int, default=DEFAULT_LLM_LIMIT,
+                        help="Concurrent judge (Gemini) calls.")
+    parser.add_argument("--cache-dir", help="Evaluation cache location (default: <output_dir>/cache).")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the cache.")
+    parser.add_argument("--rescore-only", action="store_true",
+                        help="Rebuild reports and summaries from cached evidence only.")
+    process_repo.add_sandbox_arguments(parser)
+    process_repo.add_judge_arguments(parser)
+    args = parser.parse_args()
+
+    repo_paths = list(args.repo_paths)
+    if args.repo_list:
+        repo_paths.extend(read_repo_list(args.repo_list))
+    cache = None if args.no_cache else process_repo.open_cache(args.output_dir, args.cache_dir)
+
+    if args.rescore_only:
+        if cache is None:
+            parser.error("--rescore-only needs the cache")
+        rescore_all(args.output_dir, cache, repo_paths)
+        return
+    if not repo_paths:
+        parser.error("no repositories given")
+    judge = process_repo.judge_from_args(args)
+
+    statuses = run_parallel_evaluation(
+        repo_paths,
+        args.output_dir,
+        workers=args.workers,
+        cpu_limit=args.cpu_limit,
+        io_limit=args.io_limit,
+        llm_limit=args.llm_limit,
+        cache=cache,
+        sandbox=process_repo.sandbox_from_args(args),
+        token_budget=args.token_budget,
+    )
+    failed = [s for s in statuses if s["status"] != "completed"]
+    print(f"Evaluated {len(statuses) - len(failed)}/{len(statuses)} repositories.")
+    if cache:
+        print(f"Cache: {cache.hits} stage hits, {cache.misses} misses.")
+    print(
+        f"Judge: {judge.stats['requests']} requests, {judge.stats['retries']} retries, "
+        f"{judge.stats['failures']} failures."
+    )
+    for status in failed:
+        print(f"  FAILED {status['name']}: {status['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import asyncio
+import contextvars
+import time
+
+# ==============================================================================
+#  STAGE GRAPH EXECUTOR
+# ==============================================================================
+#
+#  A tiny DAG runner used by process_repo.py. Each stage names the stages whose
+#  results it consumes ("inputs") and, optionally, stages it must merely wait
+#  for without consuming their result ("after"). Every stage is started as soon
+#  as its dependencies are done, so independent stages overlap.
+#
+#  Stages that declare a cache_config are looked up in an EvaluationCache first.
+#  A stage that hits is not run, and a dependency that only feeds stages which
+#  hit is not run either.
+#
+#  While a stage runs, record_stage_usage() adds CPU time, peak RSS (of the
+#  largest single process) and bytes read to that stage's timings entry. Each
+#  stage runs in its own task, so the usage lands on the right stage even when
+#  stages overlap.
+#
+# ==============================================================================
+
+_STAGE_USAGE = contextvars.ContextVar("stage_usage", default=None)
+
+def record_stage_usage(cpu_seconds=0.0, peak_rss_kb=None, bytes_read=0, commands=0):
+    """Adds resource usage to the stage running in the current context, if any."""
+    usage = _STAGE_USAGE.get()
+    if usage is None:
+        return
+    usage["cpu_seconds"] += cpu_seconds or 0.0
+    usage["peak_rss_kb"] = max(usage["peak_rss_kb"], peak_rss_kb or 0)
+    usage["bytes_read"] += bytes_read
+    usage["commands"] += commands
+
+# How often a waiter polls a contended lock; see acquire_thread_lock.
+LOCK_POLL_SECONDS = 0.05
+
+async def acquire_thread_lock(lock, poll_seconds=LOCK_POLL_SECONDS):
+    """Acquires a threading.Lock/Semaphore from async code without blocking the loop.
+
+    Polls with non-blocking acquires instead of blocking in a worker thread:
+    if the waiting task is cancelled (StageGraph cancels sibling stages when
+    one fails), a thread blocked in acquire() would still take the lock later
+    with nobody left to release it.
+    """
+    while not lock.acquire(blocking=False):
+        await asyncio.sleep(poll_seconds)
+
+class StageGraph:
+    """Declares evaluation stages with their dependencies and runs them concurrently."""
+
+    def __init__(self):
+        self.stages = {}
+        self.stage_keys = {}
+
+    def add(self, name, func, inputs=(), after=(), cache_config=None, store=True,
+            cache_if=None, decode=None):
+        """Registers a stage; `func` is awaited with the results of `inputs`, in order.
+
+        cache_config: JSON-serialisable description of everything besides the
+            repository and the dependencies that affects the stage's result.
+            Stages without one are never cached, but still get a key.
+        store: False for stages whose config should feed their dependents'
+            keys but whose own result is not worth (or able to be) stored.
+        cache_if: optional predicate; results for which it is false are not stored.
+        decode: optional function applied to a result loaded from the cache.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already defined.")
+        self.stages[name] = {
+            "func": func,
+            "inputs": tuple(inputs),
+            "after": tuple(after),
+            "cache_config": cache_config,
+            "cached": cache_config is not None and store,
+            "cache_if": cache_if,
+            "decode": decode,
+        }
+
+    def validate(self):
+        """Raises ValueError on unknown dependencies or cycles; returns a topological order."""
+        for name, stage in self.stages.items():
+            for dep in stage["inputs"] + stage["after"]:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'.")
+
+        visiting, done = set(), set()
+        order = []
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage graph has a cycle through '{name}'.")
+            visiting.add(name)
+            stage = self.stages[name]
+            for dep in stage["inputs"] + stage["after"]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _load_cached(self, order, cache, root_key):
+        """Computes every stage key and returns the results already in the cache."""
+        cached = {}
+        for name in order:
+            stage = self.stages[name]
+            deps = stage["inputs"] + stage["after"]
+            key = cache.stage_key(
+                root_key, name, stage["cache_config"], [self.stage_keys[dep] for dep in deps]
+            )
+            self.stage_keys[name] = key
+            if not stage["cached"]:
+                continue
+            hit, result = cache.get(key)
+            if hit:
+                cached[name] = stage["decode"](result) if stage["decode"] else result
+        return cached
+
+    def _stages_to_run(self, order, cached):
+        """Stages that missed the cache plus the uncached stages they depend on."""
+        needed = set()
+        for name in reversed(order):
+            stage = self.stages[name]
+            if name in cached:
+                continue
+            if stage["cached"] or name in needed or self._is_sink(name):
+                needed.add(name)
+                needed.update(dep for dep in stage["inputs"] + stage["after"] if dep not in cached)
+        return needed
+
+    def _is_sink(self, name):
+        return not any(
+            name in stage["inputs"] + stage["after"] for stage in self.stages.values()
+        )
+
+    async def run(self, cache=None, root_key=None):
+        """Runs every stage and returns (results, timings) keyed by stage name.
+
+        With a cache, root_key identifies the repository contents; stage keys
+        are left in self.stage_keys for the caller to record.
+        """
+        order = self.validate()
+        graph_start = time.perf_counter()
+        results = {}
+        timings = {}
+        tasks = {}
+
+        self.stage_keys = {}
+        cached = self._load_cached(order, cache, root_key) if cache else {}
+        to_run = self._stages_to_run(order, cached)
+        for name, result in cached.items():
+            results[name] = result
+            timings[name] = {"cached": True, "duration_seconds": 0.0}
+
+        async def run_stage(name):
+            stage = self.stages[name]
+            for dep in stage["inputs"] + stage["after"]:
+                if dep in tasks:
+                    await tasks[dep]
+            usage = {"cpu_seconds": 0.0, "peak_rss_kb": 0, "bytes_read": 0, "commands": 0}
+            _STAGE_USAGE.set(usage)
+            started = time.perf_counter()
+            try:
+                results[name] = await stage["func"](*(results[dep] for dep in stage["inputs"]))
+            finally:
+                finished = time.perf_counter()
+                timings[name] = {
+                    "started_at_seconds": round(started - graph_start, 3),
+                    "finished_at_seconds": round(finished - graph_start, 3),
+                    "duration_seconds": round(finished - started, 3),
+                    **usage,
+                    "cpu_seconds": round(usage["cpu_seconds"], 3),
+                }
+            cache_if = stage["cache_if"]
+            if cache and stage["cached"] and (cache_if is None or cache_if(results[name])):
+                cache.put(self.stage_keys[name], name, results[name])
+
+        for name in order:
+            if name in to_run:
+                tasks[name] = asyncio.ensure_future(run_stage(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return results, timings
@@ -0,0 +1,152 @@
+import asyncio
+import io
+import os
+import shlex
+
+from build_sandbox import COMPLETE_MARKER, BuildSandbox
+
+
+def test_cancelled_build_does_not_leak_the_build_lock(tmp_path):
+    sandbox = BuildSandbox(str(tmp_path), run_command=None)
+
+    async def build(entered, release):
+        async with sandbox._building("python:key"):
+            entered.set()
+            await release.wait()
+
+    async def scenario():
+        entered, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.ensure_future(build(entered, release))
+        await entered.wait()
+        waiter = asyncio.ensure_future(build(asyncio.Event(), asyncio.Event()))
+        await asyncio.sleep(0.1)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        await holder
+        # A later build of the same key must still get the lock
+        await asyncio.wait_for(build(asyncio.Event(), release), timeout=1)
+
+    asyncio.run(scenario())
+
+
+class FakeInstaller:
+    """Stands in for run_command: venv and pip install write a few files, npm ci a node_modules."""
+
+    def __init__(self, fail_installs=0):
+        self.commands = []
+        self.fail_installs = fail_installs
+
+    async def __call__(self, command, cwd, log_file, resource=None):
+        self.commands.append(command)
+        args = shlex.split(command)
+        if args[1:3] == ["-m", "venv"]:
+            os.makedirs(os.path.join(args[3], "bin"))
+            with open(os.path.join(args[3], "bin", "python"), "w") as f:
+                f.write("#!python\n")
+        elif "install" in args:
+            if self.fail_installs:
+                self.fail_installs -= 1
+                return {"exit_code": 1, "stdout": "", "stderr": "no matching distribution"}
+            env_dir = os.path.dirname(os.path.dirname(args[0]))
+            site_packages = os.path.join(env_dir, "lib", "site-packages")
+            os.makedirs(site_packages)
+            with open(args[args.index("-r") + 1]) as requirements, \
+                    open(os.path.join(site_packages, "installed.txt"), "w") as f:
+                f.write(requirements.read())
+        elif args[:2] == ["npm", "ci"]:
+            os.makedirs(os.path.join(cwd, "node_modules", "left-pad"))
+            with open(os.path.join(cwd, "node_modules", "left-pad", "index.js"), "w") as f:
+                f.write("module.exports = 1\n")
+        return {"exit_code": 0, "stdout": "", "stderr": ""}
+
+    def count(self, fragment):
+        return sum(fragment in command for command in self.commands)
+
+
+def make_repo(tmp_path, name, requirements=None, lockfile=None):
+    repo = tmp_path / "repos" / name
+    repo.mkdir(parents=True)
+    if requirements is not None:
+        (repo / "requirements.txt").write_text(requirements)
+    if lockfile is not None:
+        (repo / "package.json").write_text('{"name": "app"}')
+        (repo / "package-lock.json").write_text(lockfile)
+    return str(repo)
+
+
+def prepare(sandbox, repo):
+    return asyncio.run(sandbox.prepare_python_env(repo, io.StringIO()))
+
+
+def test_repos_with_the_same_requirements_share_one_environment(tmp_path):
+    installer = FakeInstaller()
+    sandbox = BuildSandbox(str(tmp_path / "sandbox"), installer, offline=True)
+    first = make_repo(tmp_path, "team-a", "requests==2.31.0\n")
+    second = make_repo(tmp_path, "team-b", "requests==2.31.0\n")
+
+    first_env = prepare(sandbox, first)
+    second_env = prepare(sandbox, second)
+    assert installer.count("-m venv") == 1 and installer.count("pip install") == 1
+    assert first_env != second_env
+    assert first_env.startswith(sandbox.repo_envs) and os.path.basename(os.path.dirname(second_env)) == "team-b"
+    assert len(os.listdir(sandbox.env_store)) == 1
+    assert installer.count("pip download") == 0  # offline: installs only from the wheelhouse
+
+
+def test_repo_environments_are_hardlinked_copies(tmp_path):
+    sandbox = BuildSandbox(str(tmp_path / "sandbox"), FakeInstaller(), offline=True)
+    repo = make_repo(tmp_path, "team-a", "numpy\n")
+    repo_env = prepare(sandbox, repo)
+    shared_env = os.path.join(sandbox.env_store, os.listdir(sandbox.env_store)[0])
+
+    for relative in (os.path.join("bin", "python"), os.path.join("lib", "site-packages", "installed.txt")):
+        shared, copy = os.stat(os.path.join(shared_env, relative)), os.stat(os.path.join(repo_env, relative))
+        assert (copy.st_ino, copy.st_dev) == (shared.st_ino, shared.st_dev)
+    assert os.path.exists(os.path.join(shared_env, COMPLETE_MARKER))
+
+    # Preparing again replaces the repo's copy rather than nesting a second one
+    assert prepare(sandbox, repo) == repo_env
+    assert sorted(os.listdir(repo_env)) == sorted(os.listdir(shared_env))
+
+
+def test_changed_requirements_build_a_new_environment(tmp_path):
+    installer = FakeInstaller()
+    sandbox = BuildSandbox(str(tmp_path / "sandbox"), installer)
+    repo = make_repo(tmp_path, "team-a", "flask==2.0\n")
+    prepare(sandbox, repo)
+
+    with open(os.path.join(repo, "requirements.txt"), "w") as f:
+        f.write("flask==3.0\n")
+    new_env = prepare(sandbox, repo)
+    assert installer.count("-m venv") == 2 and installer.count("pip download") == 2
+    assert len(os.listdir(sandbox.env_store)) == 2
+    installed = os.path.join(new_env, "lib", "site-packages", "installed.txt")
+    assert open(installed).read() == "flask==3.0\n"
+
+    # A repo with the old requirements still gets the old environment
+    assert prepare(sandbox, make_repo(tmp_path, "team-b", "flask==2.0\n"))
+    assert installer.count("-m venv") == 2
+
+
+def test_failed_installs_are_not_reused(tmp_path):
+    installer = FakeInstaller(fail_installs=1)
+    sandbox = BuildSandbox(str(tmp_path / "sandbox"), installer, offline=True)
+    repo = make_repo(tmp_path, "team-a", "torch\n")
+    assert prepare(sandbox, repo) is None
+    assert prepare(sandbox, repo) is not None
+    assert installer.count("-m venv") == 2
+
+
+def test_node_modules_are_reused_for_the_same_lockfile(tmp_path):
+    installer = FakeInstaller()
+    sandbox = BuildSandbox(str(tmp_path / "sandbox"), installer)
+    first = make_repo(tmp_path, "team-a", lockfile='{"lockfileVersion": 3}')
+    second = make_repo(tmp_path, "team-b", lockfile='{"lockfileVersion": 3}')
+
+    assert asyncio.run(sandbox.install_node_modules(first, io.StringIO()))["exit_code"] == 0
+    result = asyncio.run(sandbox.install_node_modules(second, io.StringIO()))
+    assert result["exit_code"] == 0 and "Reused" in result["stdout"]
+    assert installer.count("npm ci") == 1
+    index = os.path.join("node_modules", "left-pad", "index.js")
+    assert os.stat(os.path.join(second, index)).st_ino == os.stat(os.path.join(first, index)).st_ino
@@ -0,0 +1,72 @@
+import json
+import random
+
+import pytest
+
+from command_stream import BoundedCapture, JsonStreamParser, parse_shim_report
+
+
+def parse_in_chunks(raw, cuts):
+    parser = JsonStreamParser()
+    start = 0
+    for cut in sorted(cuts):
+        parser.feed(raw[start:cut])
+        start = cut
+    parser.feed(raw[start:])
+    return parser.close()
+
+
+DOCUMENTS = [
+    [1, 2.5, {"x": [1]}, "s", 123456],
+    [-0.5, 1e-7, 3.25e10, 0, -12, True, False, None, "ünïcode ✓", [], {}],
+    {"results": [{"issue": "B101", "line": 12, "confidence": 0.75}], "errors": [], "metrics": {"loc": 1024}},
+    {"a": 1, "b": -2.0e3, "c": [1.5, [2.5, [3.5]]], "d": "x,]}"},
+]
+
+
+def test_number_split_after_decimal_point():
+    raw = json.dumps([1, 2.5, {"x": [1]}, "s", 123456]).encode()
+    assert parse_in_chunks(raw, [6]) == [1, 2.5, {"x": [1]}, "s", 123456]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_random_chunk_splits(document):
+    rng = random.Random(0)
+    for indent in (None, 2):
+        raw = ("banner line\n" + json.dumps(document, indent=indent, ensure_ascii=False)).encode()
+        for _ in range(200):
+            cuts = rng.sample(range(1, len(raw)), rng.randint(1, min(12, len(raw) - 1)))
+            assert parse_in_chunks(raw, cuts) == document
+
+
+def test_every_single_split_point():
+    for document in DOCUMENTS:
+        raw = json.dumps(document).encode()
+        for cut in range(1, len(raw)):
+            assert parse_in_chunks(raw, [cut]) == document
+
+
+def test_byte_at_a_time():
+    raw = json.dumps(DOCUMENTS[2]).encode()
+    assert parse_in_chunks(raw, range(1, len(raw))) == DOCUMENTS[2]
+
+
+def test_incomplete_document_raises():
+    parser = JsonStreamParser()
+    parser.feed(b'[1, 2, {"a": ')
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_bounded_capture_keeps_head_and_tail():
+    capture = BoundedCapture(head_bytes=4, tail_bytes=4)
+    for chunk in (b"abc", b"defgh", b"ijklmn"):
+        capture.feed(chunk)
+    assert capture.truncated
+    assert capture.text() == "abcd\n... [6 bytes omitted] ...\nklmn"
+
+
+def test_parse_shim_report():
+    assert parse_shim_report(b"") == (None, None)
+    peak, cpu = parse_shim_report(b"2048 1.23456")
+    assert cpu == 1.235 and peak > 0
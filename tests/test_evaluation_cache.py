@@ -0,0 +1,106 @@
+import subprocess
+
+import pytest
+
+from evaluation_cache import EvaluationCache, repo_tree_hash, tool_version
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "app.py").write_text("print('hello')\n")
+    _git(repo, "init", "-q")
+    _git(repo, "add", "app.py")
+    _git(repo, "commit", "-q", "-m", "init")
+    return repo
+
+
+def test_clean_repo_is_keyed_by_git_tree_and_ignores_build_artifacts(repo):
+    key = repo_tree_hash(str(repo))
+    assert key.startswith("git:")
+
+    (repo / "node_modules").mkdir()
+    (repo / "node_modules" / "dep.js").write_text("module.exports = 1\n")
+    assert repo_tree_hash(str(repo)) == key
+
+
+def test_gitignored_files_are_part_of_the_key(repo):
+    (repo / ".gitignore").write_text(".env\nnode_modules/\n")
+    _git(repo, "add", ".gitignore")
+    _git(repo, "commit", "-q", "-m", "ignore")
+    (repo / "node_modules").mkdir()
+    (repo / "node_modules" / "dep.js").write_text("module.exports = 1\n")
+    assert repo_tree_hash(str(repo)).startswith("git:")
+
+    (repo / ".env").write_text("API_KEY=one\n")
+    first = repo_tree_hash(str(repo))
+    assert first.startswith("sha256:")
+    (repo / ".env").write_text("API_KEY=two\n")
+    assert repo_tree_hash(str(repo)) != first
+
+
+def test_tool_version_is_the_first_line_or_none():
+    assert tool_version("git --version").startswith("git version")
+    assert tool_version("no-such-tool-xyz --version") is None
+
+
+def test_local_changes_fall_back_to_a_content_hash(repo):
+    (repo / "app.py").write_text("print('changed')\n")
+    first = repo_tree_hash(str(repo))
+    assert first.startswith("sha256:")
+    assert repo_tree_hash(str(repo)) == first
+
+    (repo / "app.py").write_text("print('changed again')\n")
+    assert repo_tree_hash(str(repo)) != first
+
+
+def test_stage_key_depends_on_version_config_and_dependencies(tmp_path):
+    cache = EvaluationCache(str(tmp_path), version="1")
+    key = cache.stage_key("git:abc", "score", {"weights": [1, 2]}, {"build": "k1"})
+
+    assert cache.stage_key("git:abc", "score", {"weights": [1, 2]}, {"build": "k1"}) == key
+    assert cache.stage_key("git:abc", "score", {"weights": [1, 3]}, {"build": "k1"}) != key
+    assert cache.stage_key("git:abc", "score", {"weights": [1, 2]}, {"build": "k2"}) != key
+    assert cache.stage_key("git:def", "score", {"weights": [1, 2]}, {"build": "k1"}) != key
+    assert EvaluationCache(str(tmp_path), version="2").stage_key(
+        "git:abc", "score", {"weights": [1, 2]}, {"build": "k1"}) != key
+
+
+def test_results_and_runs_round_trip(tmp_path):
+    cache = EvaluationCache(str(tmp_path), version="1")
+    build_key = cache.stage_key("git:abc", "build", {}, {})
+    score_key = cache.stage_key("git:abc", "score", {}, {"build": build_key})
+
+    assert cache.get(build_key) == (False, None)
+    cache.put(build_key, "build", {"ok": True, "seconds": 1.5})
+    cache.put(score_key, "score", {"total": 42})
+    assert cache.get(build_key) == (True, {"ok": True, "seconds": 1.5})
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.write_run("team-a", {"root_key": "git:abc", "stage_keys": {"build": build_key, "score": score_key}})
+    assert cache.list_runs() == ["team-a"]
+    run, results = cache.load_run_results("team-a")
+    assert run["root_key"] == "git:abc"
+    assert results == {"build": {"ok": True, "seconds": 1.5}, "score": {"total": 42}}
+
+
+def test_corrupt_or_missing_entries_are_misses(tmp_path):
+    cache = EvaluationCache(str(tmp_path), version="1")
+    key = cache.stage_key("git:abc", "build", {}, {})
+    cache.put(key, "build", {"ok": True})
+    with open(cache._stage_path(key), "w") as f:
+        f.write('{"stage": "bu')
+    assert cache.get(key) == (False, None)
+
+    cache.write_run("team-b", {"stage_keys": {"build": key}})
+    with pytest.raises(KeyError, match="build"):
+        cache.load_run_results("team-b")
@@ -0,0 +1,62 @@
+import asyncio
+import io
+
+import pytest
+
+import evidence_packer
+import process_repo
+from evaluation_cache import EvaluationCache
+
+
+@pytest.fixture
+def evidence_stages(monkeypatch):
+    """Replaces the evidence-gathering stages with instant ones and records packing budgets."""
+    async def scan_stage(repo_path, log_file):
+        return None
+
+    async def empty_stage(repo_path, log_file, scan=None, sandbox=None):
+        return {}
+
+    for name in ("static_analysis", "check_presentation", "security_scan", "model_and_runtime_validation",
+                 "build_and_test"):
+        monkeypatch.setattr(process_repo, name, empty_stage)
+    monkeypatch.setattr(process_repo, "scan_stage", scan_stage)
+
+    budgets = []
+
+    def pack_evidence(evidence, repo_path, token_budget=evidence_packer.PROMPT_TOKEN_BUDGET):
+        budgets.append(token_budget)
+        return evidence_packer.pack_evidence(evidence, repo_path, token_budget=token_budget)
+
+    monkeypatch.setattr(process_repo, "pack_evidence", pack_evidence)
+    monkeypatch.setattr(process_repo, "_JUDGE", {})
+    process_repo.configure_judge("stub", requests_per_minute=0)
+    return budgets
+
+
+def run_stages(repo_path, cache, **options):
+    return asyncio.run(process_repo.run_evaluation_stages(
+        str(repo_path), io.StringIO(), cache=cache, root_key="git:abc", **options))
+
+
+def test_token_budget_reaches_the_packer_and_the_ai_cache_key(tmp_path, evidence_stages):
+    cache = EvaluationCache(str(tmp_path / "cache"), version="1")
+
+    _, _, default_keys = run_stages(tmp_path, cache)
+    _, _, small_keys = run_stages(tmp_path, cache, token_budget=300)
+    assert evidence_stages == [evidence_packer.PROMPT_TOKEN_BUDGET, 300]
+    assert small_keys["ai_evaluation"] != default_keys["ai_evaluation"]
+    assert {name: key for name, key in small_keys.items() if name != "ai_evaluation"} == \
+        {name: key for name, key in default_keys.items() if name != "ai_evaluation"}
+
+    # Same budget again: the packed prompt is replayed from the cache
+    results, _, keys = run_stages(tmp_path, cache, token_budget=300)
+    assert keys == small_keys and len(evidence_stages) == 2
+    assert not results["ai_evaluation"][1].get("evaluation_failed")
+
+
+def test_token_budget_option_is_shared_by_both_entry_points():
+    parser = process_repo.argparse.ArgumentParser()
+    process_repo.add_judge_arguments(parser)
+    assert parser.parse_args([]).token_budget == evidence_packer.PROMPT_TOKEN_BUDGET
+    assert parser.parse_args(["--token-budget", "2500"]).token_budget == 2500
@@ -0,0 +1,18 @@
+from repo_scanner import scan_repository
+
+
+def test_hf_spaces_link_is_both_presentation_and_ai_evidence(tmp_path):
+    (tmp_path / "README.md").write_text(
+        "Demo: https://huggingface.co/spaces/team/app\n"
+        "Built with langchain and openai\n"
+        "Video: https://youtu.be/abc\n"
+    )
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "dep.js").write_text("require('openai')\n")
+
+    scan = scan_repository(str(tmp_path))
+
+    assert [hit["line"] for hit in scan.presentation_hits] == [1, 3]
+    # One hit per line, including the Spaces link, as `grep -n` reported
+    assert [hit["line"] for hit in scan.ai_keyword_hits] == [1, 2]
+    assert scan.dirs_pruned == 1
@@ -0,0 +1,220 @@
+import asyncio
+import threading
+
+import pytest
+
+from evaluation_cache import EvaluationCache
+from stage_graph import StageGraph, acquire_thread_lock, record_stage_usage
+
+
+def test_cancelled_waiter_does_not_leak_the_slot():
+    slot = threading.BoundedSemaphore(1)
+
+    async def scenario():
+        slot.acquire()  # held by another repository's stage
+        waiter = asyncio.ensure_future(acquire_thread_lock(slot, poll_seconds=0.01))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        slot.release()
+        await asyncio.sleep(0.05)
+        # The cancelled waiter must not have taken the slot behind our back
+        await asyncio.wait_for(acquire_thread_lock(slot, poll_seconds=0.01), timeout=1)
+        slot.release()
+
+    asyncio.run(scenario())
+
+
+def test_waiter_gets_the_lock_once_released():
+    lock = threading.Lock()
+
+    async def scenario():
+        lock.acquire()
+        waiter = asyncio.ensure_future(acquire_thread_lock(lock, poll_seconds=0.01))
+        await asyncio.sleep(0.03)
+        assert not waiter.done()
+        lock.release()
+        await asyncio.wait_for(waiter, timeout=1)
+        assert lock.locked()
+        lock.release()
+
+    asyncio.run(scenario())
+
+
+def stage(log, name, result=None, wait_for=None, fail=False):
+    """A trivial async stage that records its start and end in log."""
+    async def run(*inputs):
+        log.append(("start", name, inputs))
+        if wait_for is not None:
+            await wait_for()
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        log.append(("end", name))
+        return result if result is not None else f"{name}-result"
+    return run
+
+
+def test_stages_run_after_their_dependencies_with_their_inputs():
+    log = []
+    graph = StageGraph()
+    graph.add("report", stage(log, "report"), inputs=("scan", "score"), after=("cleanup",))
+    graph.add("score", stage(log, "score"), inputs=("scan",))
+    graph.add("scan", stage(log, "scan"))
+    graph.add("cleanup", stage(log, "cleanup"), after=("scan",))
+
+    results, timings = asyncio.run(graph.run())
+
+    ends = [entry[1] for entry in log if entry[0] == "end"]
+    assert ends.index("scan") < ends.index("score") < ends.index("report")
+    assert ends.index("cleanup") < ends.index("report")
+    # inputs are passed in order; "after" dependencies are waited for but not passed
+    assert ("start", "report", ("scan-result", "score-result")) in log
+    assert ("start", "cleanup", ()) in log
+    assert set(results) == set(timings) == {"scan", "score", "cleanup", "report"}
+    assert timings["report"]["started_at_seconds"] >= timings["score"]["finished_at_seconds"]
+
+
+def test_independent_stages_overlap():
+    log = []
+    running = []
+
+    async def barrier():
+        # Returns only once both branches are running at the same time
+        running.append(asyncio.current_task())
+        while len(running) < 2:
+            await asyncio.sleep(0.01)
+
+    graph = StageGraph()
+    graph.add("root", stage(log, "root"))
+    graph.add("left", stage(log, "left", wait_for=barrier), inputs=("root",))
+    graph.add("right", stage(log, "right", wait_for=barrier), inputs=("root",))
+    graph.add("join", stage(log, "join"), inputs=("left", "right"))
+
+    # Run one after the other, the first branch would wait forever
+    results, _ = asyncio.run(asyncio.wait_for(graph.run(), timeout=2))
+    assert results["join"] == "join-result"
+
+
+def test_failure_stops_dependants_and_cancels_siblings():
+    log = []
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    graph = StageGraph()
+    graph.add("scan", stage(log, "scan"))
+    graph.add("broken", stage(log, "broken", fail=True), inputs=("scan",))
+    graph.add("dependant", stage(log, "dependant"), inputs=("broken",))
+    graph.add("slow", stage(log, "slow", wait_for=slow), inputs=("scan",))
+
+    with pytest.raises(RuntimeError, match="broken failed"):
+        asyncio.run(asyncio.wait_for(graph.run(), timeout=2))
+    assert not any(entry[1] == "dependant" for entry in log)
+    assert cancelled == ["slow"]
+
+
+def test_invalid_graphs_are_rejected():
+    graph = StageGraph()
+    graph.add("a", stage([], "a"), inputs=("b",))
+    with pytest.raises(ValueError, match="already defined"):
+        graph.add("a", stage([], "a"))
+    with pytest.raises(ValueError, match="unknown stage 'b'"):
+        graph.validate()
+    graph.add("b", stage([], "b"), after=("a",))
+    with pytest.raises(ValueError, match="cycle"):
+        graph.validate()
+
+
+def test_stage_usage_is_recorded_on_the_running_stage():
+    async def busy(*inputs):
+        record_stage_usage(cpu_seconds=1.5, bytes_read=100, commands=1)
+        await asyncio.sleep(0)
+        record_stage_usage(peak_rss_kb=2048, commands=1)
+        return "busy"
+
+    async def idle(*inputs):
+        await asyncio.sleep(0)
+        return "idle"
+
+    graph = StageGraph()
+    graph.add("busy", busy)
+    graph.add("idle", idle)
+    _, timings = asyncio.run(graph.run())
+    assert timings["busy"]["cpu_seconds"] == 1.5 and timings["busy"]["peak_rss_kb"] == 2048
+    assert timings["busy"]["bytes_read"] == 100 and timings["busy"]["commands"] == 2
+    assert timings["idle"]["cpu_seconds"] == 0 and timings["idle"]["commands"] == 0
+
+
+def cached_graph(log, scan_config=None, judge_result=None):
+    """scan (key only) -> evidence (cached) -> judge (cached unless failed, decoded to a tuple)."""
+    graph = StageGraph()
+    graph.add("scan", stage(log, "scan"), cache_config=scan_config or {"v": 1}, store=False)
+    graph.add("evidence", stage(log, "evidence", result={"files": 3}), inputs=("scan",),
+              cache_config={"v": 1})
+    graph.add("judge", stage(log, "judge", result=judge_result or ["ok", {"score": 7}]),
+              inputs=("evidence",), cache_config={"v": 1},
+              cache_if=lambda result: not result[1].get("failed"), decode=tuple)
+    graph.add("report", stage(log, "report"), inputs=("judge",))
+    return graph
+
+
+def test_cached_stages_are_not_run_again(tmp_path):
+    cache = EvaluationCache(str(tmp_path), version="1")
+    log = []
+    first, _ = asyncio.run(cached_graph(log).run(cache=cache, root_key="git:abc"))
+    assert [entry[1] for entry in log if entry[0] == "start"] == ["scan", "evidence", "judge", "report"]
+
+    log.clear()
+    graph = cached_graph(log)
+    results, timings = asyncio.run(graph.run(cache=cache, root_key="git:abc"))
+    # scan only feeds a stage that hit, so it is skipped too; report is never cached
+    assert [entry[1] for entry in log if entry[0] == "start"] == ["report"]
+    assert ("start", "report", (("ok", {"score": 7}),)) in log
+    assert results["judge"] == ("ok", {"score": 7}) and results["evidence"] == {"files": 3}
+    assert "scan" not in results
+    assert timings["judge"] == {"cached": True, "duration_seconds": 0.0}
+
+
+def test_cache_lookup_and_run_set(tmp_path):
+    cache = EvaluationCache(str(tmp_path), version="1")
+    graph = cached_graph([])
+    order = graph.validate()
+    assert graph._load_cached(order, cache, "git:abc") == {}
+    assert graph._stages_to_run(order, {}) == {"scan", "evidence", "judge", "report"}
+    keys = dict(graph.stage_keys)
+
+    cache.put(keys["evidence"], "evidence", {"files": 3})
+    assert graph._load_cached(order, cache, "git:abc") == {"evidence": {"files": 3}}
+    assert graph._stages_to_run(order, {"evidence": {}}) == {"judge", "report"}
+    cache.put(keys["judge"], "judge", ["ok", {}])
+    cached = graph._load_cached(order, cache, "git:abc")
+    assert cached["judge"] == ("ok", {})
+    assert graph._stages_to_run(order, cached) == {"report"}
+    assert graph.stage_keys == keys
+
+    # A dependency's config feeds every key downstream of it
+    changed = cached_graph([], scan_config={"v": 2})
+    assert changed._load_cached(changed.validate(), cache, "git:abc") == {}
+    assert all(changed.stage_keys[name] != keys[name] for name in keys)
+    other_repo = cached_graph([])
+    assert other_repo._load_cached(order, cache, "git:def") == {}
+
+
+def test_results_rejected_by_cache_if_are_run_again(tmp_path):
+    cache = EvaluationCache(str(tmp_path), version="1")
+    log = []
+    asyncio.run(cached_graph(log, judge_result=["error", {"failed": True}]).run(cache=cache, root_key="git:abc"))
+
+    log.clear()
+    results, _ = asyncio.run(cached_graph(log).run(cache=cache, root_key="git:abc"))
+    assert [entry[1] for entry in log if entry[0] == "start"] == ["judge", "report"]
+    assert results["judge"] == ["ok", {"score": 7}]
+
+    log.clear()
+    asyncio.run(cached_graph(log).run(cache=cache, root_key="git:abc"))
+    assert [entry[1] for entry in log if entry[0] == "start"] == ["report"]